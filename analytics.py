@@ -0,0 +1,223 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from extensions import db, lazy_import
+from models import Order
+from catalog import get_menu
+
+np = lazy_import('numpy')
+
+# created_at is stored as naive UTC
+EPOCH = datetime(1970, 1, 1)
+
+
+class OrderColumns:
+    """Orders in a time range as parallel NumPy arrays.
+
+    Per-order columns are indexed by order position; line items are stored
+    as flat (order position, item index, quantity) arrays so that
+    item-level aggregates are plain `bincount`/matrix operations.
+    """
+
+    def __init__(self, item_names):
+        self.item_names = list(item_names)
+        self.order_id = np.empty(0, dtype=np.int64)
+        self.created_at = np.empty(0, dtype=np.float64)
+        self.user_id = np.empty(0, dtype=np.int64)  # -1 for guests
+        self.total = np.empty(0, dtype=np.float64)
+        self.discount = np.empty(0, dtype=np.float64)
+        self.has_coupon = np.empty(0, dtype=bool)
+        self.line_order = np.empty(0, dtype=np.int64)
+        self.line_item = np.empty(0, dtype=np.int64)
+        self.line_qty = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return self.created_at.size
+
+
+def load_order_columns(start, end, chunk_size=5000):
+    """Stream non-cancelled orders created in [start, end) into OrderColumns.
+
+    Rows are pulled with a server-side cursor in `chunk_size` batches and
+    each batch is converted to arrays before the next is fetched, so
+    Python objects for only one chunk are alive at a time.
+    """
+    item_index = {}
+    for items in get_menu().values():
+        for item in items:
+            item_index.setdefault(item['name'], len(item_index))
+
+    stmt = select(
+        Order.created_at, Order.user_id, Order.total, Order.discount, Order.coupon_code, Order.items, Order.id
+    ).where(
+        Order.created_at >= start, Order.created_at < end, Order.status != 'cancelled'
+    ).execution_options(yield_per=chunk_size)
+
+    parts = {name: [] for name in ('order_id', 'created_at', 'user_id', 'total', 'discount', 'has_coupon',
+                                   'line_order', 'line_item', 'line_qty')}
+    offset = 0
+    for chunk in db.session.execute(stmt).partitions():
+        n = len(chunk)
+        parts['order_id'].append(np.fromiter((r[6] for r in chunk), np.int64, n))
+        parts['created_at'].append(np.fromiter(((r[0] - EPOCH).total_seconds() for r in chunk), np.float64, n))
+        parts['user_id'].append(np.fromiter((r[1] if r[1] is not None else -1 for r in chunk), np.int64, n))
+        parts['total'].append(np.fromiter((r[2] or 0 for r in chunk), np.float64, n))
+        parts['discount'].append(np.fromiter((r[3] or 0 for r in chunk), np.float64, n))
+        parts['has_coupon'].append(np.fromiter((bool(r[4]) for r in chunk), bool, n))
+
+        line_order, line_item, line_qty = [], [], []
+        for pos, row in enumerate(chunk):
+            for item in json.loads(row[5] or '[]'):
+                line_order.append(offset + pos)
+                line_item.append(item_index.setdefault(item['name'], len(item_index)))
+                line_qty.append(item.get('quantity', 1))
+        parts['line_order'].append(np.array(line_order, dtype=np.int64))
+        parts['line_item'].append(np.array(line_item, dtype=np.int64))
+        parts['line_qty'].append(np.array(line_qty, dtype=np.int64))
+        offset += n
+
+    columns = OrderColumns(item_index)
+    for name, arrays in parts.items():
+        if arrays:
+            setattr(columns, name, np.concatenate(arrays))
+    return columns
+
+
+def hourly_demand(columns, days):
+    """Average orders per hour of day, and a weekday x hour matrix of order counts"""
+    if not len(columns):
+        return {'hourly': [0.0] * 24, 'weekday_hour': [[0] * 24 for _ in range(7)]}
+    stamps = columns.created_at.astype('datetime64[s]')
+    hours = (stamps.astype('datetime64[h]') - stamps.astype('datetime64[D]')).astype(np.int64)
+    weekdays = (stamps.astype('datetime64[D]').astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    grid = np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
+    return {
+        'hourly': np.round(grid.sum(axis=0) / max(days, 1), 2).tolist(),
+        'weekday_hour': grid.tolist(),
+    }
+
+
+def co_purchase(columns, top=10, block=50000):
+    """Item co-purchase counts: how many orders contain both items.
+
+    Orders are turned into item-presence rows a block at a time and the
+    block's Gram matrix is added up, so memory stays bounded on long ranges.
+    """
+    n_items = len(columns.item_names)
+    matrix = np.zeros((n_items, n_items), dtype=np.int64)
+    for lo in range(0, len(columns), block):
+        hi = min(lo + block, len(columns))
+        mask = (columns.line_order >= lo) & (columns.line_order < hi)
+        basket = np.zeros((hi - lo, n_items), dtype=np.float32)
+        basket[columns.line_order[mask] - lo, columns.line_item[mask]] = 1
+        matrix += (basket.T @ basket).astype(np.int64)
+
+    upper = np.triu(matrix, k=1)
+    flat = np.argsort(upper, axis=None)[::-1][:top]
+    pairs = [
+        {'items': [columns.item_names[i], columns.item_names[j]], 'orders': int(upper[i, j])}
+        for i, j in zip(*np.unravel_index(flat, upper.shape)) if upper[i, j] > 0
+    ]
+    return {'items': columns.item_names, 'matrix': matrix.tolist(), 'top_pairs': pairs}
+
+
+def basket_stats(columns):
+    """Average order value and items per order, overall and split by coupon use"""
+    if not len(columns):
+        empty = {'orders': 0, 'avg_order_value': 0.0, 'avg_items': 0.0, 'avg_discount': 0.0}
+        return dict(empty, with_coupon=dict(empty), without_coupon=dict(empty), coupon_uplift=None)
+    items_per_order = np.bincount(columns.line_order, weights=columns.line_qty, minlength=len(columns))
+
+    def summary(mask):
+        count = int(mask.sum())
+        return {
+            'orders': count,
+            'avg_order_value': round(float(columns.total[mask].mean()), 2) if count else 0.0,
+            'avg_items': round(float(items_per_order[mask].mean()), 2) if count else 0.0,
+            'avg_discount': round(float(columns.discount[mask].mean()), 2) if count else 0.0,
+        }
+
+    with_coupon = summary(columns.has_coupon)
+    without = summary(~columns.has_coupon)
+    uplift = None
+    if with_coupon['orders'] and without['orders'] and without['avg_order_value']:
+        uplift = round(with_coupon['avg_order_value'] / without['avg_order_value'] - 1, 4)
+    return {
+        'orders': len(columns),
+        'avg_order_value': round(float(columns.total.mean()), 2),
+        'avg_items': round(float(items_per_order.mean()), 2),
+        'with_coupon': with_coupon,
+        'without_coupon': without,
+        'coupon_uplift': uplift,
+    }
+
+
+def repeat_customers(columns):
+    """Share of registered customers with more than one order in the window"""
+    users = columns.user_id[columns.user_id >= 0]
+    if not users.size:
+        return {'customers': 0, 'repeat_customers': 0, 'repeat_rate': 0.0, 'orders_per_customer': 0.0}
+    _, counts = np.unique(users, return_counts=True)
+    repeat = int((counts > 1).sum())
+    return {
+        'customers': int(counts.size),
+        'repeat_customers': repeat,
+        'repeat_rate': round(repeat / counts.size, 4),
+        'orders_per_customer': round(float(counts.mean()), 2),
+    }
+
+
+REPORTS = ('hourly_demand', 'co_purchase', 'basket', 'repeat_customers')
+
+
+class ReportCache:
+    """Computed reports keyed by (days, time window).
+
+    The window is the current time floored to the cache TTL, so everyone
+    asking within the same window shares one computation.
+    """
+
+    def __init__(self, max_entries=16):
+        self.entries = {}
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+        value = compute()
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = value
+        return value
+
+
+report_cache = ReportCache()
+
+
+def compute_reports(days):
+    """Load the last `days` days of orders once and derive every report from it"""
+    end = datetime.utcnow()
+    columns = load_order_columns(end - timedelta(days=days), end,
+                                 chunk_size=current_app.config['ANALYTICS_CHUNK_SIZE'])
+    return {
+        'generated_at': end.isoformat(),
+        'days': days,
+        'hourly_demand': hourly_demand(columns, days),
+        'co_purchase': co_purchase(columns),
+        'basket': basket_stats(columns),
+        'repeat_customers': repeat_customers(columns),
+    }
+
+
+def get_reports(days=30):
+    """All reports over the last `days` days, cached per time window"""
+    window = int(time.time() // current_app.config['ANALYTICS_CACHE_SECONDS'])
+    return report_cache.get((days, window), lambda: compute_reports(days))
@@ -13,42 +13,25 @@ def create_app():
     # Initialize DB
     db.init_app(app)
 
-    with app.app_context():
-        import models
-        db.create_all()
-        logger.info("Database tables created successfully")
+    # Instrumentation first so its timer also covers requests the rate limiter rejects
+    from instrumentation import instrumentation
+    instrumentation.init_app(app)
 
-        # Create default admin & delivery users
-        from models import User
-        from auth import hash_password
-        from config import Config
+    from ratelimit import rate_limiter
+    rate_limiter.init_app(app)
 
-        admin_user = User.query.filter_by(username=Config.ADMIN_USERNAME).first()
-        if not admin_user:
-            admin = User(
-                username=Config.ADMIN_USERNAME,
-                password_hash=hash_password(Config.ADMIN_PASSWORD),
-                role='admin',
-                full_name='Admin User',
-                is_active=True
-            )
-            db.session.add(admin)
-            logger.info("Admin user created")
+    from assets import asset_pipeline
+    asset_pipeline.init_app(app)
 
-        delivery_user = User.query.filter_by(username=Config.DELIVERY_USERNAME).first()
-        if not delivery_user:
-            delivery = User(
-                username=Config.DELIVERY_USERNAME,
-                password_hash=hash_password(Config.DELIVERY_PASSWORD),
-                role='delivery',
-                full_name='Delivery Person',
-                is_active=True
-            )
-            db.session.add(delivery)
-            logger.info("Delivery user created")
+    import template_cache
+    template_cache.init_app(app)
 
-        db.session.commit()
+    from forecast import demand_forecaster
+    demand_forecaster.init_app(app)
 
+    # Schema and default users are managed by `flask db create` / `flask db seed`,
+    # so starting a worker never runs DDL or bcrypt
+    with app.app_context():
         # Import and register blueprints
         from routes import main_bp, admin_bp, delivery_bp, customer_bp, support_bp
         app.register_blueprint(main_bp)
@@ -57,6 +40,41 @@ def create_app():
         app.register_blueprint(customer_bp, url_prefix='/customer')
         app.register_blueprint(support_bp, url_prefix='/support')
 
+        # CLI commands
+        from dispatch import dispatch_cli
+        from route_batching import geo_cli
+        from eta import eta_cli
+        from rollups import rollups_cli
+        from exports import export_cli
+        from catalog import catalog_cli
+        from stock import stock_cli
+        from loyalty import loyalty_cli
+        from rewards import spin_cli
+        from schema import db_cli
+        from datagen import datagen_cli
+        from assets import assets_cli
+        from template_cache import templates_cli
+        from search import search_cli
+        from forecast import forecast_cli
+        app.cli.add_command(dispatch_cli)
+        app.cli.add_command(geo_cli)
+        app.cli.add_command(eta_cli)
+        app.cli.add_command(rollups_cli)
+        app.cli.add_command(export_cli)
+        app.cli.add_command(catalog_cli)
+        app.cli.add_command(stock_cli)
+        app.cli.add_command(loyalty_cli)
+        app.cli.add_command(spin_cli)
+        app.cli.add_command(db_cli)
+        app.cli.add_command(datagen_cli)
+        app.cli.add_command(assets_cli)
+        app.cli.add_command(templates_cli)
+        app.cli.add_command(search_cli)
+        app.cli.add_command(forecast_cli)
+
+    if app.config['TEMPLATE_PRECOMPILE']:
+        template_cache.precompile_templates(app)
+
     return app
 
 if __name__ == "__main__":
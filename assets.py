@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+assets_cli = AppGroup('assets', help='Fingerprinted, precompressed static files.')
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+# Preferred first when the client accepts both
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _fingerprinted_name(path, digest):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+
+def build_assets(static_folder, dist_dir='dist', clean=False):
+    """Copy static files to `dist_dir` under content-hashed names, with .gz/.br siblings.
+
+    Writes manifest.json mapping each source path ('css/style.css') to its
+    fingerprinted path ('dist/css/style.1a2b3c4d5e6f.css'). Older builds
+    are kept unless `clean`, so pages rendered by workers still running
+    the previous release can load their assets. Brotli variants need the
+    optional `brotli` package. Returns the manifest.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logger.info('brotli is not installed; writing gzip variants only')
+
+    out = os.path.join(static_folder, dist_dir)
+    if clean and os.path.isdir(out):
+        shutil.rmtree(out)
+    manifest = {}
+    for directory, subdirs, files in os.walk(static_folder):
+        if os.path.abspath(directory) == os.path.abspath(static_folder) and dist_dir in subdirs:
+            subdirs.remove(dist_dir)
+        for name in sorted(files):
+            source = os.path.join(directory, name)
+            relative = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+            target = f"{dist_dir}/{_fingerprinted_name(relative, hashlib.sha256(content).hexdigest()[:12])}"
+            target_path = os.path.join(static_folder, *target.split('/'))
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(target_path, 'wb') as f:
+                f.write(content)
+            if relative.endswith(COMPRESSIBLE):
+                # mtime=0 keeps the .gz bytes identical across builds
+                with open(target_path + '.gz', 'wb') as f:
+                    f.write(gzip.compress(content, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target_path + '.br', 'wb') as f:
+                        f.write(brotli.compress(content, quality=11))
+            manifest[relative] = target
+    os.makedirs(out, exist_ok=True)
+    with open(os.path.join(out, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetPipeline:
+    """Serves fingerprinted static files built by `flask assets build`.
+
+    With a manifest present, url_for('static', filename='css/style.css')
+    returns the fingerprinted path, which is served with a one-year
+    immutable Cache-Control and, when the client accepts it, the
+    precompressed brotli or gzip variant. Without a build (development)
+    static files are served exactly as before.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.dist_dir = app.config['ASSET_DIST_DIR']
+        self.max_age = app.config['ASSET_MAX_AGE']
+        path = os.path.join(app.static_folder, self.dist_dir, 'manifest.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+            logger.info(f"Loaded asset manifest with {len(self.manifest)} files")
+        app.url_defaults(self.fingerprint_url)
+        app.view_functions['static'] = self.send_static
+
+    def fingerprint_url(self, endpoint, values):
+        if endpoint == 'static':
+            fingerprinted = self.manifest.get(values.get('filename'))
+            if fingerprinted:
+                values['filename'] = fingerprinted
+
+    def send_static(self, filename):
+        static_folder = current_app.static_folder
+        if not filename.startswith(self.dist_dir + '/'):
+            return send_from_directory(static_folder, filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = None
+        for encoding, suffix in ENCODINGS:
+            variant = safe_join(static_folder, filename + suffix)
+            if request.accept_encodings[encoding] and variant and os.path.isfile(variant):
+                response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype,
+                                               max_age=self.max_age)
+                response.headers['Content-Encoding'] = encoding
+                break
+        if response is None:
+            response = send_from_directory(static_folder, filename, mimetype=mimetype, max_age=self.max_age)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+asset_pipeline = AssetPipeline()
+
+
+@assets_cli.command('build')
+@click.option('--clean', is_flag=True, help='Delete earlier builds first.')
+def build_command(clean):
+    """Fingerprint and precompress static files and write the manifest."""
+    manifest = build_assets(current_app.static_folder, current_app.config['ASSET_DIST_DIR'], clean)
+    for source, target in sorted(manifest.items()):
+        click.echo(f"{source} -> {target}")
@@ -0,0 +1,300 @@
+"""Ordering hot-path benchmark.
+
+Seeds a database with realistic volumes, then replays customer and admin
+journeys (menu, add to cart, coupon check, place order, order status
+polling, admin dashboard and kitchen queue) and reports throughput and p50/p95/p99 latency
+per route. Run from the project root:
+
+    python benchmarks/load.py seed --database sqlite:////tmp/bench.db
+    python benchmarks/load.py client --database sqlite:////tmp/bench.db --journeys 500
+    RATELIMIT_ENABLED=0 DATABASE_URL=sqlite:////tmp/bench.db gunicorn -w 4 'app:create_app()'
+    python benchmarks/load.py http --url http://127.0.0.1:8000 --processes 8 --duration 30 \
+        --database sqlite:////tmp/bench.db
+
+`client` drives the app in-process through the Flask test client (no
+network, one thread); `http` runs one journey loop per process against a
+running server. Start the server with RATELIMIT_ENABLED=0 or most orders
+will be rejected with 429s. `--save` writes the per-route results as
+JSON and `--compare` exits non-zero when any route's p95 is more than
+`--tolerance` slower than a saved baseline.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CUSTOMER = {'customer_name': 'Load Test', 'customer_phone': '9876543210',
+            'customer_address': '12 Bench Street', 'payment_method': 'cash'}
+
+
+def menu_items():
+    from config import MENU_CONFIG
+    return [item for section in MENU_CONFIG.values() for item in section]
+
+
+def create_bench_app(database):
+    os.environ['DATABASE_URL'] = database
+    os.environ.setdefault('RATELIMIT_ENABLED', '0')
+    os.environ.setdefault('METRICS_ENABLED', '0')
+    from app import create_app
+    return create_app()
+
+
+# --------------------------------------------------------------------- seed
+def seed(app, users, orders, coupons, tickets, seed_value=42):
+    """Create the schema and bulk-load a deterministic dataset (see datagen.py)"""
+    from datagen import generate
+    from schema import create_schema, seed_default_users
+
+    with app.app_context():
+        create_schema()
+        seed_default_users()
+        counts = generate(users, orders, coupons, tickets, seed=seed_value)
+    print('Seeded ' + ', '.join(f"{count} {table}" for table, count in counts.items()))
+
+
+def sample_coupon_codes(app, limit=1000):
+    with app.app_context():
+        from models import Coupon
+        return [code for (code,) in Coupon.query.with_entities(Coupon.code).order_by(Coupon.id).limit(limit)]
+
+
+# ----------------------------------------------------------------- journeys
+def customer_journey(send, rng, items, coupon_codes, polls):
+    send('menu', 'GET', '/customer/menu')
+    for _ in range(rng.choice((1, 1, 2, 2, 3, 4))):
+        send('add_to_cart', 'POST', '/customer/add_to_cart', json={'item_name': rng.choice(items)})
+    if coupon_codes and rng.random() < 0.5:
+        send('check_coupon', 'POST', '/api/check_coupon', json={'coupon_code': rng.choice(coupon_codes)})
+    order = send('place_order', 'POST', '/customer/place_order', json=CUSTOMER)
+    if order and order.get('order_id'):
+        for _ in range(polls):
+            send('order_status', 'GET', f"/api/order_status/{order['order_id']}")
+
+
+def admin_journey(send, rng, polls):
+    send('admin_dashboard', 'GET', '/admin/dashboard', admin=True)
+    for _ in range(polls):
+        send('kitchen_queue', 'GET', '/admin/kitchen/queue', admin=True)
+
+
+def run_journeys(send, rng, count=None, deadline=None, admin_share=0.1, polls=3, coupon_codes=()):
+    items = [item['name'] for item in menu_items()]
+    done = 0
+    while (count is None or done < count) and (deadline is None or time.perf_counter() < deadline):
+        if rng.random() < admin_share:
+            admin_journey(send, rng, polls)
+        else:
+            customer_journey(send, rng, items, coupon_codes, polls)
+        done += 1
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []  # (route, seconds, status)
+
+    def timed(self, route, call):
+        """Time `call` (returning status and parsed JSON body) and return the body"""
+        started = time.perf_counter()
+        status, body = call()
+        self.samples.append((route, time.perf_counter() - started, status))
+        return body
+
+
+# ------------------------------------------------------------------ client
+def run_client(args):
+    app = create_bench_app(args.database)
+    coupon_codes = sample_coupon_codes(app)
+    customer_client, admin_client = app.test_client(), app.test_client()
+    with admin_client.session_transaction() as session:
+        session['user_id'], session['user_role'] = 1, 'admin'
+
+    recorder = Recorder()
+
+    def send(route, method, path, json=None, admin=False):
+        client = admin_client if admin else customer_client
+
+        def call():
+            response = client.open(path, method=method, json=json)
+            return response.status_code, response.get_json(silent=True)
+        return recorder.timed(route, call)
+
+    for _ in range(args.warmup):
+        run_journeys(send, random.Random(0), count=1, coupon_codes=coupon_codes)
+    recorder.samples.clear()
+    started = time.perf_counter()
+    run_journeys(send, random.Random(args.seed), count=args.journeys, admin_share=args.admin_share,
+                 polls=args.polls, coupon_codes=coupon_codes)
+    return recorder.samples, time.perf_counter() - started
+
+
+# -------------------------------------------------------------------- http
+class HttpSession:
+    """Keep-alive HTTP/1.1 connection that carries the session cookie"""
+
+    def __init__(self, url):
+        from http.client import HTTPConnection, HTTPSConnection
+        from urllib.parse import urlsplit
+        parts = urlsplit(url)
+        connection = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        self.connection = connection(parts.hostname, parts.port, timeout=30)
+        self.cookies = {}
+
+    def request(self, method, path, json_body=None, form=None):
+        from urllib.parse import urlencode
+        headers = {}
+        body = None
+        if json_body is not None:
+            body, headers['Content-Type'] = json.dumps(json_body), 'application/json'
+        elif form is not None:
+            body, headers['Content-Type'] = urlencode(form), 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        data = response.read()
+        for header in response.headers.get_all('Set-Cookie') or ():
+            name, _, value = header.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value
+        is_json = (response.getheader('Content-Type') or '').startswith('application/json')
+        return response.status, json.loads(data) if is_json and data else None
+
+
+def http_worker(job):
+    url, duration, seed_value, admin_share, polls, admin_credentials, coupon_codes = job
+    customer_session, admin_session = HttpSession(url), HttpSession(url)
+    admin_session.request('POST', '/admin/login', form=admin_credentials)
+    recorder = Recorder()
+
+    def send(route, method, path, json=None, admin=False):
+        session = admin_session if admin else customer_session
+        return recorder.timed(route, lambda: session.request(method, path, json_body=json))
+
+    run_journeys(send, random.Random(seed_value), deadline=time.perf_counter() + duration,
+                 admin_share=admin_share, polls=polls, coupon_codes=coupon_codes)
+    return recorder.samples
+
+
+def run_http(args):
+    from config import Config
+    credentials = {'username': Config.ADMIN_USERNAME, 'password': Config.ADMIN_PASSWORD}
+    coupon_codes = sample_coupon_codes(create_bench_app(args.database)) if args.database else []
+    jobs = [(args.url, args.duration, args.seed + n, args.admin_share, args.polls, credentials, coupon_codes)
+            for n in range(args.processes)]
+    started = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.map(http_worker, jobs)
+    return [sample for samples in results for sample in samples], time.perf_counter() - started
+
+
+# ------------------------------------------------------------------ report
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list"""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """Per-route counts and latency percentiles; percentiles cover successful (< 400) responses only"""
+    counts = defaultdict(int)
+    ok = defaultdict(list)
+    errors = defaultdict(int)
+    for route, seconds, status in samples:
+        counts[route] += 1
+        if status >= 400:
+            errors[route] += 1
+        else:
+            ok[route].append(seconds)
+    summary = {}
+    for route, count in sorted(counts.items()):
+        values = sorted(ok[route])
+        summary[route] = {'count': count, 'errors': errors[route], 'rps': count / elapsed}
+        for q in (50, 95, 99):
+            summary[route][f"p{q}_ms"] = percentile(values, q) * 1000 if values else None
+    return summary
+
+
+def report(summary, samples, elapsed):
+    print(f"{len(samples)} requests in {elapsed:.1f}s ({len(samples) / elapsed:.1f} req/s)")
+    print(f"{'route':<18}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, row in summary.items():
+        latencies = ''.join(f"{row[key]:>9.2f}" if row[key] is not None else f"{'-':>9}"
+                            for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+        print(f"{route:<18}{row['count']:>8}{row['errors']:>8}{row['rps']:>9.1f}{latencies}")
+
+
+def compare(summary, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for route, row in summary.items():
+        before = baseline.get(route)
+        if before and None not in (row['p95_ms'], before['p95_ms']) and \
+                row['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {before['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='Create and fill a benchmark database.')
+    seed_parser.add_argument('--database', required=True, help='SQLAlchemy URL of an empty database.')
+    seed_parser.add_argument('--users', type=int, default=5000)
+    seed_parser.add_argument('--orders', type=int, default=200000)
+    seed_parser.add_argument('--coupons', type=int, default=10000)
+    seed_parser.add_argument('--tickets', type=int, default=2000)
+    seed_parser.add_argument('--seed', type=int, default=42)
+
+    for name, help_text in (('client', 'Replay journeys in-process with the test client.'),
+                            ('http', 'Replay journeys against a running server from several processes.')):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument('--seed', type=int, default=1)
+        sub.add_argument('--admin-share', type=float, default=0.1, help='Fraction of journeys that are admin sessions.')
+        sub.add_argument('--polls', type=int, default=3, help='Order status (or kitchen queue) polls per journey.')
+        sub.add_argument('--save', help='Write per-route results to this JSON file.')
+        sub.add_argument('--compare', help='Baseline JSON from --save to check p95 against.')
+        sub.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown vs baseline (0.2 = 20%%).')
+        if name == 'client':
+            sub.add_argument('--database', required=True)
+            sub.add_argument('--journeys', type=int, default=300)
+            sub.add_argument('--warmup', type=int, default=20)
+        else:
+            sub.add_argument('--url', default='http://127.0.0.1:5000')
+            sub.add_argument('--processes', type=int, default=os.cpu_count())
+            sub.add_argument('--duration', type=float, default=30, help='Seconds each process keeps sending.')
+            sub.add_argument('--database', help='Benchmark database URL, to read coupon codes to check.')
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        seed(create_bench_app(args.database), args.users, args.orders, args.coupons, args.tickets, seed_value=args.seed)
+        return
+
+    samples, elapsed = run_client(args) if args.command == 'client' else run_http(args)
+    summary = summarize(samples, elapsed)
+    report(summary, samples, elapsed)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(summary, f, indent=2)
+    failed = [route for route, row in summary.items() if row['errors']]
+    for route in failed:
+        print(f"ERRORS {route}: {summary[route]['errors']} of {summary[route]['count']} responses failed")
+    if args.compare and not compare(summary, args.compare, args.tolerance):
+        sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
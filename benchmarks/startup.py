@@ -0,0 +1,82 @@
+"""Worker startup benchmark.
+
+Spawns fresh interpreters and times what a new gunicorn worker pays before
+it can serve: importing the app module, create_app(), and the first
+request. Run from the project root against a database that already has
+its schema (`flask db create`):
+
+    python benchmarks/startup.py --runs 10 --path /api/check_coupon
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+application = app_module.create_app()
+t2 = time.perf_counter()
+client = application.test_client()
+method, path = sys.argv[1], sys.argv[2]
+response = client.open(path, method=method, json={} if method == 'POST' else None)
+t3 = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'status': response.status_code,
+    'modules': len(sys.modules),
+    'numpy_loaded': 'numpy.core' in sys.modules or 'numpy._core' in sys.modules,
+}))
+"""
+
+
+def run_probe(method, path):
+    out = subprocess.run([sys.executable, '-c', PROBE, method, path], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def top_imports(count):
+    """Slowest top-level imports by cumulative time, from -X importtime"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace('import time:', '|').split('|')]
+        rows.append((int(cumulative_us), name))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/api/check_coupon', help='First request path.')
+    parser.add_argument('--method', default='POST')
+    parser.add_argument('--top', type=int, default=10, help='Show the N slowest imports (0 to skip).')
+    args = parser.parse_args()
+
+    results = [run_probe(args.method, args.path) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts, first request {args.method} {args.path} -> {results[-1]['status']}")
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms'):
+        values = [r[key] for r in results]
+        print(f"  {key:<17} median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}")
+    print(f"  modules loaded    {results[-1]['modules']} (numpy loaded: {results[-1]['numpy_loaded']})")
+
+    if args.top:
+        print('slowest imports (cumulative ms):')
+        for cumulative_us, name in top_imports(args.top):
+            print(f"  {cumulative_us / 1000:8.1f}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+import csv
+import io
+import json
+import logging
+import math
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import MenuItem, CatalogVersion
+from config import MENU_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ITEM_FIELDS = ('name', 'section', 'price', 'emoji', 'category', 'description', 'prep_minutes', 'is_available')
+
+catalog_cli = AppGroup('catalog', help='Menu catalog management.')
+
+
+class CatalogError(ValueError):
+    """Raised when an import contains invalid rows; `errors` lists them"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid catalog row(s)")
+        self.errors = errors
+
+
+class CatalogConflict(ValueError):
+    """Raised when concurrent imports keep publishing the same version number"""
+
+
+# Attempts at publishing before giving up to a concurrent import
+PUBLISH_ATTEMPTS = 3
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() not in ('0', 'false', 'no', 'n', '')
+    return bool(value)
+
+
+def validate_items(rows):
+    """Normalise and check import rows; raises CatalogError listing every bad row"""
+    if not isinstance(rows, list):
+        raise CatalogError([{'row': None, 'name': '', 'errors': ['items must be a list of rows']}])
+    items, errors, seen = [], [], set()
+    for index, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'name': '', 'errors': ['row must be an object with item fields']})
+            continue
+        name = str(row.get('name') or '').strip()
+        section = str(row.get('section') or '').strip()
+        problems = []
+        if not name:
+            problems.append('name is required')
+        elif name in seen:
+            problems.append('duplicate name')
+        if not section:
+            problems.append('section is required')
+        try:
+            price = float(row.get('price'))
+            if not math.isfinite(price):
+                problems.append('price must be a finite number')
+            elif price < 0:
+                problems.append('price must not be negative')
+        except (TypeError, ValueError):
+            price = None
+            problems.append('price must be a number')
+        try:
+            prep_minutes = int(row.get('prep_minutes') or 0)
+            if prep_minutes < 0:
+                problems.append('prep_minutes must not be negative')
+        except (TypeError, ValueError):
+            prep_minutes = None
+            problems.append('prep_minutes must be a whole number')
+
+        if problems:
+            errors.append({'row': index, 'name': name, 'errors': problems})
+            continue
+        seen.add(name)
+        items.append({
+            'name': name,
+            'section': section,
+            'price': price,
+            'emoji': str(row.get('emoji') or '').strip(),
+            'category': str(row.get('category') or '').strip() or None,
+            'description': str(row.get('description') or '').strip() or None,
+            'prep_minutes': prep_minutes,
+            'is_available': _as_bool(row.get('is_available', True)),
+            'sort_order': index,
+        })
+    if errors:
+        raise CatalogError(errors)
+    return items
+
+
+def parse_catalog(text, fmt):
+    """Rows from CSV text or JSON (a list of items, or {section: [items]} like MENU_CONFIG)"""
+    if fmt == 'csv':
+        return list(csv.DictReader(io.StringIO(text)))
+    data = json.loads(text)
+    if isinstance(data, dict):
+        # Anything that isn't a list of objects is passed through for validate_items to report
+        return [dict(item, section=section) if isinstance(item, dict) else item
+                for section, items in data.items()
+                for item in (items if isinstance(items, list) else [items])]
+    return data
+
+
+def build_snapshot(items):
+    """Menu as served: available items grouped by section, in MENU_CONFIG's shape"""
+    menu = {}
+    for item in sorted(items, key=lambda i: i.sort_order):
+        if item.is_available:
+            menu.setdefault(item.section, []).append({
+                'name': item.name,
+                'price': item.price,
+                'emoji': item.emoji,
+                'category': item.category,
+                'description': item.description,
+                'prep_minutes': item.prep_minutes,
+            })
+    return menu
+
+
+def import_catalog(rows, replace=False, note=None, actor_id=None):
+    """Validate and upsert menu items, publishing a new catalog version.
+
+    Everything happens in one transaction: rows are matched by name,
+    changed rows are stamped with the new version and, with `replace`,
+    items missing from the import are marked unavailable. Returns the new
+    CatalogVersion. Two imports at once compute the same next version; the
+    one that loses on the primary key is retried on top of the winner's
+    catalog, and CatalogConflict is raised if that keeps happening.
+    """
+    items = validate_items(rows)
+    for attempt in range(PUBLISH_ATTEMPTS):
+        try:
+            return _publish(items, replace, note, actor_id)
+        except IntegrityError:
+            logger.warning(f"Catalog version clash with a concurrent import (attempt {attempt + 1})")
+    raise CatalogConflict('Another catalog import is in progress; try again')
+
+
+def _publish(items, replace, note, actor_id):
+    """One attempt at import_catalog's transaction"""
+    try:
+        current = db.session.query(db.func.max(CatalogVersion.version)).scalar() or 0
+        version = current + 1
+        existing = {item.name: item for item in MenuItem.query.all()}
+
+        for data in items:
+            item = existing.get(data['name'])
+            if item is None:
+                item = MenuItem(catalog_version=version, **data)
+                db.session.add(item)
+                existing[item.name] = item
+            elif any(getattr(item, field) != data[field] for field in data):
+                for field, value in data.items():
+                    setattr(item, field, value)
+                item.catalog_version = version
+
+        if replace:
+            imported = {data['name'] for data in items}
+            for name, item in existing.items():
+                if name not in imported and item.is_available:
+                    item.is_available = False
+                    item.catalog_version = version
+
+        menu = build_snapshot(existing.values())
+        published = CatalogVersion(
+            version=version,
+            snapshot=json.dumps(menu),
+            item_count=sum(len(section) for section in menu.values()),
+            note=note,
+            created_by=actor_id
+        )
+        db.session.add(published)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Published menu catalog version {version} ({published.item_count} items)")
+    return published
+
+
+class CatalogCache:
+    """The published menu held in memory, refreshed when its version moves.
+
+    Readers get the cached menu; at most once every CATALOG_CHECK_SECONDS a
+    single `max(version)` query checks for a newer catalog, and only then
+    is the snapshot loaded. Without any published version the menu falls
+    back to MENU_CONFIG.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.menu = MENU_CONFIG
+        self.by_name = self._index(MENU_CONFIG)
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _index(menu):
+        return {item['name']: item for items in menu.values() for item in items}
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.checked_at < current_app.config['CATALOG_CHECK_SECONDS']:
+            return
+        with self.lock:
+            if not force and now - self.checked_at < current_app.config['CATALOG_CHECK_SECONDS']:
+                return
+            latest = db.session.query(db.func.max(CatalogVersion.version)).scalar()
+            if latest is not None and latest != self.version:
+                menu = db.session.get(CatalogVersion, latest).get_snapshot()
+                self.menu, self.by_name, self.version = menu, self._index(menu), latest
+                logger.info(f"Loaded menu catalog version {latest}")
+            self.checked_at = now
+
+    def get_menu(self):
+        self.refresh()
+        return self.menu
+
+    def get_item(self, name):
+        self.refresh()
+        return self.by_name.get(name)
+
+
+catalog_cache = CatalogCache()
+
+
+def get_menu():
+    """Current menu, {section: [items]}"""
+    return catalog_cache.get_menu()
+
+
+def get_menu_item(name):
+    """Current menu entry for an item name, or None"""
+    return catalog_cache.get_item(name)
+
+
+@catalog_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--replace', is_flag=True, help='Mark items missing from the file unavailable.')
+@click.option('--note', help='Description stored with the new version.')
+def import_command(path, replace, note):
+    """Import a CSV or JSON menu file as a new catalog version."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    rows = parse_catalog(text, 'csv' if path.lower().endswith('.csv') else 'json')
+    try:
+        published = import_catalog(rows, replace=replace, note=note or path)
+    except CatalogError as e:
+        for error in e.errors:
+            click.echo(f"row {error['row'] or '-'} ({error['name'] or '?'}): {', '.join(error['errors'])}", err=True)
+        raise click.ClickException(str(e))
+    click.echo(f"Published version {published.version} with {published.item_count} items")
+
+
+@catalog_cli.command('seed')
+def seed_command():
+    """Publish MENU_CONFIG as the first catalog version."""
+    if db.session.query(CatalogVersion.version).first():
+        raise click.ClickException('Catalog already has versions; use import instead')
+    published = import_catalog(parse_catalog(json.dumps(MENU_CONFIG), 'json'), note='Seeded from MENU_CONFIG')
+    click.echo(f"Published version {published.version} with {published.item_count} items")
@@ -1,6 +1,7 @@
 import os
 import string
 import random
+import secrets
 from datetime import timedelta
 
 # Environment configuration
@@ -30,32 +31,158 @@ class Config:
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
 
-# Menu configuration with enhanced structure
+    # Schema migration settings
+    MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+    BACKFILL_BATCH_SIZE = 1000  # rows per UPDATE in batched backfills
+    BACKFILL_PAUSE_SECONDS = 0.1  # pause between batches to leave room for live traffic
+
+    # Instrumentation settings (see instrumentation.py)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    # /metrics requires "Authorization: Bearer <token>"; without a token it is only served in debug or testing
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    N_PLUS_ONE_THRESHOLD = 10  # same SELECT this many times in one request is flagged
+    PROFILE_SLOW_REQUESTS_MS = int(os.environ.get('PROFILE_SLOW_REQUESTS_MS', 0))  # 0 disables the sampling profiler
+    PROFILE_SAMPLE_INTERVAL_MS = 5
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+    # Static asset and page cache settings (see assets.py, page_cache.py)
+    ASSET_DIST_DIR = 'dist'  # under static/; written by `flask assets build`
+    ASSET_MAX_AGE = 365 * 24 * 3600  # fingerprinted files never change
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') == '1'
+    PAGE_CACHE_SECONDS = 60
+    PAGE_CACHE_MAX_ENTRIES = 500
+
+    # Template cache settings (see template_cache.py)
+    TEMPLATE_BYTECODE_DIR = os.environ.get('TEMPLATE_BYTECODE_DIR')  # None uses Jinja's per-user temp dir
+    TEMPLATE_PRECOMPILE = os.environ.get('TEMPLATE_PRECOMPILE', '0') == '1'  # compile all at startup (gunicorn --preload)
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+    FRAGMENT_CACHE_SECONDS = 300
+    FRAGMENT_CACHE_MAX_ENTRIES = 1000
+
+    # Search settings (see search.py)
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_PAGE_SIZE = 100
+    SEARCH_MAX_PAGES = 50  # deeper OFFSETs get slow; refine the query instead
+
+    # Support triage settings (see triage.py)
+    TRIAGE_CATEGORY_POINTS = {'payment_issue': 40, 'order_issue': 30, 'other': 10, 'feedback': 0}
+    TRIAGE_PRIORITY_POINTS = {'urgent': 60, 'high': 35, 'medium': 15, 'low': 0}
+    TRIAGE_POINTS_PER_HOUR = 2.0  # waiting keeps raising a ticket
+    TRIAGE_ORDER_VALUE_POINTS = 0.05  # per rupee of the linked order
+    TRIAGE_ORDER_VALUE_MAX = 25
+    TRIAGE_LOYAL_ORDER_POINTS = 1.0  # per order delivered to the same phone
+    TRIAGE_LOYAL_MAX = 15
+    TRIAGE_REPEAT_CONTACT_POINTS = 10  # per other ticket from the same phone in the window
+    TRIAGE_REPEAT_CONTACT_DAYS = 7
+    TRIAGE_REPEAT_CONTACT_MAX = 30
+    TRIAGE_RESCORE_SECONDS = 600  # full reload to pick up customer history changes
+    TRIAGE_METRICS_DAYS = 30
+
+    # Rate limit settings (rules keyed by endpoint or blueprint; see ratelimit.py)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') == '1'
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')  # redis://... when multi-node
+    RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 0))  # X-Forwarded-For hops to trust
+    RATELIMIT_RULES = {
+        'main.check_coupon': {'rate': '10/minute', 'key': 'ip'},
+        'admin.login_admin': {'rate': '5/minute', 'key': 'ip', 'methods': ('POST',)},
+        'delivery.login_delivery': {'rate': '5/minute', 'key': 'ip', 'methods': ('POST',)},
+        'support.create_ticket': {'rate': '3/10minutes', 'key': 'ip', 'methods': ('POST',)},
+        'main.order_status_api': {'rate': '120/minute', 'key': 'ip'},
+        'customer.place_order': {'rate': '5/minute', 'key': 'user'},
+        'customer.spin_wheel': {'rate': '10/minute', 'key': 'user'},
+        'customer': {'rate': '120/minute', 'key': 'user'},
+    }
+
+    # Delivery dispatch settings
+    DISPATCH_INTERVAL_SECONDS = int(os.environ.get('DISPATCH_INTERVAL_SECONDS', 60))
+    DISPATCH_METHOD = os.environ.get('DISPATCH_METHOD', 'greedy')  # greedy, hungarian
+    DISPATCH_MAX_ORDERS_PER_RIDER = 3
+    DISPATCH_WAIT_WEIGHT = 1.0  # cost per minute an order has been waiting
+    DISPATCH_LOAD_WEIGHT = 10.0  # cost per order already on the rider
+
+    # Route batching settings
+    # (lat, lng) from RESTAURANT_LAT/RESTAURANT_LNG; None leaves the depot leg out of route plans
+    RESTAURANT_LOCATION = (
+        (float(os.environ['RESTAURANT_LAT']), float(os.environ['RESTAURANT_LNG']))
+        if os.environ.get('RESTAURANT_LAT') and os.environ.get('RESTAURANT_LNG') else None
+    )
+    ROUTE_CLUSTER_RADIUS_KM = 2.0
+    ROUTE_TIME_WINDOW_MINUTES = 15
+    ROUTE_MAX_DROPS = 4
+
+    # Order tracking settings (see StatusSnapshots in order_status.py)
+    ORDER_STATUS_CACHE_SECONDS = 5  # how stale another worker's change can look
+    ORDER_STATUS_CACHE_MAX_ENTRIES = 20000
+    ORDER_STATUS_MAX_WAIT_SECONDS = 25  # long-poll cap; needs threaded or async workers
+
+    # Delivery ETA settings
+    ETA_PERCENTILE = 80  # promise times most orders can meet
+    ETA_HISTORY_DAYS = 28
+    ETA_HISTORY_MAX_EVENTS = 200000
+    ETA_REFRESH_SECONDS = 300
+    ETA_DEFAULT_DWELL_MINUTES = {
+        'pending': 5,
+        'confirmed': 5,
+        'preparing': 20,
+        'out_for_delivery': 25,
+    }
+
+    # Kitchen display settings
+    KITCHEN_PROMISE_MINUTES = 45  # used when an order has no ETA yet
+    KITCHEN_DELIVERY_LEG_MINUTES = 20  # time to reserve for the ride after cooking
+
+    # Analytics settings
+    ANALYTICS_CACHE_SECONDS = 300
+    ANALYTICS_CHUNK_SIZE = 5000
+    ANALYTICS_MAX_DAYS = 366
+
+    # Demand forecast settings
+    FORECAST_HISTORY_DAYS = 56  # eight weeks of weekday x hour profiles
+    FORECAST_ALPHA = 0.3  # smoothing for the daily level
+    FORECAST_HORIZON_HOURS = 6
+    FORECAST_REFRESH_SECONDS = int(os.environ.get('FORECAST_REFRESH_SECONDS', 300))  # 0 disables the refresh thread
+    FORECAST_LAG_SECONDS = 600  # each refresh re-reads this far back for orders committed late
+
+    # Menu catalog settings
+    CATALOG_CHECK_SECONDS = 5  # how often workers look for a newer catalog version
+    STOCK_CACHE_SECONDS = 10  # staleness allowed for "sold out" badges
+
+    # Loyalty settings
+    LOYALTY_POINTS_PER_RUPEE = 0.1  # points earned per rupee of delivered orders
+    LOYALTY_EXPIRY_DAYS = 180
+    LOYALTY_MAX_REDEEM_SHARE = 0.5  # points (₹1 each) can pay at most this share of an order
+    LOYALTY_BATCH_SIZE = 1000
+
+    # Spin wheel settings
+    SPIN_CAMPAIGN = os.environ.get('SPIN_CAMPAIGN')  # key into SPIN_CAMPAIGNS; None uses SPIN_REWARDS
+    SPIN_COUPON_VALID_DAYS = 30
+
+# Menu configuration with enhanced structure (prep_minutes drives the kitchen queue)
 MENU_CONFIG = {
     "Biryani": [
-        {"name": "Veg Biryani", "price": 110, "emoji": "🍛", "category": "vegetarian", "description": "Aromatic basmati rice with mixed vegetables and spices"},
-        {"name": "Egg Biryani", "price": 150, "emoji": "🍳", "category": "egg", "description": "Flavorful rice with boiled eggs and traditional spices"},
-        {"name": "Chicken Biryani (Half)", "price": 120, "emoji": "🍗", "category": "non-vegetarian", "description": "Half portion of tender chicken biryani"},
-        {"name": "Chicken Biryani (Full)", "price": 200, "emoji": "🍗", "category": "non-vegetarian", "description": "Full portion of succulent chicken biryani"},
-        {"name": "Chicken Fry Biryani", "price": 220, "emoji": "🍗🔥", "category": "non-vegetarian", "description": "Special fried chicken biryani with extra spices"},
-        {"name": "Double Egg Biryani", "price": 170, "emoji": "🍳🍳", "category": "egg", "description": "Biryani with double portion of eggs"},
-        {"name": "Paneer Biryani", "price": 160, "emoji": "🧀", "category": "vegetarian", "description": "Rich paneer biryani with cottage cheese"},
+        {"name": "Veg Biryani", "price": 110, "emoji": "🍛", "category": "vegetarian", "description": "Aromatic basmati rice with mixed vegetables and spices", "prep_minutes": 20},
+        {"name": "Egg Biryani", "price": 150, "emoji": "🍳", "category": "egg", "description": "Flavorful rice with boiled eggs and traditional spices", "prep_minutes": 20},
+        {"name": "Chicken Biryani (Half)", "price": 120, "emoji": "🍗", "category": "non-vegetarian", "description": "Half portion of tender chicken biryani", "prep_minutes": 25},
+        {"name": "Chicken Biryani (Full)", "price": 200, "emoji": "🍗", "category": "non-vegetarian", "description": "Full portion of succulent chicken biryani", "prep_minutes": 25},
+        {"name": "Chicken Fry Biryani", "price": 220, "emoji": "🍗🔥", "category": "non-vegetarian", "description": "Special fried chicken biryani with extra spices", "prep_minutes": 30},
+        {"name": "Double Egg Biryani", "price": 170, "emoji": "🍳🍳", "category": "egg", "description": "Biryani with double portion of eggs", "prep_minutes": 20},
+        {"name": "Paneer Biryani", "price": 160, "emoji": "🧀", "category": "vegetarian", "description": "Rich paneer biryani with cottage cheese", "prep_minutes": 20},
     ],
     "Rolls & Snacks": [
-        {"name": "Veg Roll", "price": 50, "emoji": "🌯", "category": "vegetarian", "description": "Fresh vegetable wrap with chutneys"},
-        {"name": "Egg Roll", "price": 60, "emoji": "🌯🍳", "category": "egg", "description": "Scrambled egg roll with spices"},
-        {"name": "Paneer Roll", "price": 70, "emoji": "🌯🧀", "category": "vegetarian", "description": "Paneer tikka roll with mint chutney"},
-        {"name": "Chicken Roll", "price": 80, "emoji": "🌯🍗", "category": "non-vegetarian", "description": "Chicken tikka roll with special sauce"},
+        {"name": "Veg Roll", "price": 50, "emoji": "🌯", "category": "vegetarian", "description": "Fresh vegetable wrap with chutneys", "prep_minutes": 8},
+        {"name": "Egg Roll", "price": 60, "emoji": "🌯🍳", "category": "egg", "description": "Scrambled egg roll with spices", "prep_minutes": 8},
+        {"name": "Paneer Roll", "price": 70, "emoji": "🌯🧀", "category": "vegetarian", "description": "Paneer tikka roll with mint chutney", "prep_minutes": 10},
+        {"name": "Chicken Roll", "price": 80, "emoji": "🌯🍗", "category": "non-vegetarian", "description": "Chicken tikka roll with special sauce", "prep_minutes": 12},
     ],
     "Chowmein": [
-        {"name": "Veg Chowmein", "price": 70, "emoji": "🍜", "category": "vegetarian", "description": "Stir-fried noodles with fresh vegetables"},
-        {"name": "Egg Chowmein", "price": 80, "emoji": "🍜🍳", "category": "egg", "description": "Noodles with scrambled eggs and vegetables"},
-        {"name": "Chicken Chowmein", "price": 90, "emoji": "🍜🍗", "category": "non-vegetarian", "description": "Chicken chowmein with tender pieces"},
+        {"name": "Veg Chowmein", "price": 70, "emoji": "🍜", "category": "vegetarian", "description": "Stir-fried noodles with fresh vegetables", "prep_minutes": 10},
+        {"name": "Egg Chowmein", "price": 80, "emoji": "🍜🍳", "category": "egg", "description": "Noodles with scrambled eggs and vegetables", "prep_minutes": 10},
+        {"name": "Chicken Chowmein", "price": 90, "emoji": "🍜🍗", "category": "non-vegetarian", "description": "Chicken chowmein with tender pieces", "prep_minutes": 12},
     ],
     "Extras & Drinks": [
-        {"name": "Soft Drink (500 ml)", "price": 35, "emoji": "🥤", "category": "beverage", "description": "Chilled soft drink of your choice"},
-        {"name": "Extra Raita", "price": 10, "emoji": "🥣", "category": "extra", "description": "Cool yogurt-based side dish"},
-        {"name": "Extra Gravy (Salan)", "price": 10, "emoji": "🍼", "category": "extra", "description": "Traditional curry gravy"},
+        {"name": "Soft Drink (500 ml)", "price": 35, "emoji": "🥤", "category": "beverage", "description": "Chilled soft drink of your choice", "prep_minutes": 0},
+        {"name": "Extra Raita", "price": 10, "emoji": "🥣", "category": "extra", "description": "Cool yogurt-based side dish", "prep_minutes": 0},
+        {"name": "Extra Gravy (Salan)", "price": 10, "emoji": "🍼", "category": "extra", "description": "Traditional curry gravy", "prep_minutes": 0},
     ],
 }
 
@@ -65,15 +192,18 @@ SPIN_REWARDS = [
     {"name": "₹20 off", "emoji": "💸", "effect": {"discount": 20}, "weight": 20},
     {"name": "Free Veg Roll", "emoji": "🌯", "effect": {"item": "Veg Roll"}, "weight": 15},
     {"name": "Better luck next time", "emoji": "❌", "effect": None, "weight": 30},
-    {"name": "RARE ★ Free Chicken Biryani", "emoji": "🎉⭐", "effect": {"item": "Chicken Biryani (Full)"}, "weight": 3},
+    {"name": "RARE ★ Free Chicken Biryani", "emoji": "🎉⭐", "effect": {"item": "Chicken Biryani (Full)"}, "weight": 3, "daily_cap": 5},
     {"name": "₹50 off", "emoji": "🔥", "effect": {"discount": 50}, "weight": 5},
-    {"name": "Free Paneer Roll", "emoji": "🧀", "effect": {"item": "Paneer Roll"}, "weight": 2},
+    {"name": "Free Paneer Roll", "emoji": "🧀", "effect": {"item": "Paneer Roll"}, "weight": 2, "daily_cap": 10},
 ]
 
+# Campaign-specific wheels, same shape as SPIN_REWARDS; pick one with SPIN_CAMPAIGN
+SPIN_CAMPAIGNS = {}
+
 def generate_coupon_code():
     """Generate a secure 15-digit alphanumeric coupon code"""
     characters = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(characters) for _ in range(15))
+    return ''.join(secrets.choice(characters) for _ in range(15))
 
 def generate_order_id():
     """Generate unique order ID"""
@@ -0,0 +1,278 @@
+import csv
+import io
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, func
+
+from extensions import db
+from models import User, Order, Coupon, SupportTicket
+from config import MENU_CONFIG, SPIN_REWARDS
+
+logger = logging.getLogger(__name__)
+
+datagen_cli = AppGroup('datagen', help='Synthetic data for scale testing.')
+
+# Relative order volume per hour of day: lunch and dinner peaks, quiet nights
+HOURLY_DEMAND = (1, 0.5, 0.2, 0.1, 0.1, 0.2, 0.5, 1, 2, 3, 4, 6,
+                 10, 12, 9, 5, 4, 5, 7, 11, 13, 12, 8, 3)
+# Monday..Sunday
+WEEKDAY_DEMAND = (0.85, 0.8, 0.85, 0.9, 1.1, 1.3, 1.25)
+# How often a section's items are picked as mains; add-ons are the beverage/extra categories
+SECTION_POPULARITY = {'Biryani': 5, 'Rolls & Snacks': 3, 'Chowmein': 2}
+ADDON_CATEGORIES = ('beverage', 'extra')
+
+FIRST_NAMES = ('Aarav', 'Vivaan', 'Aditya', 'Ananya', 'Diya', 'Ishaan', 'Kavya', 'Rohan', 'Saanvi', 'Arjun',
+               'Priya', 'Rahul', 'Sneha', 'Vikram', 'Neha', 'Imran', 'Fatima', 'Rajesh', 'Pooja', 'Sameer')
+LAST_NAMES = ('Sharma', 'Verma', 'Gupta', 'Singh', 'Kumar', 'Das', 'Khan', 'Mishra', 'Patel', 'Reddy')
+LOCALITIES = ('Kankarbagh', 'Boring Road', 'Rajendra Nagar', 'Patliputra', 'Bailey Road', 'Ashok Rajpath',
+              'Danapur', 'Phulwari', 'Anisabad', 'Gardanibagh')
+TICKET_SUBJECTS = {
+    'order_issue': ('Order arrived late', 'Missing item in my order', 'Wrong item delivered', 'Food was cold'),
+    'payment_issue': ('UPI payment debited twice', 'Refund not received', 'Payment failed but order placed'),
+    'feedback': ('Loved the biryani', 'Portion size feedback', 'Delivery partner was polite'),
+    'other': ('Bulk order enquiry', 'Change my phone number', 'Coupon not working'),
+}
+
+
+def _weighted(rng, values, weights):
+    """Sampler over `values` with precomputed cumulative weights"""
+    cumulative = list(accumulate(weights))
+    return lambda: rng.choices(values, cum_weights=cumulative)[0]
+
+
+class DataGenerator:
+    """Deterministic row generator: the same seed and end date give the same rows.
+
+    Order timestamps follow HOURLY_DEMAND and WEEKDAY_DEMAND over the
+    `days` before `end`; baskets draw mains by SECTION_POPULARITY with
+    optional drinks and extras. Rows are plain dicts for Core inserts.
+    """
+
+    def __init__(self, seed=42, days=180, end=None, prefix='SD'):
+        self.rng = random.Random(seed)
+        self.end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.days = days
+        self.prefix = prefix
+        rng = self.rng
+
+        days_back = list(range(days))
+        self.pick_day = _weighted(rng, days_back,
+                                  [WEEKDAY_DEMAND[(self.end - timedelta(days=d + 1)).weekday()] for d in days_back])
+        self.pick_hour = _weighted(rng, list(range(24)), HOURLY_DEMAND)
+
+        items = [(section, item) for section, section_items in MENU_CONFIG.items() for item in section_items]
+        mains = [item for section, item in items if item.get('category') not in ADDON_CATEGORIES]
+        self.addons = [item for section, item in items if item.get('category') in ADDON_CATEGORIES]
+        self.pick_main = _weighted(rng, mains, [SECTION_POPULARITY.get(section, 1) for section, item in items
+                                                if item.get('category') not in ADDON_CATEGORIES])
+        self.rewards = [reward for reward in SPIN_REWARDS if reward.get('effect')]
+        self.pick_reward = _weighted(rng, self.rewards, [reward['weight'] for reward in self.rewards])
+
+    def timestamp(self):
+        day = self.end - timedelta(days=self.pick_day() + 1)
+        return day + timedelta(hours=self.pick_hour(), seconds=self.rng.randrange(3600))
+
+    def person(self):
+        rng = self.rng
+        return (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"{rng.choice('6789')}{rng.randrange(10 ** 9):09d}",
+                f"{rng.randint(1, 400)}, {rng.choice(LOCALITIES)}, Patna")
+
+    def basket(self):
+        rng = self.rng
+        lines = {}
+        for _ in range(rng.choices((1, 2, 3, 4), (50, 30, 15, 5))[0]):
+            item = self.pick_main()
+            lines.setdefault(item['name'], {'name': item['name'], 'price': item['price'],
+                                            'emoji': item.get('emoji', ''), 'quantity': 0})['quantity'] += 1
+        for item in self.addons:
+            if rng.random() < 0.15:
+                lines[item['name']] = {'name': item['name'], 'price': item['price'], 'emoji': item.get('emoji', ''),
+                                       'quantity': rng.choice((1, 1, 2))}
+        return list(lines.values())
+
+    def users(self, count, password_hash, start=0):
+        for i in range(start, start + count):
+            name, phone, address = self.person()
+            created = self.timestamp()
+            yield {
+                'username': f"{self.prefix.lower()}user{i}", 'password_hash': password_hash, 'role': 'customer',
+                'full_name': name, 'phone': phone, 'email': f"{self.prefix.lower()}user{i}@example.com",
+                'addresses': json.dumps([address]), 'loyalty_points': 0, 'is_active': True, 'is_banned': False,
+                'created_at': created, 'updated_at': created,
+            }
+
+    def orders(self, count, user_ids, start=0, account_share=0.6):
+        rng = self.rng
+        for i in range(start, start + count):
+            lines = self.basket()
+            subtotal = sum(line['price'] * line['quantity'] for line in lines)
+            created = self.timestamp()
+            age = self.end - created
+            if age > timedelta(hours=3):
+                status = 'cancelled' if rng.random() < 0.06 else 'delivered'
+            else:
+                status = rng.choice(('pending', 'confirmed', 'preparing', 'out_for_delivery', 'delivered'))
+            name, phone, address = self.person()
+            finished = created + timedelta(minutes=rng.randint(25, 60))
+            yield {
+                'order_id': f"{self.prefix}{i:09d}",
+                'user_id': rng.choice(user_ids) if user_ids and rng.random() < account_share else None,
+                'customer_name': name, 'customer_phone': phone, 'customer_address': address,
+                'items': json.dumps(lines), 'subtotal': subtotal, 'discount': 0, 'total': subtotal,
+                'status': status, 'payment_method': rng.choice(('cash', 'upi', 'upi')),
+                'loyalty_points_earned': 0, 'loyalty_points_used': 0,
+                'estimated_delivery': created + timedelta(minutes=35),
+                'spin_used': status == 'delivered' and rng.random() < 0.7,
+                'created_at': created, 'updated_at': finished if status in ('delivered', 'cancelled') else created,
+            }
+
+    def coupons(self, count, order_count, start=0, used_share=0.4):
+        rng = self.rng
+        for i in range(start, start + count):
+            reward = self.pick_reward()
+            created = self.timestamp()
+            used = order_count and rng.random() < used_share
+            yield {
+                'code': f"{self.prefix}{i:013d}", 'reward_name': reward['name'],
+                'effect': json.dumps(reward['effect']), 'is_used': bool(used),
+                'used_by_order_id': f"{self.prefix}{rng.randrange(order_count):09d}" if used else None,
+                'expires_at': created + timedelta(days=30), 'created_at': created,
+            }
+
+    def tickets(self, count, order_count, user_ids, start=0):
+        rng = self.rng
+        for i in range(start, start + count):
+            category = rng.choices(tuple(TICKET_SUBJECTS), (50, 20, 20, 10))[0]
+            subject = rng.choice(TICKET_SUBJECTS[category])
+            created = self.timestamp()
+            status = rng.choices(('open', 'in_progress', 'resolved', 'closed'), (15, 10, 45, 30))[0]
+            if self.end - created > timedelta(days=7) and status in ('open', 'in_progress'):
+                status = 'closed'
+            name, phone, address = self.person()
+            resolved_at = created + timedelta(hours=rng.randint(1, 72)) if status in ('resolved', 'closed') else None
+            first_response_at = None
+            if status != 'open':
+                first_response_at = created + timedelta(minutes=rng.randint(5, 240))
+                if resolved_at:
+                    first_response_at = min(first_response_at, resolved_at)
+            yield {
+                'ticket_id': f"TK{self.prefix}{i:08d}",
+                'user_id': rng.choice(user_ids) if user_ids and rng.random() < 0.5 else None,
+                'customer_name': name, 'customer_phone': phone,
+                'order_id': f"{self.prefix}{rng.randrange(order_count):09d}" if order_count and category != 'other' else None,
+                'category': category, 'subject': subject, 'description': f"{subject}. Generated ticket {i}.",
+                'status': status, 'priority': rng.choices(('low', 'medium', 'high', 'urgent'), (30, 45, 20, 5))[0],
+                'first_response_at': first_response_at, 'resolved_at': resolved_at,
+                'created_at': created, 'updated_at': created,
+            }
+
+
+def _copy_rows(connection, table, columns, rows):
+    """COPY a batch into Postgres as CSV (psycopg2 or psycopg 3)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def bulk_insert(table, rows, batch_size=10000, use_copy=None):
+    """Insert an iterable of row dicts in batches, committing each; returns the row count.
+
+    Uses COPY on Postgres (None picks it automatically) and executemany
+    elsewhere, so memory stays bounded by one batch.
+    """
+    connection = db.session.connection()
+    if use_copy is None:
+        use_copy = connection.dialect.name == 'postgresql'
+    total, batch = 0, []
+
+    def flush():
+        if use_copy:
+            _copy_rows(db.session.connection(), table, list(batch[0]), batch)
+        else:
+            db.session.execute(table.insert(), batch)
+        db.session.commit()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+            total += len(batch)
+            batch = []
+            logger.info(f"{table.name}: {total} rows")
+    if batch:
+        flush()
+        total += len(batch)
+    return total
+
+
+def generate(users=1000, orders=10000, coupons=1000, tickets=500, seed=42, days=180, end=None,
+             prefix='SD', batch_size=10000, use_copy=None):
+    """Generate a dataset into the current database; returns row counts per table"""
+    from auth import hash_password
+
+    generator = DataGenerator(seed=seed, days=days, end=end, prefix=prefix)
+    counts = {}
+    started = time.perf_counter()
+    username_pattern = f"{prefix.lower()}user%"
+    existing_users = db.session.scalar(select(func.count(User.id)).where(User.username.like(username_pattern)))
+    existing_orders = db.session.scalar(select(func.count(Order.id)).where(Order.order_id.like(f"{prefix}%")))
+    existing_coupons = db.session.scalar(select(func.count(Coupon.id)).where(Coupon.code.like(f"{prefix}%")))
+    existing_tickets = db.session.scalar(
+        select(func.count(SupportTicket.id)).where(SupportTicket.ticket_id.like(f"TK{prefix}%")))
+
+    # One bcrypt hash for every generated account; hashing millions would take hours
+    password_hash = hash_password(f"{prefix.lower()}-password")
+    counts['users'] = bulk_insert(User.__table__, generator.users(users, password_hash, existing_users),
+                                  batch_size, use_copy)
+    user_ids = db.session.scalars(
+        select(User.id).where(User.username.like(username_pattern)).order_by(User.id)).all()
+    counts['orders'] = bulk_insert(Order.__table__, generator.orders(orders, user_ids, existing_orders),
+                                   batch_size, use_copy)
+    order_count = existing_orders + orders
+    counts['coupons'] = bulk_insert(Coupon.__table__, generator.coupons(coupons, order_count, existing_coupons),
+                                    batch_size, use_copy)
+    counts['tickets'] = bulk_insert(SupportTicket.__table__,
+                                    generator.tickets(tickets, order_count, user_ids, existing_tickets),
+                                    batch_size, use_copy)
+    logger.info(f"Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s")
+    return counts
+
+
+@datagen_cli.command('generate')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--orders', default=10000, show_default=True)
+@click.option('--coupons', default=1000, show_default=True)
+@click.option('--tickets', default=500, show_default=True)
+@click.option('--seed', default=42, show_default=True, help='Same seed and --end give the same data.')
+@click.option('--days', default=180, show_default=True, help='Spread orders over this many days before --end.')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day of data, exclusive (default today).')
+@click.option('--prefix', default='SD', show_default=True, help='Prefix for generated order IDs and usernames.')
+@click.option('--batch-size', default=10000, show_default=True)
+@click.option('--no-copy', is_flag=True, help='Use executemany even on Postgres.')
+def generate_command(users, orders, coupons, tickets, seed, days, end, prefix, batch_size, no_copy):
+    """Bulk-insert synthetic users, orders, coupons and support tickets."""
+    started = time.perf_counter()
+    counts = generate(users, orders, coupons, tickets, seed=seed, days=days, end=end, prefix=prefix,
+                      batch_size=batch_size, use_copy=False if no_copy else None)
+    elapsed = time.perf_counter() - started
+    click.echo(', '.join(f"{count} {table}" for table, count in counts.items())
+               + f" in {elapsed:.1f}s ({sum(counts.values()) / elapsed:.0f} rows/s)")
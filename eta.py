@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db, lazy_import
+from models import Order, OrderStatusEvent
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+# Statuses an order passes through on its way to the customer, in order
+PIPELINE = ('pending', 'confirmed', 'preparing', 'out_for_delivery')
+STAGE_INDEX = {status: idx for idx, status in enumerate(PIPELINE)}
+HOURS = 24
+
+eta_cli = AppGroup('eta', help='Delivery ETA predictor.')
+
+
+def dwell_percentiles(statuses, entered_at, left_at, q):
+    """Per hour-of-day, per-status dwell time percentile in seconds.
+
+    The arrays describe one stay each: its pipeline index and when it was
+    entered and left (epoch seconds). Returns a (24, len(PIPELINE)) array with NaN where
+    a bucket has no history.
+    """
+    dwell = left_at - entered_at
+    keep = (statuses >= 0) & (dwell >= 0)
+    dwell, statuses, entered_at = dwell[keep], statuses[keep], entered_at[keep]
+
+    result = np.full(HOURS * len(PIPELINE), np.nan)
+    if dwell.size == 0:
+        return result.reshape(HOURS, len(PIPELINE))
+
+    hours = ((entered_at // 3600) % HOURS).astype(np.int64)
+    keys = hours * len(PIPELINE) + statuses
+    order = np.lexsort((dwell, keys))
+    keys, dwell = keys[order], dwell[order]
+
+    counts = np.bincount(keys, minlength=result.size)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    ranks = np.floor((q / 100.0) * (counts[present] - 1)).astype(np.int64)
+    result[present] = dwell[starts[present] + ranks]
+    return result.reshape(HOURS, len(PIPELINE))
+
+
+def stays_from_events(order_ids, order_created, from_statuses, event_times):
+    """Turn status events (sorted by order, then time) into stays.
+
+    A stay in `from_status` starts at the previous event of the same order,
+    or at the order's creation time for its first event.
+    """
+    n = order_ids.size
+    entered = order_created.copy()
+    if n > 1:
+        same_order = order_ids[1:] == order_ids[:-1]
+        entered[1:] = np.where(same_order, event_times[:-1], order_created[1:])
+    statuses = np.array([STAGE_INDEX.get(s, -1) for s in from_statuses], dtype=np.int64)
+    return statuses, entered, event_times
+
+
+def remaining_table(percentiles, defaults):
+    """Seconds left until delivery for each (hour, status) cell.
+
+    Empty cells fall back to the status's percentile across all hours, then
+    to the configured default. The result is a suffix sum along the
+    pipeline, so each lookup is a single array read.
+    """
+    table = percentiles.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        overall = np.nanmedian(table, axis=0)
+    for idx, status in enumerate(PIPELINE):
+        fallback = overall[idx] if not np.isnan(overall[idx]) else defaults[status] * 60.0
+        column = table[:, idx]
+        column[np.isnan(column)] = fallback
+    return np.cumsum(table[:, ::-1], axis=1)[:, ::-1]
+
+
+class EtaModel:
+    """Cached remaining-time table, rebuilt from history when stale"""
+
+    def __init__(self):
+        self.table = None
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    def rebuild(self):
+        config = current_app.config
+        since = datetime.utcnow() - timedelta(days=config['ETA_HISTORY_DAYS'])
+        rows = db.session.query(
+            OrderStatusEvent.order_id, Order.created_at, OrderStatusEvent.from_status, OrderStatusEvent.created_at
+        ).join(Order, Order.id == OrderStatusEvent.order_id).filter(
+            OrderStatusEvent.created_at >= since
+        ).order_by(OrderStatusEvent.created_at.desc()).limit(config['ETA_HISTORY_MAX_EVENTS']).all()
+        rows.sort(key=lambda r: (r[0], r[3]))
+
+        order_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        created = np.array([r[1].timestamp() for r in rows], dtype=np.float64)
+        from_statuses = [r[2] for r in rows]
+        times = np.array([r[3].timestamp() for r in rows], dtype=np.float64)
+
+        stays = stays_from_events(order_ids, created, from_statuses, times)
+        percentiles = dwell_percentiles(*stays, q=config['ETA_PERCENTILE'])
+        self.table = remaining_table(percentiles, config['ETA_DEFAULT_DWELL_MINUTES'])
+        self.built_at = time.monotonic()
+        logger.info(f"ETA model rebuilt from {len(rows)} status events")
+
+    def get_table(self):
+        if self.table is None or time.monotonic() - self.built_at > current_app.config['ETA_REFRESH_SECONDS']:
+            with self.lock:
+                if self.table is None or time.monotonic() - self.built_at > current_app.config['ETA_REFRESH_SECONDS']:
+                    self.rebuild()
+        return self.table
+
+    def estimate(self, status, at):
+        """Expected delivery time for an order that entered `status` at `at`"""
+        idx = STAGE_INDEX.get(status)
+        if idx is None:
+            return None
+        seconds = self.get_table()[int(at.timestamp() // 3600) % HOURS, idx]
+        return at + timedelta(seconds=float(seconds))
+
+
+eta_model = EtaModel()
+
+
+def estimate_delivery(status, at=None):
+    """Expected delivery time, or None for finished/cancelled orders"""
+    return eta_model.estimate(status, at or datetime.utcnow())
+
+
+@eta_cli.command('show')
+def show_command():
+    """Print minutes-to-delivery per hour of day and status."""
+    eta_model.rebuild()
+    click.echo('hour  ' + '  '.join(f"{status:>16}" for status in PIPELINE))
+    for hour, row in enumerate(eta_model.table):
+        click.echo(f"{hour:>4}  " + '  '.join(f"{seconds / 60:>16.1f}" for seconds in row))
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+
+from extensions import db
+from models import User, Order, SupportTicket
+
+# Exportable tables and their columns (password hashes never leave the database)
+EXPORTS = {
+    'orders': (Order, (
+        'id', 'order_id', 'user_id', 'customer_name', 'customer_phone', 'customer_address', 'items',
+        'subtotal', 'discount', 'total', 'status', 'payment_method', 'coupon_code',
+        'loyalty_points_earned', 'loyalty_points_used', 'delivery_person_id', 'estimated_delivery',
+        'rating', 'feedback', 'spin_used', 'created_at', 'updated_at'
+    )),
+    'users': (User, (
+        'id', 'username', 'role', 'full_name', 'phone', 'email', 'loyalty_points',
+        'is_active', 'is_banned', 'created_at', 'updated_at'
+    )),
+    'tickets': (SupportTicket, (
+        'id', 'ticket_id', 'user_id', 'customer_name', 'customer_phone', 'customer_email', 'order_id',
+        'category', 'subject', 'description', 'status', 'priority', 'admin_notes', 'first_response_at', 'resolved_at',
+        'created_at', 'updated_at'
+    )),
+}
+
+# Customer contact details, left out of analytics extracts
+PERSONAL_COLUMNS = ('customer_name', 'customer_phone', 'customer_address', 'customer_email')
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+export_cli = AppGroup('export', help='Streaming CSV/NDJSON exports.')
+
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(kind, start=None, end=None, status=None, batch_size=1000, columns=None):
+    """Yield export rows as tuples, fetched `batch_size` at a time.
+
+    `start`/`end` filter on created_at as a half-open range; `status` filters
+    orders and tickets by status and users by role. `columns` picks a
+    subset of the export's columns. Results are streamed with a
+    server-side cursor where the driver supports one.
+    """
+    model, default_columns = EXPORTS[kind]
+    columns = columns or default_columns
+    stmt = select(*[getattr(model, name) for name in columns]).order_by(model.id)
+    if start:
+        stmt = stmt.where(model.created_at >= start)
+    if end:
+        stmt = stmt.where(model.created_at < end)
+    if status:
+        stmt = stmt.where((User.role if model is User else model.status) == status)
+
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for row in result:
+        yield tuple(_serialize(value) for value in row)
+
+
+def csv_chunks(columns, rows, rows_per_chunk=500):
+    """Encode rows as CSV text, a few hundred rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(columns, rows, rows_per_chunk=500):
+    """Encode rows as newline-delimited JSON objects"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        if len(lines) >= rows_per_chunk:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of text chunks without buffering the whole output"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(kind, fmt='csv', compress=True, **filters):
+    """Byte chunks for a full export of `kind` in `fmt`"""
+    columns = EXPORTS[kind][1]
+    encode = csv_chunks if fmt == 'csv' else ndjson_chunks
+    chunks = encode(columns, iter_rows(kind, **filters))
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
+
+
+def export_filename(kind, fmt, compress):
+    extension = FORMATS[fmt][1] + ('.gz' if compress else '')
+    return f"{kind}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{extension}"
+
+
+def parse_date_range(start, end):
+    """Turn optional YYYY-MM-DD strings into a half-open datetime range (end day inclusive)"""
+    start_at = datetime.fromisoformat(start) if start else None
+    end_at = datetime.fromisoformat(end) + timedelta(days=1) if end else None
+    return start_at, end_at
+
+
+@export_cli.command('run')
+@click.argument('kind', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv', show_default=True)
+@click.option('--start', help='First day (YYYY-MM-DD).')
+@click.option('--end', help='Last day, inclusive (YYYY-MM-DD).')
+@click.option('--status', help='Status filter (role for users).')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Output file; gzip if it ends in .gz.')
+def run_command(kind, fmt, start, end, status, output):
+    """Stream a table to a file (or stdout) in constant memory."""
+    start_at, end_at = parse_date_range(start, end)
+    compress = bool(output and output.endswith('.gz'))
+    chunks = stream_export(kind, fmt, compress=compress, start=start_at, end=end_at, status=status)
+    stream = open(output, 'wb') if output else click.get_binary_stream('stdout')
+    try:
+        for chunk in chunks:
+            stream.write(chunk)
+    finally:
+        if output:
+            stream.close()
@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import lazy_import
+from analytics import load_order_columns, EPOCH
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+forecast_cli = AppGroup('forecast', help='Per-item demand forecast.')
+
+
+class DemandProfiles:
+    """Quantities per item by (weekday, hour) slot and by day since `start_day`"""
+
+    def __init__(self, start_day, built_on):
+        self.start_day = start_day
+        self.built_on = built_on
+        self.items = {}
+        self.grid = np.zeros((0, 7, 24))
+        self.daily = np.zeros((0, (built_on - start_day).days + 1))
+
+    def copy(self):
+        profiles = DemandProfiles(self.start_day, self.built_on)
+        profiles.items = dict(self.items)
+        profiles.grid = self.grid.copy()
+        profiles.daily = self.daily.copy()
+        return profiles
+
+    def _rows(self, names):
+        """Row index per item name, growing the arrays for unseen items"""
+        for name in names:
+            if name not in self.items:
+                self.items[name] = len(self.items)
+        missing = len(self.items) - self.grid.shape[0]
+        if missing > 0:
+            self.grid = np.concatenate([self.grid, np.zeros((missing, 7, 24))])
+            self.daily = np.concatenate([self.daily, np.zeros((missing, self.daily.shape[1]))])
+        return np.array([self.items[name] for name in names], dtype=np.int64)
+
+    def add(self, columns, include):
+        """Add the line items of the orders selected by the boolean mask `include`"""
+        lines = include[columns.line_order]
+        if not lines.any():
+            return
+        rows = self._rows(columns.item_names)[columns.line_item[lines]]
+        quantities = columns.line_qty[lines]
+        seconds = columns.created_at[columns.line_order[lines]]
+        day_number = (seconds // 86400).astype(np.int64)
+        weekday = (day_number + 3) % 7  # 1970-01-01 was a Thursday
+        hour = ((seconds % 86400) // 3600).astype(np.int64)
+        np.add.at(self.grid, (rows, weekday, hour), quantities)
+
+        day_index = day_number - (self.start_day - EPOCH.date()).days
+        if day_index.max() >= self.daily.shape[1]:
+            grow = day_index.max() + 1 - self.daily.shape[1]
+            self.daily = np.concatenate([self.daily, np.zeros((self.daily.shape[0], grow))], axis=1)
+        np.add.at(self.daily, (rows, day_index), quantities)
+
+    def level(self, alpha):
+        """Exponentially smoothed daily quantity per item over completed days"""
+        complete = self.daily[:, :-1]
+        if complete.shape[1] == 0:
+            return np.zeros(self.daily.shape[0])
+        weights = alpha * (1 - alpha) ** np.arange(complete.shape[1] - 1, -1, -1)
+        weights[0] = (1 - alpha) ** (complete.shape[1] - 1)  # oldest day carries the initial level
+        return complete @ weights
+
+
+class DemandForecaster:
+    """Per-item demand forecast from day-of-week x hour profiles.
+
+    For every item we keep quantities per (weekday, hour) slot and per day
+    over the history window. The day level is an exponentially smoothed
+    daily total; a slot's forecast is that level spread over the week by
+    the item's share of volume in the slot.
+
+    Profiles are refreshed by a background thread every
+    FORECAST_REFRESH_SECONDS (started by the first request), never by the
+    request reading them. Each refresh re-reads the last
+    FORECAST_LAG_SECONDS before the previous one as well, so orders that
+    commit after a refresh with an earlier created_at are still counted;
+    order ids already counted in that overlap are skipped. The history is
+    rebuilt from scratch once a day so the window keeps sliding. Refreshes
+    work on a copy that is swapped in at the end, so readers never wait
+    on the database.
+    """
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()  # one refresh at a time
+        self.profiles = None
+        self.refreshed_at = None
+        self.recent = {}  # order id -> created_at seconds, for orders inside the overlap
+        self.thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        interval = app.config['FORECAST_REFRESH_SECONDS']
+        if not interval:
+            return
+
+        @app.before_request
+        def start_forecast_refresh():
+            if self.thread is None:
+                self.start(app, interval)
+
+    def start(self, app, interval):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, args=(app, interval),
+                                               name='forecast-refresh', daemon=True)
+                self.thread.start()
+
+    def _run(self, app, interval):
+        while True:
+            with app.app_context():
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("Demand forecast refresh failed")
+            time.sleep(interval)
+
+    def refresh(self, now=None):
+        """Fold in orders placed since the last refresh (full rebuild on a new day)"""
+        config = current_app.config
+        now = now or datetime.utcnow()
+        lag = timedelta(seconds=config['FORECAST_LAG_SECONDS'])
+        with self.refresh_lock:
+            if self.profiles is None or self.profiles.built_on != now.date():
+                start_day = now.date() - timedelta(days=config['FORECAST_HISTORY_DAYS'])
+                profiles = DemandProfiles(start_day, now.date())
+                start, recent = datetime.combine(start_day, datetime.min.time()), {}
+            else:
+                profiles = self.profiles.copy()
+                start, recent = self.refreshed_at - lag, self.recent
+
+            columns = load_order_columns(start, now, chunk_size=config['ANALYTICS_CHUNK_SIZE'])
+            counted = np.fromiter(recent, np.int64, len(recent))
+            profiles.add(columns, ~np.isin(columns.order_id, counted))
+
+            # Remember what the next refresh's overlap will read again
+            cutoff = (now - lag - EPOCH).total_seconds()
+            overlap = columns.created_at >= cutoff
+            recent = {order_id: seconds for order_id, seconds in recent.items() if seconds >= cutoff}
+            recent.update(zip(columns.order_id[overlap].tolist(), columns.created_at[overlap].tolist()))
+
+            with self.lock:
+                self.profiles, self.refreshed_at, self.recent = profiles, now, recent
+
+    def forecast(self, hours=6, now=None):
+        """Expected quantity per item for each of the next `hours` hours, from the last refresh"""
+        config = current_app.config
+        now = now or datetime.utcnow()
+        with self.lock:
+            profiles, refreshed_at = self.profiles, self.refreshed_at
+
+        slot_start = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        slots = [slot_start + timedelta(hours=h) for h in range(hours)]
+        result = {
+            'generated_at': now.isoformat(),
+            'refreshed_at': refreshed_at.isoformat() if refreshed_at else None,
+            'hours': [slot.isoformat() for slot in slots],
+            'items': [],
+        }
+        if profiles is None:
+            return result
+
+        names = sorted(profiles.items, key=profiles.items.get)
+        totals = profiles.grid.sum(axis=(1, 2))
+        share = np.divide(profiles.grid, totals[:, None, None],
+                          out=np.zeros_like(profiles.grid), where=totals[:, None, None] > 0)
+        weekly = profiles.level(config['FORECAST_ALPHA']) * 7
+        weekdays = np.array([slot.weekday() for slot in slots], dtype=np.int64)
+        slot_hours = np.array([slot.hour for slot in slots], dtype=np.int64)
+        expected = weekly[:, None] * share[:, weekdays, slot_hours]
+
+        order = np.argsort(-expected.sum(axis=1))
+        result['items'] = [
+            {
+                'name': names[i],
+                'total': round(float(expected[i].sum()), 1),
+                'hourly': np.round(expected[i], 1).tolist(),
+            }
+            for i in order if expected[i].sum() > 0
+        ]
+        return result
+
+
+demand_forecaster = DemandForecaster()
+
+
+def get_forecast(hours=None):
+    """Forecast for the next `hours` hours (defaults to FORECAST_HORIZON_HOURS)"""
+    return demand_forecaster.forecast(hours or current_app.config['FORECAST_HORIZON_HOURS'])
+
+
+@forecast_cli.command('show')
+@click.option('--hours', type=int, default=None, help='Hours ahead (default FORECAST_HORIZON_HOURS).')
+@click.option('--limit', type=int, default=20, help='Items to print.')
+def show_command(hours, limit):
+    """Build the forecast from the order history and print the busiest items."""
+    started = time.perf_counter()
+    demand_forecaster.refresh()
+    result = get_forecast(hours)
+    click.echo(f"Built in {time.perf_counter() - started:.1f}s; "
+               f"hours from {result['hours'][0][:16]} to {result['hours'][-1][:16]}")
+    for item in result['items'][:limit]:
+        hourly = ' '.join(f"{qty:5.1f}" for qty in item['hourly'])
+        click.echo(f"{item['name'][:30]:30} {hourly}  total {item['total']:.1f}")
@@ -0,0 +1,293 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from flask import g, request, has_request_context, Response, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+
+
+def _labels(**labels):
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+class MetricsRegistry:
+    """In-process metrics for this worker, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()  # (endpoint, method, status) -> count
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))  # (endpoint, method)
+        self.sql_statements = defaultdict(lambda: Histogram(SQL_COUNT_BUCKETS))  # endpoint
+        self.sql_seconds = Counter()  # endpoint -> total seconds
+        self.render_seconds = defaultdict(lambda: Histogram(LATENCY_BUCKETS))  # template
+        self.n_plus_one = Counter()  # endpoint -> requests flagged
+        self.cache_lookups = Counter()  # (cache, name, 'hit'|'miss') -> count
+
+    def record_request(self, endpoint, method, status, seconds, sql_count, sql_seconds, n_plus_one):
+        with self.lock:
+            self.requests[(endpoint, method, status)] += 1
+            self.latency[(endpoint, method)].observe(seconds)
+            self.sql_statements[endpoint].observe(sql_count)
+            self.sql_seconds[endpoint] += sql_seconds
+            if n_plus_one:
+                self.n_plus_one[endpoint] += 1
+
+    def record_cache(self, cache, name, hit):
+        with self.lock:
+            self.cache_lookups[(cache, name, 'hit' if hit else 'miss')] += 1
+
+    def record_render(self, template, seconds):
+        with self.lock:
+            self.render_seconds[template].observe(seconds)
+
+    @staticmethod
+    def _histogram_lines(name, labels, histogram):
+        cumulative = 0
+        for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+            cumulative += count
+            yield f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}"
+        yield f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}"
+        yield f"{name}_count{_labels(**labels)} {cumulative}"
+
+    def render(self):
+        with self.lock:
+            lines = [
+                '# HELP http_requests_total Requests handled, by endpoint, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+            lines += ['# HELP http_request_duration_seconds Request latency.',
+                      '# TYPE http_request_duration_seconds histogram']
+            for (endpoint, method), histogram in sorted(self.latency.items()):
+                lines.extend(self._histogram_lines('http_request_duration_seconds',
+                                                   {'endpoint': endpoint, 'method': method}, histogram))
+
+            lines += ['# HELP sql_statements_per_request SQL statements executed per request.',
+                      '# TYPE sql_statements_per_request histogram']
+            for endpoint, histogram in sorted(self.sql_statements.items()):
+                lines.extend(self._histogram_lines('sql_statements_per_request', {'endpoint': endpoint}, histogram))
+
+            lines += ['# HELP sql_seconds_total Time spent in SQL statements.',
+                      '# TYPE sql_seconds_total counter']
+            for endpoint, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f"sql_seconds_total{_labels(endpoint=endpoint)} {seconds:.6f}")
+
+            lines += ['# HELP template_render_seconds Template render time.',
+                      '# TYPE template_render_seconds histogram']
+            for template, histogram in sorted(self.render_seconds.items()):
+                lines.extend(self._histogram_lines('template_render_seconds', {'template': template}, histogram))
+
+            lines += ['# HELP n_plus_one_requests_total Requests that repeated one SELECT past the N+1 threshold.',
+                      '# TYPE n_plus_one_requests_total counter']
+            for endpoint, count in sorted(self.n_plus_one.items()):
+                lines.append(f"n_plus_one_requests_total{_labels(endpoint=endpoint)} {count}")
+
+            lines += ['# HELP cache_lookups_total Page and fragment cache lookups.',
+                      '# TYPE cache_lookups_total counter']
+            for (cache, name, result), count in sorted(self.cache_lookups.items()):
+                lines.append(f"cache_lookups_total{_labels(cache=cache, name=name, result=result)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """One background thread sampling the stacks of requests being profiled.
+
+    Samples are collapsed stacks ("root;...;leaf" -> count), the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.active = {}  # thread id -> Counter of collapsed stacks
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            self.active[thread_id] = Counter()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+                self.thread.start()
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.statements = Counter()
+        self.render_started = []
+
+
+class Instrumentation:
+    """Per-request latency, SQL and template metrics, served at /metrics.
+
+    SQL statements are timed through engine cursor events and tallied per
+    request; a request that runs the same SELECT at least
+    N_PLUS_ONE_THRESHOLD times is flagged as a likely N+1 and logged.
+    With PROFILE_SLOW_REQUESTS_MS set, requests are stack-sampled and
+    those slower than the threshold are dumped to PROFILE_DIR. Metrics are
+    per worker process; scrape every worker or aggregate downstream.
+    """
+
+    def __init__(self, app=None):
+        self.registry = MetricsRegistry()
+        self.profiler = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config['METRICS_ENABLED']:
+            return
+        self.n_plus_one_threshold = app.config['N_PLUS_ONE_THRESHOLD']
+        self.slow_ms = app.config['PROFILE_SLOW_REQUESTS_MS']
+        self.profile_dir = app.config['PROFILE_DIR']
+        self.token = app.config['METRICS_TOKEN']
+        if self.slow_ms:
+            self.profiler = SamplingProfiler(app.config['PROFILE_SAMPLE_INTERVAL_MS'] / 1000.0)
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        before_render_template.connect(self.before_render, app)
+        template_rendered.connect(self.after_render, app)
+        if not event.contains(Engine, 'before_cursor_execute', self.before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+            event.listen(Engine, 'handle_error', self.handle_error)
+        # Per-route traffic, errors and SQL timings aren't for the public internet
+        if self.token or app.debug or app.testing:
+            app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        else:
+            logger.warning("METRICS_TOKEN is not set; /metrics is not served")
+
+    def before_request(self):
+        g.request_stats = RequestStats()
+        if self.profiler:
+            self.profiler.start(threading.get_ident())
+
+    def after_request(self, response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        seconds = time.perf_counter() - stats.started
+        endpoint = request.endpoint or '<unmatched>'
+
+        repeated = [
+            (statement, count) for statement, count in stats.statements.items()
+            if count >= self.n_plus_one_threshold and statement.lstrip().upper().startswith('SELECT')
+        ]
+        for statement, count in repeated:
+            logger.warning(f"Possible N+1 in {endpoint}: {count}x {' '.join(statement.split())[:200]}")
+
+        self.registry.record_request(endpoint, request.method, response.status_code, seconds,
+                                     stats.sql_count, stats.sql_seconds, bool(repeated))
+        if self.profiler:
+            samples = self.profiler.stop(threading.get_ident())
+            if seconds * 1000 >= self.slow_ms and samples:
+                self.dump_profile(endpoint, seconds, samples)
+        return response
+
+    def dump_profile(self, endpoint, seconds, samples):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir,
+                            f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}-{endpoint}-{int(seconds * 1000)}ms.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Slow request {endpoint} took {seconds * 1000:.0f} ms; profile written to {path}")
+
+    def before_render(self, sender, template, context, **extra):
+        stats = g.get('request_stats')
+        if stats is not None:
+            stats.render_started.append(time.perf_counter())
+
+    def after_render(self, sender, template, context, **extra):
+        stats = g.get('request_stats')
+        if stats is not None and stats.render_started:
+            self.registry.record_render(template.name or '<string>', time.perf_counter() - stats.render_started.pop())
+
+    @staticmethod
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @staticmethod
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        if not has_request_context():
+            return
+        stats = g.get('request_stats')
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_seconds += time.perf_counter() - started
+            stats.statements[statement] += 1
+
+    @staticmethod
+    def handle_error(context):
+        """Drop the start time of a statement that raised, which after_cursor_execute never sees"""
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if context.execution_context is not None and context.statement is not None and started:
+            started.pop()
+
+    def metrics_view(self):
+        if self.token and request.headers.get('Authorization') != f"Bearer {self.token}":
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(self.registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,128 @@
+import heapq
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import Order
+from catalog import get_menu
+
+KITCHEN_STATUSES = ('confirmed', 'preparing')
+
+
+def prep_minutes_by_item(menu=None):
+    """Map item name to expected prep time in minutes"""
+    menu = menu or get_menu()
+    return {
+        item['name']: item.get('prep_minutes', 0)
+        for items in menu.values()
+        for item in items
+    }
+
+
+class KitchenQueue:
+    """Priority queue of kitchen tickets ordered by latest start time.
+
+    A ticket must start cooking by its promised delivery time minus the ride
+    and its slowest item's prep time. The queue is kept in memory and
+    synced incrementally: each sync only loads orders changed since the
+    previous one, and identical items are tallied across open tickets for
+    batch cooking.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.tickets = {}
+        self.batch = Counter()
+        self.synced_at = None
+        self.lock = threading.Lock()
+
+    def _ticket(self, order, prep_times, config):
+        items = order.get_items()
+        prep = max((prep_times.get(item['name'], 0) for item in items), default=0)
+        promised = order.estimated_delivery or (
+            order.created_at + timedelta(minutes=config['KITCHEN_PROMISE_MINUTES'])
+        )
+        start_by = promised - timedelta(minutes=config['KITCHEN_DELIVERY_LEG_MINUTES'] + prep)
+        return {
+            'id': order.id,
+            'order_id': order.order_id,
+            'status': order.status,
+            'items': [{'name': item['name'], 'emoji': item.get('emoji', ''), 'quantity': item['quantity']}
+                      for item in items],
+            'prep_minutes': prep,
+            'promised_at': promised,
+            'start_by': start_by,
+        }
+
+    def _remove(self, order_pk):
+        ticket = self.tickets.pop(order_pk, None)
+        if ticket:
+            for item in ticket['items']:
+                self.batch[item['name']] -= item['quantity']
+                if self.batch[item['name']] <= 0:
+                    del self.batch[item['name']]
+
+    def _add(self, ticket):
+        self.tickets[ticket['id']] = ticket
+        heapq.heappush(self.heap, (ticket['start_by'], ticket['id']))
+        for item in ticket['items']:
+            self.batch[item['name']] += item['quantity']
+
+    def sync(self):
+        """Pull orders created or changed since the last sync into the queue"""
+        config = current_app.config
+        prep_times = prep_minutes_by_item()
+        with self.lock:
+            now = datetime.utcnow()
+            query = Order.query
+            if self.synced_at is None:
+                query = query.filter(Order.status.in_(KITCHEN_STATUSES))
+            else:
+                # Overlap by a second so writes committed during the last sync aren't missed
+                query = query.filter(Order.updated_at >= self.synced_at - timedelta(seconds=1))
+            for order in query:
+                self._remove(order.id)
+                if order.status in KITCHEN_STATUSES:
+                    self._add(self._ticket(order, prep_times, config))
+            self.synced_at = now
+
+            # Drop heap entries whose ticket left the queue or was re-pushed
+            while self.heap and (
+                self.heap[0][1] not in self.tickets
+                or self.tickets[self.heap[0][1]]['start_by'] != self.heap[0][0]
+            ):
+                heapq.heappop(self.heap)
+            if len(self.heap) > 2 * len(self.tickets) + 64:
+                self.heap = [(t['start_by'], t['id']) for t in self.tickets.values()]
+                heapq.heapify(self.heap)
+
+    def snapshot(self, limit=50):
+        """Tickets in cooking order plus the batched item tally"""
+        with self.lock:
+            # Every ticket has one live heap entry, so the rest are stale ones to skip
+            stale = len(self.heap) - len(self.tickets)
+            tickets, seen = [], set()
+            for start_by, pk in heapq.nsmallest(limit + stale, self.heap):
+                ticket = self.tickets.get(pk)
+                if ticket is None or pk in seen or ticket['start_by'] != start_by:
+                    continue
+                seen.add(pk)
+                tickets.append(dict(ticket))
+                if len(tickets) >= limit:
+                    break
+            batch = sorted(self.batch.items(), key=lambda kv: (-kv[1], kv[0]))
+
+        now = datetime.utcnow()
+        for ticket in tickets:
+            ticket['late'] = ticket['start_by'] < now
+            ticket['promised_at'] = ticket['promised_at'].isoformat()
+            ticket['start_by'] = ticket['start_by'].isoformat()
+        return {
+            'tickets': tickets,
+            'batch': [{'name': name, 'quantity': qty, 'label': f"{qty}× {name}"} for name, qty in batch],
+        }
+
+
+kitchen_queue = KitchenQueue()
@@ -0,0 +1,215 @@
+import logging
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, select, func
+
+from extensions import db
+from models import User, LoyaltyLedger
+
+logger = logging.getLogger(__name__)
+
+loyalty_cli = AppGroup('loyalty', help='Loyalty points ledger maintenance.')
+
+
+class InsufficientPoints(ValueError):
+    """Raised when a debit would take a balance below zero"""
+
+
+@event.listens_for(LoyaltyLedger, 'before_update')
+@event.listens_for(LoyaltyLedger, 'before_delete')
+def _reject_ledger_mutation(mapper, connection, target):
+    """The ledger is append-only; corrections are new `adjust` entries"""
+    raise ValueError('loyalty_ledger is append-only')
+
+
+def post_entry(user_id, delta, kind, order_id=None, now=None):
+    """Append a ledger entry and move the user's cached balance with it.
+
+    The balance changes with a single relative UPDATE (guarded so debits
+    can't go negative) and the entry records the resulting balance; both
+    are in the caller's transaction, so they commit or roll back together.
+    Credits expire after LOYALTY_EXPIRY_DAYS. Raises InsufficientPoints.
+    """
+    now = now or datetime.utcnow()
+    users = User.__table__
+    stmt = users.update().where(users.c.id == user_id).values(loyalty_points=users.c.loyalty_points + delta)
+    if delta < 0:
+        stmt = stmt.where(users.c.loyalty_points >= -delta)
+    if db.session.execute(stmt).rowcount != 1:
+        raise InsufficientPoints(f"Not enough loyalty points (need {-delta})")
+
+    balance = db.session.execute(select(users.c.loyalty_points).where(users.c.id == user_id)).scalar_one()
+    expires_at = now + timedelta(days=current_app.config['LOYALTY_EXPIRY_DAYS']) if delta > 0 else None
+    entry = LoyaltyLedger(user_id=user_id, order_id=order_id, kind=kind, delta=delta,
+                          balance_after=balance, expires_at=expires_at, created_at=now)
+    db.session.add(entry)
+    return entry
+
+
+def points_for_total(total):
+    """Points earned for a delivered order of `total` rupees"""
+    return int(total * current_app.config['LOYALTY_POINTS_PER_RUPEE'])
+
+
+def max_redeemable(amount):
+    """Most points (₹1 each) usable on an order of `amount` rupees"""
+    return int(amount * current_app.config['LOYALTY_MAX_REDEEM_SHARE'])
+
+
+def _user_batches(batch_size, *criteria):
+    """Keyset-paginated lists of (id, loyalty_points) rows"""
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(User.id, User.loyalty_points).where(User.id > last_id, *criteria)
+            .order_by(User.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def reconcile(fix=False, batch_size=None):
+    """Compare cached balances with ledger sums, a batch of users at a time.
+
+    Returns a list of {'user_id', 'cached', 'ledger'} mismatches. With `fix`
+    the cached balance is moved to the ledger sum, which is authoritative.
+    The batch's user rows are locked before the ledger is summed and the
+    correction is applied relative to the current balance, so entries
+    posted while reconciling are neither lost nor counted twice.
+    """
+    batch_size = batch_size or current_app.config['LOYALTY_BATCH_SIZE']
+    users = User.__table__
+    mismatches = []
+    for rows in _user_batches(batch_size):
+        ids = [user_id for user_id, _ in rows]
+        if fix:
+            rows = db.session.execute(
+                select(User.id, User.loyalty_points).where(User.id.in_(ids)).with_for_update()
+            ).all()
+        sums = dict(db.session.execute(
+            select(LoyaltyLedger.user_id, func.sum(LoyaltyLedger.delta))
+            .where(LoyaltyLedger.user_id.in_(ids)).group_by(LoyaltyLedger.user_id)
+        ).all())
+        batch = [
+            {'user_id': user_id, 'cached': cached or 0, 'ledger': int(sums.get(user_id) or 0)}
+            for user_id, cached in rows if (cached or 0) != int(sums.get(user_id) or 0)
+        ]
+        if fix and batch:
+            try:
+                db.session.execute(
+                    users.update().where(users.c.id == db.bindparam('uid'))
+                    .values(loyalty_points=func.coalesce(users.c.loyalty_points, 0) + db.bindparam('correction')),
+                    [{'uid': row['user_id'], 'correction': row['ledger'] - row['cached']} for row in batch]
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        elif fix:
+            db.session.rollback()  # release the row locks
+        mismatches.extend(batch)
+    if mismatches:
+        logger.warning(f"Loyalty reconciliation found {len(mismatches)} mismatched balance(s)")
+    return mismatches
+
+
+def expire_points(now=None, batch_size=None):
+    """Expire points whose credits are past their expiry date.
+
+    Debits use up the oldest points first, so whatever part of a balance
+    isn't covered by credits that are still live has expired. That excess
+    is found for a whole batch of users with one grouped query and written
+    back with one executemany update plus one ledger insert per batch.
+    Returns the number of points expired.
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or current_app.config['LOYALTY_BATCH_SIZE']
+    users = User.__table__
+    expired_total = 0
+    for rows in _user_batches(batch_size, User.loyalty_points > 0):
+        ids = [user_id for user_id, _ in rows]
+        # Lock the balances before summing credits: an earn that commits in
+        # between would otherwise be in the balance but not in `live`
+        balances = dict(db.session.execute(
+            select(User.id, User.loyalty_points).where(User.id.in_(ids)).with_for_update()
+        ).all())
+        live = dict(db.session.execute(
+            select(LoyaltyLedger.user_id, func.sum(LoyaltyLedger.delta))
+            .where(LoyaltyLedger.user_id.in_(ids), LoyaltyLedger.delta > 0, LoyaltyLedger.expires_at > now)
+            .group_by(LoyaltyLedger.user_id)
+        ).all())
+        expiring = [
+            (user_id, balance - int(live.get(user_id) or 0), int(live.get(user_id) or 0))
+            for user_id, balance in balances.items() if balance > int(live.get(user_id) or 0)
+        ]
+        if not expiring:
+            db.session.rollback()
+            continue
+        try:
+            db.session.execute(
+                users.update().where(users.c.id == db.bindparam('uid'))
+                .values(loyalty_points=users.c.loyalty_points - db.bindparam('points')),
+                [{'uid': user_id, 'points': points} for user_id, points, _ in expiring]
+            )
+            db.session.execute(LoyaltyLedger.__table__.insert(), [
+                {'user_id': user_id, 'kind': 'expire', 'delta': -points, 'balance_after': remaining,
+                 'created_at': now}
+                for user_id, points, remaining in expiring
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        expired_total += sum(points for _, points, _ in expiring)
+    return expired_total
+
+
+def open_balances(now=None):
+    """Give users with a cached balance but no ledger history an `opening` entry"""
+    now = now or datetime.utcnow()
+    expires_at = now + timedelta(days=current_app.config['LOYALTY_EXPIRY_DAYS'])
+    has_entries = select(LoyaltyLedger.id).where(LoyaltyLedger.user_id == User.id).exists()
+    rows = db.session.execute(
+        select(User.id, User.loyalty_points).where(User.loyalty_points > 0, ~has_entries)
+    ).all()
+    if rows:
+        db.session.execute(LoyaltyLedger.__table__.insert(), [
+            {'user_id': user_id, 'kind': 'opening', 'delta': points, 'balance_after': points,
+             'expires_at': expires_at, 'created_at': now}
+            for user_id, points in rows
+        ])
+        db.session.commit()
+    return len(rows)
+
+
+def user_history(user_id, limit=50):
+    """Most recent ledger entries for a user, newest first"""
+    return LoyaltyLedger.query.filter_by(user_id=user_id) \
+        .order_by(LoyaltyLedger.created_at.desc(), LoyaltyLedger.id.desc()).limit(limit).all()
+
+
+@loyalty_cli.command('reconcile')
+@click.option('--fix', is_flag=True, help='Reset cached balances to the ledger sums.')
+def reconcile_command(fix):
+    """Check cached balances against the ledger (schedule nightly)."""
+    mismatches = reconcile(fix=fix)
+    for row in mismatches[:50]:
+        click.echo(f"user {row['user_id']}: cached {row['cached']}, ledger {row['ledger']}")
+    click.echo(f"{len(mismatches)} mismatched balance(s){' fixed' if fix and mismatches else ''}")
+
+
+@loyalty_cli.command('expire')
+def expire_command():
+    """Expire points past LOYALTY_EXPIRY_DAYS (schedule daily)."""
+    click.echo(f"Expired {expire_points()} points")
+
+
+@loyalty_cli.command('open-balances')
+def open_balances_command():
+    """Record existing balances in the ledger (run once before reconciling)."""
+    click.echo(f"Opened ledgers for {open_balances()} user(s)")
@@ -0,0 +1,46 @@
+from alembic import context
+
+from extensions import db
+import models  # noqa: F401  (registers every table on db.metadata)
+from search import is_search_object
+
+# Runs inside the Flask app context set up by `flask db ...`, so the
+# connection comes from the app's configured engine
+target_metadata = db.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # FTS tables, search_vector columns and their triggers are managed by
+    # search.py, not declared on the models; keep autogenerate from dropping them
+    return not (reflected and is_search_object(name))
+
+
+def run_migrations_offline():
+    context.configure(
+        url=str(db.engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=db.engine.dialect.name == 'sqlite',
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with db.engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            render_as_batch=connection.dialect.name == 'sqlite',  # SQLite can't ALTER most things in place
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,37 @@
+"""orders indexes, built online
+
+Adds the created_at index used by rollups and analytics and the partial
+index of spin-eligible orders. Old rows can have spin_used NULL, which the
+partial index would never cover, so they are backfilled to false in
+batches first. Both indexes are built CONCURRENTLY on Postgres.
+
+Revision ID: 9c2e51d7a3f4
+Revises: 4741b3bf8a0b
+Create Date: 2026-10-19 17:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from schema import backfill, create_index_online, drop_index_online
+
+
+revision = '9c2e51d7a3f4'
+down_revision = '4741b3bf8a0b'
+branch_labels = None
+depends_on = None
+
+orders = sa.table('orders', sa.column('id', sa.Integer), sa.column('spin_used', sa.Boolean))
+
+
+def upgrade():
+    backfill(orders, {'spin_used': False}, orders.c.spin_used.is_(None))
+
+    create_index_online('ix_orders_created_at', 'orders', ['created_at'])
+    false = 'false' if op.get_bind().dialect.name == 'postgresql' else '0'
+    create_index_online('ix_orders_spin_eligible', 'orders', ['user_id', 'created_at'],
+                        where=f"status = 'delivered' AND spin_used = {false}")
+
+
+def downgrade():
+    drop_index_online('ix_orders_spin_eligible', 'orders')
+    drop_index_online('ix_orders_created_at', 'orders')
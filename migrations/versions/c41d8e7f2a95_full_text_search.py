@@ -0,0 +1,30 @@
+"""full-text search indexes
+
+FTS5 tables kept in sync by triggers on SQLite; a trigger-maintained
+search_vector column with a GIN index on Postgres, backfilled in batches
+and indexed CONCURRENTLY. See search.py.
+
+Revision ID: c41d8e7f2a95
+Revises: 9c2e51d7a3f4
+Create Date: 2026-10-19 19:40:00.000000
+"""
+from alembic import op
+
+from search import SEARCH_INDEXES, install_search_online, drop_ddl
+
+
+revision = 'c41d8e7f2a95'
+down_revision = '9c2e51d7a3f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    install_search_online()
+
+
+def downgrade():
+    dialect = op.get_context().dialect.name
+    for kind in SEARCH_INDEXES:
+        for statement in drop_ddl(kind, dialect):
+            op.execute(statement)
@@ -0,0 +1,42 @@
+"""support triage
+
+Adds support_tickets.first_response_at for response-time percentiles,
+indexes on support_tickets status and updated_at for the triage queue's
+initial load and incremental syncs, and an orders customer_phone index
+for customer history lookups, built CONCURRENTLY on Postgres.
+
+Revision ID: e7a2b9c4d1f6
+Revises: c41d8e7f2a95
+Create Date: 2026-10-19 21:05:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from schema import create_index_online, drop_index_online
+from search import install_ddl
+
+
+revision = 'e7a2b9c4d1f6'
+down_revision = 'c41d8e7f2a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('support_tickets', sa.Column('first_response_at', sa.DateTime(), nullable=True))
+    create_index_online('ix_support_tickets_status', 'support_tickets', ['status'])
+    create_index_online('ix_support_tickets_updated_at', 'support_tickets', ['updated_at'])
+    create_index_online('ix_orders_customer_phone', 'orders', ['customer_phone'])
+
+
+def downgrade():
+    drop_index_online('ix_orders_customer_phone', 'orders')
+    drop_index_online('ix_support_tickets_updated_at', 'support_tickets')
+    drop_index_online('ix_support_tickets_status', 'support_tickets')
+    with op.batch_alter_table('support_tickets') as batch_op:
+        batch_op.drop_column('first_response_at')
+    dialect = op.get_context().dialect.name
+    if dialect == 'sqlite':
+        # Recreating the table dropped its search triggers
+        for statement in install_ddl('tickets', dialect):
+            op.execute(statement)
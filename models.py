@@ -53,6 +53,15 @@ class User(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+ORDER_STATUS_DISPLAY = {
+    'pending': 'Order Received',
+    'confirmed': 'Confirmed',
+    'preparing': 'Being Prepared',
+    'out_for_delivery': 'Out for Delivery',
+    'delivered': 'Delivered',
+    'cancelled': 'Cancelled'
+}
+
 class Order(db.Model):
     __tablename__ = 'orders'
     
@@ -60,7 +69,7 @@ class Order(db.Model):
     order_id = db.Column(db.String(20), unique=True, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     customer_name = db.Column(db.String(100), nullable=False)
-    customer_phone = db.Column(db.String(15), nullable=False)
+    customer_phone = db.Column(db.String(15), nullable=False, index=True)
     customer_address = db.Column(db.Text, nullable=False)
     items = db.Column(db.Text, nullable=False)  # JSON array of items
     subtotal = db.Column(db.Float, nullable=False)
@@ -77,7 +86,7 @@ class Order(db.Model):
     rating = db.Column(db.Integer)  # 1-5 stars
     feedback = db.Column(db.Text)
     spin_used = db.Column(db.Boolean, default=False)  # Track if spin wheel was used
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship
@@ -94,15 +103,7 @@ class Order(db.Model):
         self.items = json.dumps(items_list)
     
     def get_status_display(self):
-        status_map = {
-            'pending': 'Order Received',
-            'confirmed': 'Confirmed',
-            'preparing': 'Being Prepared',
-            'out_for_delivery': 'Out for Delivery',
-            'delivered': 'Delivered',
-            'cancelled': 'Cancelled'
-        }
-        return status_map.get(self.status, self.status.title())
+        return ORDER_STATUS_DISPLAY.get(self.status, self.status.title())
     
     def can_use_spin(self):
         """Check if order is eligible for spin (delivered and not used)"""
@@ -131,6 +132,160 @@ class Order(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+# Partial index over delivered orders whose spin is unused; queries must
+# repeat the predicate (status == 'delivered', spin_used == False) to hit it
+_spin_eligible = (Order.status == 'delivered') & (Order.spin_used == False)  # noqa: E712
+db.Index('ix_orders_spin_eligible', Order.user_id, Order.created_at,
+         postgresql_where=_spin_eligible, sqlite_where=_spin_eligible)
+
+class OrderStatusEvent(db.Model):
+    __tablename__ = 'order_status_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    from_status = db.Column(db.String(20))
+    to_status = db.Column(db.String(20), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # None for system changes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'from_status': self.from_status,
+            'to_status': self.to_status,
+            'actor_id': self.actor_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class LoyaltyLedger(db.Model):
+    __tablename__ = 'loyalty_ledger'
+    __table_args__ = (db.Index('ix_loyalty_ledger_user_created', 'user_id', 'created_at'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    order_id = db.Column(db.String(20))  # public order id, if the entry came from an order
+    kind = db.Column(db.String(20), nullable=False)  # earn, redeem, refund, expire, adjust, opening
+    delta = db.Column(db.Integer, nullable=False)
+    balance_after = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime)  # earn entries only
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'kind': self.kind,
+            'delta': self.delta,
+            'balance_after': self.balance_after,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class DailySales(db.Model):
+    __tablename__ = 'daily_sales'
+    
+    day = db.Column(db.Date, primary_key=True)
+    orders_count = db.Column(db.Integer, default=0)
+    delivered_count = db.Column(db.Integer, default=0)
+    cancelled_count = db.Column(db.Integer, default=0)
+    revenue = db.Column(db.Float, default=0)  # delivered orders only
+    discount_total = db.Column(db.Float, default=0)
+    items_sold = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'orders_count': self.orders_count,
+            'delivered_count': self.delivered_count,
+            'cancelled_count': self.cancelled_count,
+            'revenue': self.revenue,
+            'discount_total': self.discount_total,
+            'items_sold': self.items_sold,
+            'avg_order_value': round(self.revenue / self.delivered_count, 2) if self.delivered_count else 0
+        }
+
+class DailyItemSales(db.Model):
+    __tablename__ = 'daily_item_sales'
+    
+    day = db.Column(db.Date, primary_key=True)
+    item_name = db.Column(db.String(100), primary_key=True)
+    quantity = db.Column(db.Integer, default=0)
+    revenue = db.Column(db.Float, default=0)
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'item_name': self.item_name,
+            'quantity': self.quantity,
+            'revenue': self.revenue
+        }
+
+class MenuItem(db.Model):
+    __tablename__ = 'menu_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    section = db.Column(db.String(50), nullable=False)  # Biryani, Rolls & Snacks, ...
+    price = db.Column(db.Float, nullable=False)
+    emoji = db.Column(db.String(20))
+    category = db.Column(db.String(30))  # vegetarian, egg, non-vegetarian, beverage, extra
+    description = db.Column(db.Text)
+    prep_minutes = db.Column(db.Integer, default=0)
+    sort_order = db.Column(db.Integer, default=0)
+    is_available = db.Column(db.Boolean, default=True)
+    catalog_version = db.Column(db.Integer, nullable=False)  # version that last changed this row
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'section': self.section,
+            'price': self.price,
+            'emoji': self.emoji,
+            'category': self.category,
+            'description': self.description,
+            'prep_minutes': self.prep_minutes,
+            'is_available': self.is_available
+        }
+
+class ItemStock(db.Model):
+    __tablename__ = 'item_stock'
+    
+    item_name = db.Column(db.String(100), db.ForeignKey('menu_items.name'), primary_key=True)
+    quantity = db.Column(db.Integer)  # portions left; None means not tracked
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'item_name': self.item_name,
+            'quantity': self.quantity,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class CatalogVersion(db.Model):
+    __tablename__ = 'catalog_versions'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    snapshot = db.Column(db.Text, nullable=False)  # JSON menu as served, sections -> items
+    item_count = db.Column(db.Integer, default=0)
+    note = db.Column(db.String(200))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def get_snapshot(self):
+        """Get snapshot as dict"""
+        return json.loads(self.snapshot) if self.snapshot else {}
+    
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'item_count': self.item_count,
+            'note': self.note,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
 class Coupon(db.Model):
     __tablename__ = 'coupons'
     
@@ -169,6 +324,22 @@ class Coupon(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class SpinPrizeCount(db.Model):
+    __tablename__ = 'spin_prize_counts'
+    
+    day = db.Column(db.Date, primary_key=True)
+    campaign = db.Column(db.String(50), primary_key=True)  # '' for the default wheel
+    reward_name = db.Column(db.String(100), primary_key=True)
+    awarded = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'campaign': self.campaign,
+            'reward_name': self.reward_name,
+            'awarded': self.awarded
+        }
+
 class SupportTicket(db.Model):
     __tablename__ = 'support_tickets'
     
@@ -182,12 +353,13 @@ class SupportTicket(db.Model):
     category = db.Column(db.String(50), nullable=False)  # order_issue, payment_issue, feedback, other
     subject = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(20), default='open')  # open, in_progress, resolved, closed
+    status = db.Column(db.String(20), default='open', index=True)  # open, in_progress, resolved, closed
     priority = db.Column(db.String(10), default='medium')  # low, medium, high, urgent
     admin_notes = db.Column(db.Text)
+    first_response_at = db.Column(db.DateTime)  # first move out of 'open'
     resolved_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     def get_status_display(self):
         status_map = {
@@ -214,6 +386,7 @@ class SupportTicket(db.Model):
             'priority': self.priority,
             'admin_notes': self.admin_notes,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'first_response_at': self.first_response_at.isoformat() if self.first_response_at else None,
             'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None
         }
 
@@ -237,3 +410,21 @@ class Notification(db.Model):
             'is_read': self.is_read,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+class GeoLocation(db.Model):
+    __tablename__ = 'geo_locations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pincode = db.Column(db.String(10), index=True)
+    locality = db.Column(db.String(100), index=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'pincode': self.pincode,
+            'locality': self.locality,
+            'latitude': self.latitude,
+            'longitude': self.longitude
+        }
@@ -0,0 +1,279 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from extensions import db, lazy_import
+from models import Order, OrderStatusEvent, User, ORDER_STATUS_DISPLAY
+from eta import estimate_delivery, stays_from_events
+from stock import release_stock, RESTOCK_STATUSES
+from loyalty import post_entry, points_for_total
+
+np = lazy_import('numpy')
+
+ORDER_STATUSES = ('pending', 'confirmed', 'preparing', 'out_for_delivery', 'delivered', 'cancelled')
+
+# Legal moves out of each status; delivered and cancelled are final
+TRANSITIONS = {
+    'pending': ('confirmed', 'cancelled'),
+    'confirmed': ('preparing', 'cancelled'),
+    'preparing': ('out_for_delivery', 'cancelled'),
+    'out_for_delivery': ('delivered', 'cancelled'),
+    'delivered': (),
+    'cancelled': (),
+}
+
+# Histogram bucket upper bounds in minutes; the last bucket is open-ended
+LATENCY_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120)
+
+
+class InvalidTransition(ValueError):
+    """Raised when an order can't move to the requested status"""
+
+
+@event.listens_for(OrderStatusEvent, 'before_update')
+@event.listens_for(OrderStatusEvent, 'before_delete')
+def _reject_event_mutation(mapper, connection, target):
+    """Status events are an append-only log"""
+    raise InvalidTransition('order_status_events is append-only')
+
+
+def can_transition(from_status, to_status):
+    """Check whether `from_status -> to_status` is a legal move"""
+    return to_status in TRANSITIONS.get(from_status or 'pending', ())
+
+
+def change_status(order, new_status, actor_id=None, now=None):
+    """Move an order to `new_status`, log the transition and refresh its ETA.
+
+    Raises InvalidTransition for illegal moves. The status is claimed with
+    a conditional UPDATE on the status just read, so of two concurrent
+    transitions on one order only the first applies its side effects; the
+    other raises InvalidTransition. The event is added to the current
+    session so it commits in the same transaction as the status.
+    Orders cancelled before cooking starts give their portions back;
+    delivery credits loyalty points and cancellation refunds spent ones.
+    """
+    if new_status not in ORDER_STATUSES:
+        raise InvalidTransition(f"Unknown order status: {new_status}")
+    if not can_transition(order.status, new_status):
+        raise InvalidTransition(f"Order {order.order_id} can't go from {order.status} to {new_status}")
+
+    now = now or datetime.utcnow()
+    from_status = order.status
+    orders = Order.__table__
+    claim = orders.update().where(
+        orders.c.id == order.id, orders.c.status == from_status
+    ).values(status=new_status, updated_at=now)
+    if db.session.execute(claim).rowcount != 1:
+        raise InvalidTransition(f"Order {order.order_id} is no longer {from_status}; reload it and try again")
+    set_committed_value(order, 'status', new_status)
+
+    db.session.add(OrderStatusEvent(
+        order_id=order.id,
+        from_status=from_status,
+        to_status=new_status,
+        actor_id=actor_id,
+        created_at=now
+    ))
+    if new_status == 'cancelled' and from_status in RESTOCK_STATUSES:
+        release_stock(order.get_items(), now)
+    if order.user_id:
+        if new_status == 'delivered':
+            order.loyalty_points_earned = points_for_total(order.total)
+            if order.loyalty_points_earned:
+                post_entry(order.user_id, order.loyalty_points_earned, 'earn', order.order_id, now)
+        elif new_status == 'cancelled' and order.loyalty_points_used:
+            post_entry(order.user_id, order.loyalty_points_used, 'refund', order.order_id, now)
+    estimated = estimate_delivery(new_status, now)
+    if estimated:
+        order.estimated_delivery = estimated
+    mark_changed(order.order_id)
+    return order
+
+
+def bulk_change_status(order_ids, new_status, actor_id=None, now=None):
+    """Apply one status to many orders (by public order_id) in a single transaction.
+
+    Orders that can't make the move are skipped. Returns the order_ids that
+    were updated and a dict of skipped order_id -> reason.
+    """
+    now = now or datetime.utcnow()
+    orders = Order.query.filter(Order.order_id.in_(order_ids)).all()
+    found = {order.order_id: order for order in orders}
+
+    updated, skipped = [], {}
+    for order_id in order_ids:
+        order = found.get(order_id)
+        if not order:
+            skipped[order_id] = 'Order not found'
+            continue
+        try:
+            change_status(order, new_status, actor_id=actor_id, now=now)
+        except InvalidTransition as e:
+            skipped[order_id] = str(e)
+            continue
+        updated.append(order_id)
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return updated, skipped
+
+
+def load_snapshot(order_id):
+    """What a customer tracking an order sees, or None if there is no such order"""
+    row = db.session.query(
+        Order.order_id, Order.customer_name, Order.status, Order.total, Order.estimated_delivery,
+        Order.spin_used, Order.updated_at, Order.created_at, User.full_name
+    ).outerjoin(User, User.id == Order.delivery_person_id).filter(Order.order_id == order_id).first()
+    if row is None:
+        return None
+    changed = row.updated_at or row.created_at
+    return {
+        'order_id': row.order_id,
+        'customer_name': (row.customer_name or '').split(' ')[0],  # first name only; order IDs are guessable
+        'status': row.status,
+        'status_display': ORDER_STATUS_DISPLAY.get(row.status, (row.status or '').title()),
+        'total': row.total,
+        'estimated_delivery': row.estimated_delivery.isoformat() if row.estimated_delivery else None,
+        'delivery_person': row.full_name,
+        'can_use_spin': row.status == 'delivered' and not row.spin_used,
+        # Milliseconds of the last update: moves whenever anything on the order changes
+        'version': int(changed.replace(tzinfo=timezone.utc).timestamp() * 1000) if changed else 0,
+    }
+
+
+class StatusSnapshots:
+    """Order tracking snapshots held in memory per worker.
+
+    Each snapshot (with its JSON body pre-serialized) is loaded with one
+    query and kept for ORDER_STATUS_CACHE_SECONDS; unknown order IDs are
+    cached too, so guessing IDs can't hammer the database. Changes made
+    through change_status or claim_spin drop the snapshot as soon as they
+    commit in this worker; other workers pick them up when their copy
+    expires, which also bounds how late a rider assignment shows up.
+    Long-pollers wait on a condition that invalidation notifies, without
+    holding a pool connection while they sleep.
+    """
+
+    def __init__(self):
+        self.entries = {}  # order_id -> (loaded_at, snapshot or None, body)
+        self.generation = 0  # bumped on invalidation so in-flight loads don't store stale data
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def get(self, order_id):
+        """(snapshot, JSON body), or (None, None) for an unknown order"""
+        config = current_app.config
+        now = time.monotonic()
+        entry = self.entries.get(order_id)
+        if entry is not None and now - entry[0] < config['ORDER_STATUS_CACHE_SECONDS']:
+            return entry[1], entry[2]
+
+        generation = self.generation
+        snapshot = load_snapshot(order_id)
+        body = json.dumps(snapshot).encode() if snapshot is not None else None
+        with self.lock:
+            if generation == self.generation:
+                if len(self.entries) >= config['ORDER_STATUS_CACHE_MAX_ENTRIES']:
+                    ttl = config['ORDER_STATUS_CACHE_SECONDS']
+                    self.entries = {k: e for k, e in self.entries.items() if now - e[0] < ttl}
+                    if len(self.entries) >= config['ORDER_STATUS_CACHE_MAX_ENTRIES']:
+                        self.entries.clear()
+                self.entries[order_id] = (now, snapshot, body)
+        return snapshot, body
+
+    def invalidate(self, order_ids):
+        with self.changed:
+            for order_id in order_ids:
+                self.entries.pop(order_id, None)
+            self.generation += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, order_id, version, timeout):
+        """Block until the order's version differs from `version` (or `timeout` passes)"""
+        deadline = time.monotonic() + timeout
+        recheck = current_app.config['ORDER_STATUS_CACHE_SECONDS']
+        snapshot, body = self.get(order_id)
+        while snapshot is not None and snapshot['version'] == version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Hand the connection back to the pool while idle; the next load checks one out again
+            db.session.remove()
+            with self.changed:
+                self.changed.wait(min(remaining, recheck))
+            snapshot, body = self.get(order_id)
+        return snapshot, body
+
+
+status_snapshots = StatusSnapshots()
+
+
+def mark_changed(order_id):
+    """Drop `order_id`'s tracking snapshot once the current transaction commits"""
+    db.session.info.setdefault('changed_orders', set()).add(order_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_orders(session):
+    changed = session.info.pop('changed_orders', None)
+    if changed:
+        status_snapshots.invalidate(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_orders(session):
+    session.info.pop('changed_orders', None)
+
+
+def transition_latencies(since=None):
+    """Minutes spent in each status, grouped by `from->to` transition.
+
+    The time in a status runs from the previous event of the same order (or
+    the order's creation for its first event) to the event that left it.
+    """
+    query = db.session.query(
+        OrderStatusEvent.order_id, Order.created_at, OrderStatusEvent.from_status,
+        OrderStatusEvent.to_status, OrderStatusEvent.created_at
+    ).join(Order, Order.id == OrderStatusEvent.order_id)
+    if since:
+        query = query.filter(OrderStatusEvent.created_at >= since)
+    rows = query.order_by(OrderStatusEvent.order_id, OrderStatusEvent.created_at).all()
+    if not rows:
+        return {}
+
+    order_ids = np.array([r[0] for r in rows], dtype=np.int64)
+    created = np.array([r[1].timestamp() for r in rows], dtype=np.float64)
+    times = np.array([r[4].timestamp() for r in rows], dtype=np.float64)
+    _, entered, _ = stays_from_events(order_ids, created, [r[2] for r in rows], times)
+    minutes = (times - entered) / 60.0
+
+    labels = np.array([f"{r[2]}->{r[3]}" for r in rows])
+    return {label: minutes[labels == label] for label in np.unique(labels)}
+
+
+def latency_histograms(since=None, buckets=LATENCY_BUCKETS):
+    """Per-transition latency histograms with count, p50/p90 and bucket counts"""
+    edges = np.array((0,) + tuple(buckets) + (np.inf,), dtype=np.float64)
+    histograms = {}
+    for label, minutes in transition_latencies(since).items():
+        counts, _ = np.histogram(minutes, bins=edges)
+        histograms[label] = {
+            'count': int(minutes.size),
+            'p50_minutes': round(float(np.percentile(minutes, 50)), 2),
+            'p90_minutes': round(float(np.percentile(minutes, 90)), 2),
+            'buckets': [
+                {'max_minutes': bound, 'count': int(count)}
+                for bound, count in zip(list(buckets) + [None], counts)
+            ],
+        }
+    return histograms
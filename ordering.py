@@ -0,0 +1,147 @@
+import re
+from datetime import datetime
+
+from extensions import db
+from models import Order, Coupon
+from config import generate_order_id
+from catalog import get_menu_item
+from eta import estimate_delivery
+from stock import reserve_stock
+from loyalty import post_entry, max_redeemable, InsufficientPoints
+
+PAYMENT_METHODS = ('cash', 'upi')
+PHONE_PATTERN = re.compile(r'^\+?\d{10,13}$')
+
+
+class OrderError(ValueError):
+    """Raised when an order can't be placed as submitted"""
+
+
+def add_to_cart(cart, item_name, quantity=1):
+    """Add an item to a session cart (list of lines) and return the cart"""
+    item = get_menu_item(item_name)
+    if item is None:
+        raise OrderError(f"{item_name} is not on the menu")
+    for line in cart:
+        if line['name'] == item_name:
+            line['quantity'] += quantity
+            break
+    else:
+        cart.append({'name': item['name'], 'price': item['price'], 'emoji': item.get('emoji', ''),
+                     'quantity': quantity})
+    return cart
+
+
+def cart_totals(cart):
+    """Item count and subtotal of a session cart"""
+    return sum(line['quantity'] for line in cart), sum(line['price'] * line['quantity'] for line in cart)
+
+
+def _price_lines(cart):
+    """Order lines priced from the current menu, not from what the browser sent"""
+    lines = []
+    for line in cart:
+        item = get_menu_item(line['name'])
+        if item is None:
+            raise OrderError(f"{line['name']} is no longer on the menu")
+        quantity = int(line.get('quantity', 1))
+        if quantity < 1:
+            raise OrderError('Quantities must be at least 1')
+        lines.append({'name': item['name'], 'price': item['price'], 'emoji': item.get('emoji', ''),
+                      'quantity': quantity})
+    return lines
+
+
+def _claim_coupon(code, order_id, now):
+    """Mark a coupon used by `order_id`; the conditional UPDATE lets only one order win it"""
+    table = Coupon.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.code == code, table.c.is_used.is_(False), table.c.expires_at > now)
+        .values(is_used=True, used_by_order_id=order_id)
+    )
+    if result.rowcount != 1:
+        raise OrderError('Invalid or expired coupon code')
+    return Coupon.query.filter_by(code=code).one().get_effect()
+
+
+def place_order(cart, customer_name, customer_phone, customer_address, payment_method='cash',
+                coupon_code=None, notes=None, user_id=None, loyalty_points=0, now=None):
+    """Create an order from cart lines, claiming its coupon, stock and points.
+
+    The coupon claim, stock decrements, loyalty debit and the order row
+    share one transaction: if any item has sold out (OutOfStock) or the
+    coupon or points are gone (OrderError), nothing is written. Returns
+    the committed Order.
+    """
+    customer_name = (customer_name or '').strip()
+    customer_phone = re.sub(r'[\s-]', '', customer_phone or '')
+    customer_address = (customer_address or '').strip()
+    if not customer_name or not customer_address:
+        raise OrderError('Name and address are required')
+    if not PHONE_PATTERN.match(customer_phone):
+        raise OrderError('Please enter a valid phone number')
+    if payment_method not in PAYMENT_METHODS:
+        raise OrderError('Invalid payment method')
+    if not cart:
+        raise OrderError('Your cart is empty')
+    try:
+        loyalty_points = int(loyalty_points or 0)
+    except (TypeError, ValueError):
+        raise OrderError('Invalid loyalty points')
+    if loyalty_points < 0 or (loyalty_points and not user_id):
+        raise OrderError('Loyalty points need a customer account')
+
+    now = now or datetime.utcnow()
+    lines = _price_lines(cart)
+    order_id = generate_order_id()
+    while db.session.query(Order.id).filter_by(order_id=order_id).first():
+        order_id = generate_order_id()
+
+    try:
+        discount = 0
+        coupon_code = (coupon_code or '').strip().upper() or None
+        if coupon_code:
+            effect = _claim_coupon(coupon_code, order_id, now)
+            if effect.get('item'):
+                free_item = get_menu_item(effect['item'])
+                if free_item:
+                    lines.append({'name': free_item['name'], 'price': 0, 'emoji': free_item.get('emoji', ''),
+                                  'quantity': 1, 'free': True})
+            discount = effect.get('discount', 0)
+
+        reserve_stock(lines, now)
+
+        subtotal = sum(line['price'] * line['quantity'] for line in lines)
+        discount = min(discount, subtotal)
+        if loyalty_points:
+            if loyalty_points > max_redeemable(subtotal - discount):
+                raise OrderError(f"At most {max_redeemable(subtotal - discount)} points can be used on this order")
+            try:
+                post_entry(user_id, -loyalty_points, 'redeem', order_id, now)
+            except InsufficientPoints as e:
+                raise OrderError(str(e))
+        order = Order(
+            order_id=order_id,
+            user_id=user_id,
+            customer_name=customer_name,
+            customer_phone=customer_phone,
+            customer_address=customer_address,
+            subtotal=subtotal,
+            discount=discount,
+            total=subtotal - discount - loyalty_points,
+            status='pending',
+            payment_method=payment_method,
+            coupon_code=coupon_code,
+            loyalty_points_used=loyalty_points,
+            estimated_delivery=estimate_delivery('pending', now),
+            notes=(notes or '').strip() or None,
+            created_at=now
+        )
+        order.set_items(lines)
+        db.session.add(order)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return order
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, request, session, make_response, Response
+
+from instrumentation import instrumentation
+
+
+class PageCache:
+    """Rendered public pages for anonymous visitors, held in memory per worker.
+
+    Only GET requests from visitors with an empty session are served from
+    or stored in the cache, and only 200 responses that didn't write to
+    the session. `key` adds whatever else the page depends on (e.g. the
+    catalog version and sold-out items), so stale entries simply stop
+    matching; everything else expires after PAGE_CACHE_SECONDS. Responses
+    carry an ETag and Last-Modified, so repeat visitors revalidate with a
+    304 instead of downloading the page again.
+    """
+
+    def __init__(self):
+        self.entries = {}  # key -> (stored_at, body, mimetype, etag, last_modified)
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get(self, key, ttl):
+        entry = self.entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry
+        return None
+
+    def store(self, key, body, mimetype, ttl):
+        entry = (time.monotonic(), body, mimetype, hashlib.sha1(body).hexdigest(),
+                 datetime.now(timezone.utc).replace(microsecond=0))
+        with self.lock:
+            if len(self.entries) >= current_app.config['PAGE_CACHE_MAX_ENTRIES']:
+                now = time.monotonic()
+                self.entries = {k: e for k, e in self.entries.items() if now - e[0] < ttl}
+                if len(self.entries) >= current_app.config['PAGE_CACHE_MAX_ENTRIES']:
+                    self.entries.clear()
+            self.entries[key] = entry
+        return entry
+
+    def cached(self, key=None):
+        """Decorator for views whose anonymous output is the same for everyone"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not current_app.config['PAGE_CACHE_ENABLED'] or request.method != 'GET' or session:
+                    return view(*args, **kwargs)
+
+                ttl = current_app.config['PAGE_CACHE_SECONDS']
+                cache_key = (request.full_path, key() if key else None)
+                entry = self.get(cache_key, ttl)
+                instrumentation.registry.record_cache('page', request.endpoint, entry is not None)
+                if entry is not None:
+                    status = 'HIT'
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough or session.modified:
+                        return response
+                    entry = self.store(cache_key, response.get_data(), response.mimetype, ttl)
+                    status = 'MISS'
+
+                stored_at, body, mimetype, etag, last_modified = entry
+                response = Response(body, mimetype=mimetype)
+                response.set_etag(etag)
+                response.last_modified = last_modified
+                response.cache_control.public = True
+                response.cache_control.max_age = ttl
+                response.vary.add('Cookie')
+                response.headers['X-Cache'] = status
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+
+page_cache = PageCache()
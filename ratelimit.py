@@ -0,0 +1,154 @@
+import math
+import re
+import threading
+import time
+
+from flask import request, session, jsonify, Response
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+RATE_PATTERN = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+
+
+def parse_rate(rate):
+    """'10/minute' or '3/10minutes' -> (bucket capacity, tokens refilled per second)"""
+    match = RATE_PATTERN.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    count, multiple, unit = int(match.group(1)), int(match.group(2) or 1), match.group(3)
+    return count, count / (multiple * PERIODS[unit])
+
+
+class MemoryBackend:
+    """Token buckets in process memory; limits are per worker"""
+
+    def __init__(self, prune_every=1000):
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.prune_every = prune_every
+        self.calls = 0
+
+    def consume(self, key, capacity, refill):
+        """Take a token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                retry_after = 0
+            else:
+                self.buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / refill
+            self.calls += 1
+            if self.calls % self.prune_every == 0:
+                self._prune(now)
+        return retry_after
+
+    def _prune(self, now):
+        # Buckets idle for an hour have refilled for any sensible rate, and a new bucket starts full
+        for key, (tokens, updated) in list(self.buckets.items()):
+            if now - updated > 3600:
+                del self.buckets[key]
+
+
+class RedisBackend:
+    """Token buckets in Redis, shared by every worker and node.
+
+    The refill-and-take step runs as one Lua script using the Redis clock,
+    so it is atomic and immune to clock skew between app servers.
+    """
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local refill = tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * refill)
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) / refill
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill) + 1)
+    return tostring(retry_after)
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RATELIMIT_STORAGE_URL points at Redis but the redis package is not installed')
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+        self.prefix = prefix
+
+    def consume(self, key, capacity, refill):
+        return float(self.script(keys=[self.prefix + key], args=[capacity, refill]))
+
+
+class RateLimiter:
+    """Per-route token bucket limits applied before each request.
+
+    Rules in RATELIMIT_RULES are keyed by endpoint ('main.check_coupon')
+    or blueprint ('customer'); the most specific match wins. Each rule has
+    a `rate`, what to `key` buckets by ('ip' or 'user', which falls back to
+    the IP for anonymous visitors) and optionally the `methods` it covers.
+    Requests over the limit get a 429 with a Retry-After header.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.rules = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config['RATELIMIT_ENABLED']:
+            return
+        url = app.config['RATELIMIT_STORAGE_URL']
+        self.backend = MemoryBackend() if url.startswith('memory://') else RedisBackend(url)
+        self.rules = {
+            name: dict(rule, bucket=parse_rate(rule['rate']))
+            for name, rule in app.config['RATELIMIT_RULES'].items()
+        }
+        if app.config['RATELIMIT_TRUSTED_PROXIES']:
+            from werkzeug.middleware.proxy_fix import ProxyFix
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['RATELIMIT_TRUSTED_PROXIES'])
+        app.before_request(self.check)
+
+    def rule_for(self, endpoint, blueprint):
+        for name in (endpoint, blueprint):
+            rule = self.rules.get(name)
+            if rule and request.method in rule.get('methods', (request.method,)):
+                return name, rule
+        return None, None
+
+    def check(self):
+        name, rule = self.rule_for(request.endpoint, request.blueprint)
+        if rule is None:
+            return None
+        client = request.remote_addr or 'unknown'
+        if rule.get('key') == 'user' and session.get('user_id'):
+            client = f"user:{session['user_id']}"
+        capacity, refill = rule['bucket']
+        retry_after = self.backend.consume(f"{name}:{client}", capacity, refill)
+        if not retry_after:
+            return None
+
+        retry_after = str(max(1, math.ceil(retry_after)))
+        message = 'Too many requests, please try again later.'
+        if request.is_json or request.path.startswith('/api/'):
+            response = jsonify({'success': False, 'error': message})
+            response.status_code = 429
+        else:
+            response = Response(message, status=429, mimetype='text/plain')
+        response.headers['Retry-After'] = retry_after
+        return response
+
+
+rate_limiter = RateLimiter()
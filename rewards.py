@@ -0,0 +1,210 @@
+import hashlib
+import json
+import secrets
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Order, Coupon, SpinPrizeCount
+from order_status import mark_changed
+from config import SPIN_REWARDS, SPIN_CAMPAIGNS, generate_coupon_code
+
+spin_cli = AppGroup('spin', help='Spin wheel reward tables.')
+
+
+class SpinNotAllowed(ValueError):
+    """Raised when an order has no spin left to claim"""
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per weighted draw.
+
+    `indices` maps table slots back to positions in the caller's list, so
+    a table can cover a subset of rewards (e.g. with capped prizes removed).
+    """
+
+    def __init__(self, weights, indices=None):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError('Alias table needs at least one positive weight')
+        self.indices = list(indices) if indices is not None else list(range(n))
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s], self.alias[s] = scaled[s], l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        # Whatever is left is 1 up to rounding error
+
+    def draw(self, rng):
+        slot = rng.randrange(len(self.prob))
+        return self.indices[slot if rng.random() < self.prob[slot] else self.alias[slot]]
+
+    def probabilities(self):
+        """Exact probability of each index, recovered from the table"""
+        n = len(self.prob)
+        result = Counter()
+        for slot, p in enumerate(self.prob):
+            result[self.indices[slot]] += p / n
+            result[self.indices[self.alias[slot]]] += (1 - p) / n
+        return result
+
+
+def rewards_version(rewards):
+    """Stable fingerprint of a reward configuration"""
+    return hashlib.sha1(json.dumps(rewards, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:12]
+
+
+# Drawn when every reward on the wheel is capped out for the day (or has no weight)
+NO_REWARD = {'name': 'Better luck next time', 'emoji': '❌', 'effect': None}
+
+
+class RewardEngine:
+    """Draws spin wheel rewards from cached alias tables.
+
+    Tables are built once per (campaign, configuration version, excluded
+    prizes) and reused for every spin. Draws use the OS CSPRNG since prizes
+    have real value. Rewards with a `daily_cap` are counted per day in
+    spin_prize_counts; once a cap is reached the prize is taken off the
+    wheel and the spin is redrawn from the remaining rewards.
+    """
+
+    def __init__(self, rng=None):
+        self.rng = rng or secrets.SystemRandom()
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def rewards_for(campaign):
+        if campaign:
+            if campaign not in SPIN_CAMPAIGNS:
+                raise ValueError(f"Unknown spin campaign: {campaign}")
+            return SPIN_CAMPAIGNS[campaign]
+        return SPIN_REWARDS
+
+    def table(self, campaign, excluded=frozenset()):
+        """Rewards and their alias table; the table is None when nothing is left to draw"""
+        rewards = self.rewards_for(campaign)
+        key = (campaign or '', rewards_version(rewards), excluded)
+        if key in self.tables:
+            return rewards, self.tables[key]
+        with self.lock:
+            if key not in self.tables:
+                indices = [i for i, r in enumerate(rewards) if r['name'] not in excluded and r['weight'] > 0]
+                self.tables[key] = AliasTable([rewards[i]['weight'] for i in indices], indices) if indices else None
+        return rewards, self.tables[key]
+
+    def _take_capped(self, day, campaign, reward_name, cap):
+        """Count one award of a capped prize; False once today's cap is used up"""
+        if cap <= 0:
+            return False
+        counts = SpinPrizeCount.__table__
+        take = counts.update().where(
+            counts.c.day == day, counts.c.campaign == campaign,
+            counts.c.reward_name == reward_name, counts.c.awarded < cap
+        ).values(awarded=counts.c.awarded + 1)
+        if db.session.execute(take).rowcount == 1:
+            return True
+        if db.session.get(SpinPrizeCount, (day, campaign, reward_name)) is not None:
+            return False
+        try:
+            with db.session.begin_nested():
+                db.session.add(SpinPrizeCount(day=day, campaign=campaign, reward_name=reward_name, awarded=1))
+            return True
+        except IntegrityError:
+            # Another spin created today's row first
+            return db.session.execute(take).rowcount == 1
+
+    def spin(self, campaign=None, now=None):
+        """Draw a reward for one spin; the cap counter joins the caller's transaction"""
+        campaign = campaign if campaign is not None else current_app.config.get('SPIN_CAMPAIGN')
+        day = (now or datetime.utcnow()).date()
+        excluded = frozenset()
+        while True:
+            rewards, table = self.table(campaign, excluded)
+            if table is None:
+                return NO_REWARD
+            reward = rewards[table.draw(self.rng)]
+            cap = reward.get('daily_cap')
+            if cap is None or self._take_capped(day, campaign or '', reward['name'], cap):
+                return reward
+            excluded = excluded | {reward['name']}
+
+
+reward_engine = RewardEngine()
+
+
+def eligible_spin_orders(user_id, limit=20):
+    """A customer's delivered orders with an unused spin, served by ix_orders_spin_eligible"""
+    return Order.query.filter(
+        Order.user_id == user_id, Order.status == 'delivered', Order.spin_used == False  # noqa: E712
+    ).order_by(Order.created_at.desc()).limit(limit).all()
+
+
+def claim_spin(order_id, user_id=None, now=None):
+    """Use an order's spin and issue the coupon it wins, in one transaction.
+
+    The spin is claimed with a conditional UPDATE on spin_used, so of two
+    concurrent requests for the same order exactly one gets a reward.
+    Orders placed from an account can only be spun by that account.
+    Raises SpinNotAllowed. Returns the reward with its coupon code.
+    """
+    now = now or datetime.utcnow()
+    orders = Order.__table__
+    claim = orders.update().where(
+        orders.c.order_id == order_id, orders.c.status == 'delivered', orders.c.spin_used.is_(False),
+        orders.c.user_id.is_(None) | (orders.c.user_id == user_id)
+    ).values(spin_used=True, updated_at=now)
+    try:
+        if db.session.execute(claim).rowcount != 1:
+            raise SpinNotAllowed('This order has no spin available')
+        mark_changed(order_id)
+        reward = reward_engine.spin(now=now)
+        coupon_code = None
+        if reward.get('effect'):
+            coupon = Coupon(
+                code=generate_coupon_code(),
+                reward_name=reward['name'],
+                expires_at=now + timedelta(days=current_app.config['SPIN_COUPON_VALID_DAYS']),
+                created_at=now
+            )
+            coupon.set_effect(reward['effect'])
+            db.session.add(coupon)
+            coupon_code = coupon.code
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {
+        'reward_name': reward['name'],
+        'emoji': reward['emoji'],
+        'effect': reward.get('effect'),
+        'coupon_code': coupon_code,
+    }
+
+
+@spin_cli.command('odds')
+@click.option('--campaign', help='Campaign from SPIN_CAMPAIGNS (default wheel if omitted).')
+def odds_command(campaign):
+    """Print each reward's probability and daily cap."""
+    rewards, table = reward_engine.table(campaign)
+    if table is None:
+        raise click.ClickException('No reward on this wheel has a positive weight')
+    probabilities = table.probabilities()
+    click.echo(f"version {rewards_version(rewards)}")
+    for i, reward in enumerate(rewards):
+        cap = reward.get('daily_cap')
+        click.echo(f"{probabilities[i] * 100:>7.3f}%  {reward['name']}{f'  (max {cap}/day)' if cap else ''}")
+
@@ -0,0 +1,237 @@
+import gzip
+import itertools
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+
+from extensions import db
+from models import Order, DailySales, DailyItemSales
+from exports import EXPORTS, PERSONAL_COLUMNS, iter_rows, csv_chunks
+
+logger = logging.getLogger(__name__)
+
+# The admin orders export minus customer contact details
+EXPORT_COLUMNS = tuple(column for column in EXPORTS['orders'][1] if column not in PERSONAL_COLUMNS)
+
+rollups_cli = AppGroup('rollups', help='Daily sales rollups and order exports.')
+
+
+def day_bounds(day):
+    """Half-open [start, end) datetime range for a calendar day, usable with the created_at index"""
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def rollup_day(day):
+    """Recompute the daily_sales and daily_item_sales rows for one day.
+
+    Counts come from a single grouped query over the day's orders; item
+    totals are summed from delivered orders streamed in batches. The old
+    rows are replaced in the same transaction, so re-running is safe.
+    """
+    start, end = day_bounds(day)
+    in_day = (Order.created_at >= start, Order.created_at < end)
+
+    summary = DailySales(day=day, orders_count=0, delivered_count=0, cancelled_count=0,
+                         revenue=0, discount_total=0, items_sold=0)
+    for status, count, revenue, discount in db.session.query(
+        Order.status, db.func.count(Order.id), db.func.sum(Order.total), db.func.sum(Order.discount)
+    ).filter(*in_day).group_by(Order.status):
+        summary.orders_count += count
+        if status == 'delivered':
+            summary.delivered_count = count
+            summary.revenue = float(revenue or 0)
+            summary.discount_total = float(discount or 0)
+        elif status == 'cancelled':
+            summary.cancelled_count = count
+
+    items = defaultdict(lambda: [0, 0.0])
+    rows = db.session.query(Order.items).filter(*in_day, Order.status == 'delivered') \
+        .execution_options(yield_per=1000)
+    for (raw_items,) in rows:
+        for item in json.loads(raw_items or '[]'):
+            quantity = item.get('quantity', 1)
+            items[item['name']][0] += quantity
+            items[item['name']][1] += item.get('price', 0) * quantity
+    summary.items_sold = sum(quantity for quantity, _ in items.values())
+
+    try:
+        DailyItemSales.query.filter_by(day=day).delete()
+        DailySales.query.filter_by(day=day).delete()
+        db.session.add(summary)
+        if items:
+            db.session.execute(DailyItemSales.__table__.insert(), [
+                {'day': day, 'item_name': name, 'quantity': quantity, 'revenue': revenue}
+                for name, (quantity, revenue) in items.items()
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def rollup_recent(days=2, today=None):
+    """Roll up the last `days` complete days plus today.
+
+    Re-running recent days picks up orders delivered or cancelled after
+    their creation day was first rolled up.
+    """
+    today = today or datetime.utcnow().date()
+    return [rollup_day(today - timedelta(days=offset)) for offset in range(days, -1, -1)]
+
+
+def sales_overview():
+    """Lifetime delivered revenue and order counts.
+
+    Closed days come from rollups; today and every day without a rollup
+    (before the first one, gaps in between, after the last) are summed
+    live over the created_at index.
+    """
+    today = datetime.utcnow().date()
+    rolled = DailySales.query.filter(DailySales.day < today)
+    revenue, delivered = rolled.with_entities(
+        db.func.sum(DailySales.revenue), db.func.sum(DailySales.delivered_count)
+    ).one()
+    revenue, delivered = float(revenue or 0), int(delivered or 0)
+
+    # created_at ranges not covered by a rollup row
+    uncovered, covered_until = [], None
+    for (day,) in rolled.with_entities(DailySales.day).order_by(DailySales.day):
+        start, end = day_bounds(day)
+        if covered_until is None:
+            uncovered.append(Order.created_at < start)
+        elif start > covered_until:
+            uncovered.append(db.and_(Order.created_at >= covered_until, Order.created_at < start))
+        covered_until = end
+
+    live = db.session.query(db.func.sum(Order.total), db.func.count(Order.id)).filter(Order.status == 'delivered')
+    if covered_until is not None:
+        live = live.filter(db.or_(*uncovered, Order.created_at >= covered_until))
+    live_revenue, live_delivered = live.one()
+    return {
+        'total_revenue': revenue + float(live_revenue or 0),
+        'delivered_orders': delivered + int(live_delivered or 0),
+    }
+
+
+def daily_report(days=30, top=5):
+    """Daily rows and best-selling items for the last `days` days, read from rollups"""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    daily = DailySales.query.filter(DailySales.day >= since).order_by(DailySales.day).all()
+    top_items = db.session.query(
+        DailyItemSales.item_name, db.func.sum(DailyItemSales.quantity), db.func.sum(DailyItemSales.revenue)
+    ).filter(DailyItemSales.day >= since).group_by(DailyItemSales.item_name) \
+        .order_by(db.func.sum(DailyItemSales.quantity).desc()).limit(top).all()
+    return {
+        'daily': [row.to_dict() for row in daily],
+        'top_items': [
+            {'item_name': name, 'quantity': int(quantity or 0), 'revenue': float(revenue or 0)}
+            for name, quantity, revenue in top_items
+        ],
+    }
+
+
+def _order_rows(start, end):
+    return iter_rows('orders', start, end, batch_size=5000, columns=EXPORT_COLUMNS)
+
+
+def _write_csv(path, rows):
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with gzip.open(path, 'wt', newline='', encoding='utf-8') as f:
+        for chunk in csv_chunks(EXPORT_COLUMNS, counted()):
+            f.write(chunk)
+    return count
+
+
+def _write_parquet(path, rows, batch_size=50000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    count, writer = 0, None
+    try:
+        while True:
+            batch = [row for _, row in zip(range(batch_size), rows)]
+            if not batch:
+                break
+            table = pa.Table.from_pylist([dict(zip(EXPORT_COLUMNS, row)) for row in batch])
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table.cast(writer.schema))
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def export_orders(out_dir, start_day, end_day, fmt='csv'):
+    """Write orders to one file per day under `out_dir/orders/day=YYYY-MM-DD/`.
+
+    `fmt` is 'csv' (gzip) or 'parquet' (needs pyarrow). Rows are streamed
+    from the database, so memory stays flat regardless of volume.
+    Returns {day: row_count} for the days that had orders.
+    """
+    filename = {'csv': 'orders.csv.gz', 'parquet': 'orders.parquet'}[fmt]
+    writer = _write_parquet if fmt == 'parquet' else _write_csv
+    written = {}
+    day = start_day
+    while day <= end_day:
+        start, end = day_bounds(day)
+        rows = _order_rows(start, end)
+        first = next(rows, None)
+        if first is not None:
+            partition = os.path.join(out_dir, 'orders', f"day={day.isoformat()}")
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, filename)
+            tmp_path = path + '.tmp'
+            written[day.isoformat()] = writer(tmp_path, itertools.chain([first], rows))
+            os.replace(tmp_path, path)
+        day += timedelta(days=1)
+    return written
+
+
+def _parse_day(value):
+    return date.fromisoformat(value) if value else None
+
+
+@rollups_cli.command('run')
+@click.option('--date', 'day', help='Roll up a single day (YYYY-MM-DD).')
+@click.option('--days', default=2, show_default=True, help='Complete days to recompute before today.')
+def run_command(day, days):
+    """Recompute daily rollups (schedule nightly)."""
+    summaries = [rollup_day(_parse_day(day))] if day else rollup_recent(days)
+    for summary in summaries:
+        click.echo(f"{summary.day}: {summary.orders_count} orders, ₹{summary.revenue:.2f} delivered revenue")
+
+
+@rollups_cli.command('export')
+@click.argument('out_dir', type=click.Path(file_okay=False))
+@click.option('--start', help='First day (YYYY-MM-DD), default yesterday.')
+@click.option('--end', help='Last day (YYYY-MM-DD), default same as --start.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'parquet']), default='csv', show_default=True)
+def export_command(out_dir, start, end, fmt):
+    """Export orders partitioned by day for offline analysis."""
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise click.ClickException('Parquet export needs pyarrow; install it or use --format csv')
+    start_day = _parse_day(start) or datetime.utcnow().date() - timedelta(days=1)
+    end_day = _parse_day(end) or start_day
+    written = export_orders(out_dir, start_day, end_day, fmt)
+    for day, count in written.items():
+        click.echo(f"{day}: {count} orders")
+    click.echo(f"Exported {sum(written.values())} orders in {len(written)} partitions")
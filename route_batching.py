@@ -0,0 +1,235 @@
+import csv
+import logging
+import math
+import re
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+from models import GeoLocation
+
+logger = logging.getLogger(__name__)
+
+PINCODE_RE = re.compile(r'\b(\d{6})\b')
+
+geo_cli = AppGroup('geo', help='Offline geocoding lookup table.')
+
+
+def haversine_km(a, b):
+    """Great-circle distance between two (lat, lng) points in kilometres"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+class Geocoder:
+    """Resolve free-text addresses against the local `geo_locations` table.
+
+    A six-digit pincode in the address wins; otherwise the longest known
+    locality name contained in the address is used. The table is read once
+    and kept in memory, so geocoding never leaves the process.
+    """
+
+    def __init__(self, rows):
+        self.by_pincode = {}
+        self.localities = []
+        for pincode, locality, lat, lng in rows:
+            if pincode:
+                self.by_pincode.setdefault(pincode.strip(), (lat, lng))
+            if locality:
+                self.localities.append((locality.strip().lower(), (lat, lng)))
+        self.localities.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    def geocode(self, address):
+        """Return (lat, lng) for an address, or None if it can't be placed"""
+        if not address:
+            return None
+        for pincode in PINCODE_RE.findall(address):
+            if pincode in self.by_pincode:
+                return self.by_pincode[pincode]
+        text = address.lower()
+        for locality, point in self.localities:
+            if locality in text:
+                return point
+        return None
+
+
+_geocoder = None
+
+
+def get_geocoder():
+    """Process-wide geocoder, loaded lazily from the lookup table"""
+    global _geocoder
+    if _geocoder is None:
+        rows = db.session.query(
+            GeoLocation.pincode, GeoLocation.locality, GeoLocation.latitude, GeoLocation.longitude
+        ).all()
+        _geocoder = Geocoder(rows)
+    return _geocoder
+
+
+def reset_geocoder():
+    """Drop the cached lookup table so the next call reloads it"""
+    global _geocoder
+    _geocoder = None
+
+
+def path_length(origin, points, order):
+    """Length of the open path origin -> points[order[0]] -> ... in kilometres (no depot leg if origin is None)"""
+    total, prev = 0.0, origin
+    for idx in order:
+        if prev is not None:
+            total += haversine_km(prev, points[idx])
+        prev = points[idx]
+    return total
+
+
+def nearest_neighbour(origin, points):
+    """Visit order starting at origin (or the first stop), always going to the closest unvisited stop"""
+    remaining = set(range(len(points)))
+    order, current = [], origin if origin is not None else points[0]
+    while remaining:
+        nxt = min(remaining, key=lambda idx: haversine_km(current, points[idx]))
+        order.append(nxt)
+        remaining.remove(nxt)
+        current = points[nxt]
+    return order
+
+
+def two_opt(origin, points, order):
+    """Improve a visit order by reversing segments until no reversal shortens it"""
+    best = list(order)
+    best_len = path_length(origin, points, best)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(best) - 1):
+            for j in range(i + 1, len(best)):
+                candidate = best[:i] + best[i:j + 1][::-1] + best[j + 1:]
+                candidate_len = path_length(origin, points, candidate)
+                if candidate_len < best_len - 1e-9:
+                    best, best_len = candidate, candidate_len
+                    improved = True
+    return best
+
+
+def _time_windows(stops, window):
+    """Split stops (sorted by ready time) into consecutive windows of `window` length"""
+    windows, current = [], []
+    for stop in stops:
+        if current and stop['ready_at'] - current[0]['ready_at'] > window:
+            windows.append(current)
+            current = []
+        current.append(stop)
+    if current:
+        windows.append(current)
+    return windows
+
+
+def _cluster(origin, stops, radius_km, max_drops):
+    """Farthest-first proximity clustering: seed with the farthest stop and
+    pull in its nearest neighbours within `radius_km`, up to `max_drops`.
+    Without an origin, stops seed clusters in the order given."""
+    remaining = list(stops)
+    if origin is not None:
+        remaining.sort(key=lambda s: haversine_km(origin, s['point']), reverse=True)
+    clusters = []
+    while remaining:
+        seed = remaining.pop(0)
+        members = [seed]
+        nearby = sorted(
+            (s for s in remaining if haversine_km(seed['point'], s['point']) <= radius_km),
+            key=lambda s: haversine_km(seed['point'], s['point']),
+        )
+        for stop in nearby[:max_drops - 1]:
+            members.append(stop)
+            remaining.remove(stop)
+        clusters.append(members)
+    return clusters
+
+
+def plan_runs(orders, origin, geocoder, radius_km=2.0, window_minutes=15, max_drops=4):
+    """Group orders into multi-drop runs ordered for driving.
+
+    `orders` are dicts with `order_id`, `customer_address` and `ready_at`.
+    Returns a list of runs, each with its ordered stops and path length;
+    addresses that can't be geocoded come last as single-drop runs. With
+    `origin` None (restaurant location not configured) runs are planned
+    between the drops only and distances leave out the ride from the
+    restaurant.
+    """
+    located, unlocated = [], []
+    for order in orders:
+        point = geocoder.geocode(order['customer_address'])
+        stop = dict(order, point=point)
+        (located if point else unlocated).append(stop)
+
+    located.sort(key=lambda s: s['ready_at'])
+    runs = []
+    for window in _time_windows(located, timedelta(minutes=window_minutes)):
+        for members in _cluster(origin, window, radius_km, max_drops):
+            points = [m['point'] for m in members]
+            order = two_opt(origin, points, nearest_neighbour(origin, points))
+            runs.append({
+                'stops': [_stop_dict(members[idx]) for idx in order],
+                'distance_km': round(path_length(origin, points, order), 2),
+            })
+
+    for stop in unlocated:
+        runs.append({'stops': [_stop_dict(stop)], 'distance_km': None})
+    return runs
+
+
+def _stop_dict(stop):
+    point = stop['point']
+    return {
+        'order_id': stop['order_id'],
+        'customer_address': stop['customer_address'],
+        'lat': point[0] if point else None,
+        'lng': point[1] if point else None,
+    }
+
+
+def plan_runs_for_orders(orders):
+    """Plan runs for Order rows using the app's configured depot and limits"""
+    config = current_app.config
+    return plan_runs(
+        [{'order_id': o.order_id, 'customer_address': o.customer_address, 'ready_at': o.created_at}
+         for o in orders],
+        origin=config['RESTAURANT_LOCATION'],
+        geocoder=get_geocoder(),
+        radius_km=config['ROUTE_CLUSTER_RADIUS_KM'],
+        window_minutes=config['ROUTE_TIME_WINDOW_MINUTES'],
+        max_drops=config['ROUTE_MAX_DROPS'],
+    )
+
+
+@geo_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--replace', is_flag=True, help='Clear the existing table first.')
+def import_command(path, replace):
+    """Load a CSV with pincode,locality,latitude,longitude columns."""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [
+            {
+                'pincode': (row.get('pincode') or '').strip() or None,
+                'locality': (row.get('locality') or '').strip() or None,
+                'latitude': float(row['latitude']),
+                'longitude': float(row['longitude']),
+            }
+            for row in csv.DictReader(f)
+        ]
+    try:
+        if replace:
+            db.session.query(GeoLocation).delete()
+        if rows:
+            db.session.execute(GeoLocation.__table__.insert(), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    reset_geocoder()
+    click.echo(f"Imported {len(rows)} locations")
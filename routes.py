@@ -1,15 +1,38 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, jsonify, session,
+    Response, stream_with_context, g
+)
 from datetime import datetime, timedelta
-import random, json, qrcode, base64
+import random, json, base64
 from io import BytesIO
 
-from extensions import db
-from models import User, Order, Coupon, SupportTicket, Notification
+from extensions import db, lazy_import
+from models import User, Order, Coupon, SupportTicket, Notification, CatalogVersion, ItemStock
 from auth import (
     login_user, logout_user, get_current_user, is_logged_in, 
     login_required, admin_required, delivery_required, authenticate_user
 )
-from config import MENU_CONFIG, SPIN_REWARDS, generate_coupon_code, generate_order_id, Config
+from config import SPIN_REWARDS, generate_coupon_code, generate_order_id, Config
+from dispatch import run_dispatch, DISPATCHABLE_STATUSES, ACTIVE_STATUSES
+from route_batching import plan_runs_for_orders
+from kitchen import kitchen_queue
+from rollups import sales_overview, daily_report, rollup_recent
+from analytics import get_reports, REPORTS
+from forecast import get_forecast
+from exports import EXPORTS, FORMATS, stream_export, export_filename, parse_date_range
+from catalog import get_menu, parse_catalog, import_catalog, catalog_cache, CatalogError, CatalogConflict
+from page_cache import page_cache
+from search import search, SEARCH_INDEXES
+from triage import triage_queue, bulk_update_tickets, response_times, TICKET_STATUSES
+from stock import set_stock, get_sold_out, OutOfStock
+from loyalty import user_history
+from rewards import claim_spin, eligible_spin_orders, SpinNotAllowed
+from ordering import add_to_cart as add_cart_item, cart_totals, place_order as create_order, OrderError
+from order_status import (
+    change_status, bulk_change_status, latency_histograms, status_snapshots, InvalidTransition, ORDER_STATUSES
+)
+
+qrcode = lazy_import('qrcode')  # pulls in Pillow; only needed once an order is placed
 
 # Create blueprints
 main_bp = Blueprint('main', __name__)
@@ -18,10 +41,18 @@ delivery_bp = Blueprint('delivery', __name__)
 customer_bp = Blueprint('customer', __name__)
 support_bp = Blueprint('support', __name__)
 
+def menu_cache_key():
+    """What the public menu pages depend on besides the URL (computed once per request)"""
+    if 'menu_cache_key' not in g:
+        get_menu()  # refreshes catalog_cache.version
+        g.menu_cache_key = catalog_cache.version, tuple(sorted(get_sold_out()))
+    return g.menu_cache_key
+
 # ===================== MAIN ROUTES =====================
 @main_bp.route('/')
+@page_cache.cached(key=menu_cache_key)
 def index():
-    return render_template('index.html', menu=MENU_CONFIG, support_phone=Config.SUPPORT_PHONE)
+    return render_template('index.html', menu=get_menu(), support_phone=Config.SUPPORT_PHONE)
 
 @main_bp.route('/logout')
 def logout():
@@ -51,8 +82,9 @@ def login_admin():
 def dashboard_admin():
     total_orders = Order.query.count()
     pending_orders = Order.query.filter_by(status='pending').count()
-    delivered_orders = Order.query.filter_by(status='delivered').count()
-    total_revenue = db.session.query(db.func.sum(Order.total)).filter_by(status='delivered').scalar() or 0
+    sales = sales_overview()
+    delivered_orders = sales['delivered_orders']
+    total_revenue = sales['total_revenue']
     recent_orders = Order.query.order_by(Order.created_at.desc()).limit(10).all()
     open_tickets = SupportTicket.query.filter_by(status='open').count()
     
@@ -63,9 +95,233 @@ def dashboard_admin():
         'total_revenue': total_revenue,
         'open_tickets': open_tickets
     }
-    return render_template('admin/dashboard.html', stats=stats, recent_orders=recent_orders)
+    return render_template('admin/dashboard.html', stats=stats, recent_orders=recent_orders,
+                           forecast=get_forecast())
+
+@admin_bp.route('/forecast')
+@admin_required
+def forecast():
+    hours = max(1, min(request.args.get('hours', Config.FORECAST_HORIZON_HOURS, type=int), 48))
+    return jsonify(get_forecast(hours))
+
+@admin_bp.route('/update_order_status', methods=['POST'])
+@admin_required
+def update_order_status():
+    data = request.get_json() or {}
+    new_status = data.get('status')
+    if new_status not in ORDER_STATUSES:
+        return jsonify({'success': False, 'error': 'Invalid status'}), 400
+    
+    order = Order.query.filter_by(order_id=data.get('order_id')).first()
+    if not order:
+        return jsonify({'success': False, 'error': 'Order not found'}), 404
+    
+    try:
+        change_status(order, new_status, actor_id=session.get('user_id'))
+    except InvalidTransition as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    db.session.commit()
+    return jsonify({'success': True, 'order': order.to_dict()})
+
+@admin_bp.route('/bulk_update_order_status', methods=['POST'])
+@admin_required
+def bulk_update_order_status():
+    data = request.get_json() or {}
+    new_status = data.get('status')
+    order_ids = data.get('order_ids') or []
+    if new_status not in ORDER_STATUSES:
+        return jsonify({'success': False, 'error': 'Invalid status'}), 400
+    if not isinstance(order_ids, list) or not all(isinstance(o, str) for o in order_ids):
+        return jsonify({'success': False, 'error': 'order_ids must be a list of order IDs'}), 400
+    if not order_ids:
+        return jsonify({'success': False, 'error': 'No orders selected'}), 400
+    
+    updated, skipped = bulk_change_status(order_ids, new_status, actor_id=session.get('user_id'))
+    return jsonify({'success': True, 'updated': updated, 'skipped': skipped})
+
+@admin_bp.route('/order_latency')
+@admin_required
+def order_latency():
+    days = request.args.get('days', 7, type=int)
+    since = datetime.utcnow() - timedelta(days=days)
+    return jsonify({'days': days, 'transitions': latency_histograms(since)})
+
+@admin_bp.route('/kitchen')
+@admin_required
+def kitchen():
+    kitchen_queue.sync()
+    return render_template('admin/kitchen.html', queue=kitchen_queue.snapshot())
+
+@admin_bp.route('/kitchen/queue')
+@admin_required
+def kitchen_queue_api():
+    kitchen_queue.sync()
+    return jsonify(kitchen_queue.snapshot())
+
+@admin_bp.route('/analytics/daily')
+@admin_required
+def analytics_daily():
+    days = min(request.args.get('days', 30, type=int), 366)
+    return jsonify(daily_report(days=days))
+
+@admin_bp.route('/analytics/reports')
+@admin_bp.route('/analytics/reports/<report>')
+@admin_required
+def analytics_reports(report=None):
+    if report and report not in REPORTS:
+        return jsonify({'error': 'Unknown report'}), 404
+    days = max(1, min(request.args.get('days', 30, type=int), Config.ANALYTICS_MAX_DAYS))
+    reports = get_reports(days)
+    if report:
+        return jsonify({'generated_at': reports['generated_at'], 'days': days, report: reports[report]})
+    return jsonify(reports)
+
+@admin_bp.route('/export/<kind>')
+@admin_required
+def export_data(kind):
+    fmt = request.args.get('format', 'csv')
+    if kind not in EXPORTS or fmt not in FORMATS:
+        return jsonify({'error': 'Unknown export'}), 404
+    try:
+        start, end = parse_date_range(request.args.get('start'), request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    compress = request.args.get('gzip', '1') != '0'
+    
+    chunks = stream_export(kind, fmt, compress=compress, start=start, end=end,
+                           status=request.args.get('status'))
+    mimetype = 'application/gzip' if compress else FORMATS[fmt][0]
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{export_filename(kind, fmt, compress)}"'
+    })
+
+@admin_bp.route('/search/<kind>')
+@admin_required
+def search_admin(kind):
+    if kind not in SEARCH_INDEXES:
+        return jsonify({'error': 'Unknown search'}), 404
+    page = max(1, min(request.args.get('page', 1, type=int), Config.SEARCH_MAX_PAGES))
+    per_page = max(1, min(request.args.get('per_page', Config.SEARCH_PAGE_SIZE, type=int),
+                          Config.SEARCH_MAX_PAGE_SIZE))
+    rows, has_more = search(kind, request.args.get('q', ''), page, per_page)
+    return jsonify({
+        'results': [row.to_dict() for row in rows],
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more
+    })
+
+@admin_bp.route('/catalog')
+@admin_required
+def catalog():
+    versions = CatalogVersion.query.order_by(CatalogVersion.version.desc()).limit(20).all()
+    return jsonify({
+        'current_version': catalog_cache.version,
+        'menu': get_menu(),
+        'versions': [version.to_dict() for version in versions]
+    })
+
+@admin_bp.route('/catalog/import', methods=['POST'])
+@admin_required
+def import_catalog_admin():
+    upload = request.files.get('file')
+    try:
+        if upload:
+            fmt = 'csv' if upload.filename.lower().endswith('.csv') else 'json'
+            rows = parse_catalog(upload.read().decode('utf-8'), fmt)
+            replace = request.form.get('replace') == '1'
+            note = request.form.get('note')
+        else:
+            data = request.get_json() or {}
+            if not isinstance(data, dict):
+                return jsonify({'success': False, 'error': 'Send a JSON object with an items list'}), 400
+            rows = data.get('items') or []
+            replace = bool(data.get('replace'))
+            note = data.get('note')
+        published = import_catalog(rows, replace=replace, note=note, actor_id=session.get('user_id'))
+    except CatalogError as e:
+        return jsonify({'success': False, 'error': str(e), 'rows': e.errors}), 400
+    except CatalogConflict as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Could not parse catalog file'}), 400
+    
+    catalog_cache.refresh(force=True)
+    return jsonify({'success': True, 'version': published.to_dict()})
+
+@admin_bp.route('/stock')
+@admin_required
+def stock_levels():
+    return jsonify({'stock': [stock.to_dict() for stock in ItemStock.query.order_by(ItemStock.item_name)]})
+
+@admin_bp.route('/stock', methods=['POST'])
+@admin_required
+def update_stock():
+    data = request.get_json() or {}
+    quantity = data.get('quantity')
+    try:
+        stock = set_stock(data.get('item_name', ''), None if quantity is None else int(quantity))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'stock': stock.to_dict()})
+
+@admin_bp.route('/rollups', methods=['POST'])
+@admin_required
+def run_rollups():
+    days = (request.get_json(silent=True) or {}).get('days', 2)
+    if isinstance(days, bool) or not isinstance(days, (int, str)) or not str(days).strip().isdigit():
+        return jsonify({'success': False, 'error': 'days must be a whole number'}), 400
+    summaries = rollup_recent(days=min(int(days), 31))
+    return jsonify({'success': True, 'daily': [summary.to_dict() for summary in summaries]})
+
+@admin_bp.route('/dispatch', methods=['POST'])
+@admin_required
+def run_dispatch_admin():
+    method = (request.get_json(silent=True) or {}).get('method')
+    if method not in (None, 'greedy', 'hungarian'):
+        return jsonify({'success': False, 'error': 'Unknown dispatch method'}), 400
+    assigned = run_dispatch(method=method)
+    return jsonify({'success': True, 'assigned': assigned})
 
-# (Your other admin routes: orders, update_order_status, support_tickets, update_ticket_status)
+@admin_bp.route('/route_plan')
+@admin_required
+def route_plan_admin():
+    orders = Order.query.filter(
+        Order.status.in_(DISPATCHABLE_STATUSES),
+        Order.delivery_person_id.is_(None)
+    ).order_by(Order.created_at).all()
+    return jsonify({'runs': plan_runs_for_orders(orders)})
+
+@admin_bp.route('/support_tickets/queue')
+@admin_required
+def ticket_queue():
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    triage_queue.sync()
+    return jsonify(triage_queue.snapshot(limit, category=request.args.get('category')))
+
+@admin_bp.route('/bulk_update_ticket_status', methods=['POST'])
+@admin_required
+def bulk_update_ticket_status():
+    data = request.get_json() or {}
+    new_status = data.get('status')
+    ticket_ids = data.get('ticket_ids') or []
+    if new_status not in TICKET_STATUSES:
+        return jsonify({'success': False, 'error': 'Invalid status'}), 400
+    if not isinstance(ticket_ids, list) or not all(isinstance(t, str) for t in ticket_ids):
+        return jsonify({'success': False, 'error': 'ticket_ids must be a list of ticket IDs'}), 400
+    if not ticket_ids:
+        return jsonify({'success': False, 'error': 'No tickets selected'}), 400
+
+    updated, skipped = bulk_update_tickets(ticket_ids, new_status, admin_notes=data.get('admin_notes'))
+    return jsonify({'success': True, 'updated': updated, 'skipped': skipped})
+
+@admin_bp.route('/support_tickets/response_times')
+@admin_required
+def ticket_response_times():
+    days = max(1, min(request.args.get('days', Config.TRIAGE_METRICS_DAYS, type=int), 366))
+    return jsonify(response_times(days))
+
+# (Your other admin routes: orders, support_tickets, update_ticket_status)
 
 # ===================== DELIVERY ROUTES =====================
 @delivery_bp.route('/login', methods=['GET', 'POST'])
@@ -84,23 +340,153 @@ def login_delivery():
     
     return render_template('delivery/login.html')
 
-# (Your other delivery routes: dashboard, mark_delivered)
+@delivery_bp.route('/route_plan')
+@delivery_required
+def route_plan_delivery():
+    orders = Order.query.filter(
+        Order.delivery_person_id == session.get('user_id'),
+        Order.status.in_(ACTIVE_STATUSES)
+    ).order_by(Order.created_at).all()
+    return jsonify({'runs': plan_runs_for_orders(orders)})
+
+@delivery_bp.route('/mark_delivered', methods=['POST'])
+@delivery_required
+def mark_delivered():
+    data = request.get_json() or {}
+    order = Order.query.filter_by(
+        order_id=data.get('order_id'),
+        delivery_person_id=session.get('user_id')
+    ).first()
+    if not order:
+        return jsonify({'success': False, 'error': 'Order not found'}), 404
+    
+    try:
+        change_status(order, 'delivered', actor_id=session.get('user_id'))
+    except InvalidTransition as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    db.session.commit()
+    return jsonify({'success': True})
+
+# (Your other delivery routes: dashboard)
 
 # ===================== CUSTOMER ROUTES =====================
 @customer_bp.route('/menu')
+@page_cache.cached(key=menu_cache_key)
 def menu():
-    return render_template('customer/menu.html', menu=MENU_CONFIG)
+    return render_template('customer/menu.html', menu=get_menu(), sold_out=get_sold_out(),
+                           menu_version=menu_cache_key())
+
+@customer_bp.route('/add_to_cart', methods=['POST'])
+def add_to_cart():
+    data = request.get_json() or {}
+    item_name = data.get('item_name', '')
+    if item_name in get_sold_out():
+        return jsonify({'success': False, 'error': f"{item_name} is sold out"}), 409
+    
+    try:
+        cart = add_cart_item(session.get('cart', []), item_name)
+    except OrderError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    session['cart'] = cart
+    cart_count, subtotal = cart_totals(cart)
+    return jsonify({'success': True, 'cart_count': cart_count, 'subtotal': subtotal})
+
+@customer_bp.route('/place_order', methods=['POST'])
+def place_order():
+    data = request.get_json() or {}
+    try:
+        order = create_order(
+            session.get('cart', []),
+            customer_name=data.get('customer_name'),
+            customer_phone=data.get('customer_phone'),
+            customer_address=data.get('customer_address'),
+            payment_method=data.get('payment_method', 'cash'),
+            coupon_code=data.get('coupon_code'),
+            notes=data.get('notes'),
+            user_id=session.get('user_id') if session.get('user_role') == 'customer' else None,
+            loyalty_points=data.get('loyalty_points', 0)
+        )
+    except OutOfStock as e:
+        return jsonify({'success': False, 'error': f"Sorry, {e.item_name} just sold out"}), 409
+    except OrderError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    session.pop('cart', None)
+    minutes = int((order.estimated_delivery - order.created_at).total_seconds() // 60) if order.estimated_delivery else None
+    return jsonify({
+        'success': True,
+        'order_id': order.order_id,
+        'total': order.total,
+        'estimated_delivery': minutes,
+        'qr_code': generate_payment_qr(order.total, order.order_id)
+    })
 
-# (Your other customer routes: cart, add_to_cart, remove_from_cart, checkout, place_order, track_order, spin_wheel, rate_order)
+@customer_bp.route('/loyalty')
+@login_required
+def loyalty():
+    user = get_current_user()
+    return jsonify({
+        'balance': user.loyalty_points or 0,
+        'history': [entry.to_dict() for entry in user_history(user.id)]
+    })
+
+@customer_bp.route('/spin_wheel', methods=['POST'])
+def spin_wheel():
+    order_id = ((request.get_json() or {}).get('order_id') or '').strip().upper()
+    if not order_id:
+        return jsonify({'success': False, 'error': 'Order ID is required'}), 400
+    
+    try:
+        result = claim_spin(order_id, user_id=session.get('user_id'))
+    except SpinNotAllowed as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    return jsonify({'success': True, 'result': result})
+
+@customer_bp.route('/spin_eligible')
+@login_required
+def spin_eligible():
+    orders = eligible_spin_orders(session['user_id'])
+    return jsonify({'orders': [
+        {'order_id': order.order_id, 'total': order.total, 'created_at': order.created_at.isoformat()}
+        for order in orders
+    ]})
+
+# (Your other customer routes: cart, remove_from_cart, checkout, track_order, rate_order)
 
 # ===================== SUPPORT ROUTES =====================
 @support_bp.route('/contact')
+@page_cache.cached()
 def contact():
     return render_template('support/contact.html', support_phone=Config.SUPPORT_PHONE)
 
 # (Your other support routes: create_ticket)
 
+def generate_payment_qr(amount, order_id):
+    """UPI payment QR code as a base64 PNG"""
+    img = qrcode.make(f"upi://pay?pa={Config.UPI_ID}&pn=Biryani%20Club&am={amount:.2f}&cu=INR&tn={order_id}")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
 # ===================== API ROUTES =====================
+@main_bp.route('/api/order_status/<order_id>')
+def order_status_api(order_id):
+    """Tracking snapshot; pass ?version=<last seen>&wait=<seconds> to long-poll for a change"""
+    order_id = order_id.strip().upper()
+    version = request.args.get('version', type=int)
+    wait = min(request.args.get('wait', 0, type=float), Config.ORDER_STATUS_MAX_WAIT_SECONDS)
+    if version is not None and wait > 0:
+        snapshot, body = status_snapshots.wait_for_change(order_id, version, wait)
+    else:
+        snapshot, body = status_snapshots.get(order_id)
+    if snapshot is None:
+        return jsonify({'success': False, 'error': 'Order not found'}), 404
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(f"{snapshot['order_id']}-{snapshot['version']}")
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @main_bp.route('/api/check_coupon', methods=['POST'])
 def check_coupon():
     data = request.get_json()
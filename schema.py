@@ -0,0 +1,203 @@
+import logging
+import time
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import AppGroup
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+db_cli = AppGroup('db', help='Database schema and seed data.')
+
+
+def alembic_config():
+    """Alembic configuration pointing at this app's migrations directory"""
+    from alembic.config import Config as AlembicConfig
+
+    config = AlembicConfig()
+    config.set_main_option('script_location', current_app.config['MIGRATIONS_DIR'])
+    return config
+
+
+def create_schema():
+    """Create all tables and search indexes on an empty database and mark it as fully migrated"""
+    from alembic import command
+    import models  # noqa: F401  (registers every table on db.metadata)
+    from search import install_search
+
+    db.create_all()
+    with db.engine.begin() as connection:
+        install_search(connection)
+    command.stamp(alembic_config(), 'head')
+    logger.info("Database tables created successfully")
+
+
+def create_index_online(name, table, columns, unique=False, where=None, using=None):
+    """Create an index from a migration without blocking writes to `table`.
+
+    On Postgres this is CREATE INDEX CONCURRENTLY, which can't run inside
+    a transaction, so it is issued in an autocommit block. If a concurrent
+    build fails it leaves an INVALID index behind; drop it and re-run.
+    Other databases get a plain CREATE INDEX. `where` makes it partial;
+    `using` picks a Postgres index method (e.g. 'gin').
+    """
+    from alembic import op
+
+    where = sa.text(where) if isinstance(where, str) else where
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, unique=unique, postgresql_where=where,
+                            postgresql_using=using, postgresql_concurrently=True)
+    else:
+        op.create_index(name, table, columns, unique=unique, sqlite_where=where)
+
+
+def drop_index_online(name, table):
+    """Drop an index from a migration, CONCURRENTLY on Postgres"""
+    from alembic import op
+
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def batched_update(connection, table, values, where, batch_size=None, pause=None, key='id'):
+    """UPDATE rows matching `where` a bounded batch at a time.
+
+    Batches walk the primary key (keyset pagination, so each lookup is an
+    index range scan) and each UPDATE touches at most `batch_size` rows,
+    so row locks are held briefly; `connection` should be in autocommit
+    mode so every batch commits on its own. Sleeps `pause` seconds between
+    batches. Returns the number of rows updated.
+    """
+    batch_size = batch_size or current_app.config['BACKFILL_BATCH_SIZE']
+    pause = current_app.config['BACKFILL_PAUSE_SECONDS'] if pause is None else pause
+    key_column = table.c[key]
+    last, total = None, 0
+    while True:
+        query = sa.select(key_column).where(where).order_by(key_column).limit(batch_size)
+        if last is not None:
+            query = query.where(key_column > last)
+        keys = connection.execute(query).scalars().all()
+        if not keys:
+            break
+        result = connection.execute(table.update().where(key_column.in_(keys), where).values(**values))
+        total += result.rowcount
+        last = keys[-1]
+        logger.info(f"Backfilled {total} row(s) of {table.name} (up to {key} {last})")
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def backfill(table, values, where, batch_size=None, pause=None, key='id'):
+    """batched_update for use inside a migration, committing batch by batch.
+
+    When generating SQL offline (`--sql`) there is nothing to page through,
+    so a single UPDATE is emitted instead; run that script off-peak.
+    """
+    from alembic import op
+
+    if op.get_context().as_sql:
+        op.execute(table.update().where(where).values(**values))
+        return None
+    with op.get_context().autocommit_block():
+        return batched_update(op.get_bind(), table, values, where, batch_size, pause, key)
+
+
+def seed_default_users():
+    """Create the configured admin and delivery accounts if they don't exist; returns usernames created"""
+    from models import User
+    from auth import hash_password
+    from config import Config
+
+    defaults = (
+        (Config.ADMIN_USERNAME, Config.ADMIN_PASSWORD, 'admin', 'Admin User'),
+        (Config.DELIVERY_USERNAME, Config.DELIVERY_PASSWORD, 'delivery', 'Delivery Person'),
+    )
+    existing = {username for (username,) in db.session.query(User.username)
+                .filter(User.username.in_([d[0] for d in defaults]))}
+    created = []
+    for username, password, role, full_name in defaults:
+        if username in existing:
+            continue
+        db.session.add(User(
+            username=username,
+            password_hash=hash_password(password),
+            role=role,
+            full_name=full_name,
+            is_active=True
+        ))
+        created.append(username)
+    db.session.commit()
+    for username in created:
+        logger.info(f"Default user {username} created")
+    return created
+
+
+@db_cli.command('create')
+def create_command():
+    """Create all tables on a new database and stamp it at the latest migration."""
+    create_schema()
+    click.echo('Tables created')
+
+
+@db_cli.command('upgrade')
+@click.argument('revision', default='head')
+@click.option('--sql', is_flag=True, help='Print the SQL instead of running it.')
+def upgrade_command(revision, sql):
+    """Apply migrations up to REVISION (default: head)."""
+    from alembic import command
+    command.upgrade(alembic_config(), revision, sql=sql)
+
+
+@db_cli.command('downgrade')
+@click.argument('revision')
+@click.option('--sql', is_flag=True, help='Print the SQL instead of running it.')
+def downgrade_command(revision, sql):
+    """Revert migrations down to REVISION."""
+    from alembic import command
+    command.downgrade(alembic_config(), revision, sql=sql)
+
+
+@db_cli.command('revision')
+@click.option('-m', '--message', required=True)
+@click.option('--autogenerate', is_flag=True, help='Diff the models against the database.')
+def revision_command(message, autogenerate):
+    """Create a new migration script."""
+    from alembic import command
+    command.revision(alembic_config(), message=message, autogenerate=autogenerate)
+
+
+@db_cli.command('stamp')
+@click.argument('revision')
+def stamp_command(revision):
+    """Record REVISION as applied without running it (adopting an existing database)."""
+    from alembic import command
+    command.stamp(alembic_config(), revision)
+
+
+@db_cli.command('current')
+def current_command():
+    """Show the database's current migration."""
+    from alembic import command
+    command.current(alembic_config(), verbose=True)
+
+
+@db_cli.command('history')
+def history_command():
+    """List migrations."""
+    from alembic import command
+    command.history(alembic_config())
+
+
+@db_cli.command('seed')
+def seed_command():
+    """Create the default admin and delivery accounts."""
+    created = seed_default_users()
+    click.echo(f"Created {', '.join(created)}" if created else 'Default users already exist')
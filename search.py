@@ -0,0 +1,258 @@
+import logging
+import re
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from models import User, Order, SupportTicket
+
+logger = logging.getLogger(__name__)
+
+search_cli = AppGroup('search', help='Full-text search indexes.')
+
+# Searchable tables: (model, text search configuration, ((column, weight), ...)).
+# 'simple' doesn't stem, which suits names, phones and addresses; ticket
+# text is English prose. Weight A ranks above B.
+SEARCH_INDEXES = {
+    'orders': (Order, 'simple', (
+        ('customer_name', 'A'), ('customer_phone', 'A'), ('customer_address', 'B'),
+    )),
+    'users': (User, 'simple', (
+        ('username', 'A'), ('full_name', 'A'), ('phone', 'A'),
+    )),
+    'tickets': (SupportTicket, 'english', (
+        ('subject', 'A'), ('description', 'B'),
+    )),
+}
+
+# bm25() column weights on SQLite, matching the tsvector weights on Postgres
+SQLITE_WEIGHTS = {'A': 10.0, 'B': 2.0}
+MAX_TERMS = 8
+
+
+class SearchError(ValueError):
+    """Raised for an unknown search scope"""
+
+
+def search_terms(query):
+    """Lower-cased word tokens of a search box query (at most MAX_TERMS)"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+# ---------------------------------------------------------------- DDL
+def _table(kind):
+    return SEARCH_INDEXES[kind][0].__tablename__
+
+
+def _pg_vector(kind, row=''):
+    """tsvector expression over a row's searchable columns (`row` is e.g. 'NEW.')"""
+    _, config, columns = SEARCH_INDEXES[kind]
+    parts = [f"setweight(to_tsvector('{config}', coalesce({row}{column}, '')), '{weight}')"
+             for column, weight in columns]
+    return ' || '.join(parts)
+
+
+def _pg_trigger_ddl(kind):
+    """Trigger keeping `search_vector` current; only fires when a searched column is written"""
+    table, columns = _table(kind), [column for column, _ in SEARCH_INDEXES[kind][2]]
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        f"CREATE OR REPLACE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$ "
+        f"BEGIN NEW.search_vector := {_pg_vector(kind, 'NEW.')}; RETURN NEW; END "
+        f"$$ LANGUAGE plpgsql",
+        f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}",
+        f"CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {', '.join(columns)} "
+        f"ON {table} FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()",
+    ]
+
+
+def _pg_drop_ddl(kind):
+    table = _table(kind)
+    return [
+        f"DROP INDEX IF EXISTS ix_{table}_search_vector",
+        f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}",
+        f"DROP FUNCTION IF EXISTS {table}_search_vector_update()",
+        f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector",
+    ]
+
+
+def _sqlite_ddl(kind):
+    """External-content FTS5 table over `kind`'s rows plus the triggers that sync it.
+
+    The index stores only tokens (the text stays in the base table) and
+    prefix='2 3' adds prefix indexes so short "abc*" lookups don't scan
+    the whole term list.
+    """
+    table, columns = _table(kind), [column for column, _ in SEARCH_INDEXES[kind][2]]
+    fts = f"{table}_fts"
+    names = ', '.join(columns)
+    new = ', '.join(f"new.{column}" for column in columns)
+    old = ', '.join(f"old.{column}" for column in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END",
+    ]
+
+
+def _sqlite_drop_ddl(kind):
+    fts = f"{_table(kind)}_fts"
+    return [f"DROP TRIGGER IF EXISTS {fts}_{suffix}" for suffix in ('ai', 'ad', 'au')] + \
+        [f"DROP TABLE IF EXISTS {fts}"]
+
+
+def install_ddl(kind, dialect):
+    """Statements creating `kind`'s search index and triggers and indexing existing rows.
+
+    Idempotent, so re-running them also repairs triggers lost when a
+    SQLite batch migration recreates the table. On Postgres the backfill
+    is a single UPDATE, fine for new or small databases; see
+    install_search_online() for large live tables.
+    """
+    table = _table(kind)
+    if dialect == 'postgresql':
+        return _pg_trigger_ddl(kind) + [
+            f"UPDATE {table} SET search_vector = {_pg_vector(kind)} WHERE search_vector IS NULL",
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)",
+        ]
+    if dialect == 'sqlite':
+        return _sqlite_ddl(kind) + [f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"]
+    raise SearchError(f"Full-text search isn't supported on {dialect}")
+
+
+def drop_ddl(kind, dialect):
+    """Statements dropping `kind`'s search index, triggers and (on Postgres) search_vector column"""
+    return _pg_drop_ddl(kind) if dialect == 'postgresql' else _sqlite_drop_ddl(kind)
+
+
+def install_search(connection, kinds=None):
+    """Create the search indexes and triggers on `connection` and index existing rows"""
+    for kind in kinds or SEARCH_INDEXES:
+        for statement in install_ddl(kind, connection.dialect.name):
+            connection.execute(sa.text(statement))
+        logger.info(f"Search index for {_table(kind)} installed")
+
+
+def uninstall_search(connection, kinds=None):
+    """Drop the search indexes and triggers on `connection`"""
+    for kind in kinds or SEARCH_INDEXES:
+        for statement in drop_ddl(kind, connection.dialect.name):
+            connection.execute(sa.text(statement))
+
+
+def install_search_online():
+    """install_search for use inside a migration, without long locks on Postgres.
+
+    The column is added without a default (no table rewrite) and the
+    trigger goes in first so rows written during the backfill are indexed
+    by it; existing rows are then filled in batches and the GIN index is
+    built CONCURRENTLY. SQLite builds its FTS tables in one go.
+    """
+    from alembic import op
+    from schema import backfill, create_index_online
+
+    dialect = op.get_context().dialect.name
+    for kind in SEARCH_INDEXES:
+        if dialect != 'postgresql':
+            for statement in install_ddl(kind, dialect):
+                op.execute(statement)
+            continue
+        table = _table(kind)
+        for statement in _pg_trigger_ddl(kind):
+            op.execute(statement)
+        rows = sa.table(table, sa.column('id', sa.Integer), sa.column('search_vector'))
+        backfill(rows, {'search_vector': sa.literal_column(_pg_vector(kind))}, rows.c.search_vector.is_(None))
+        create_index_online(f"ix_{table}_search_vector", table, ['search_vector'], using='gin')
+
+
+def is_search_object(name):
+    """True for tables, columns and indexes owned by the search indexes, which the models don't declare"""
+    return re.search(r'(^|_)search_vector$|_fts(_\w+)?$', name or '') is not None
+
+
+# -------------------------------------------------------------- queries
+def _ranked_ids(kind, terms, limit, offset):
+    table, (_, config, columns) = _table(kind), SEARCH_INDEXES[kind]
+    if db.engine.dialect.name == 'postgresql':
+        # Every term must match; ':*' makes each one a prefix
+        statement = sa.text(
+            f"SELECT id FROM {table}, to_tsquery(CAST(:config AS regconfig), :query) AS query "
+            f"WHERE search_vector @@ query "
+            f"ORDER BY ts_rank_cd(search_vector, query) DESC, id DESC LIMIT :limit OFFSET :offset")
+        params = {'config': config, 'query': ' & '.join(f"{term}:*" for term in terms)}
+    else:
+        weights = ', '.join(str(SQLITE_WEIGHTS[weight]) for _, weight in columns)
+        # bm25() is lower for better matches
+        statement = sa.text(
+            f"SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH :query "
+            f"ORDER BY bm25({table}_fts, {weights}), rowid DESC LIMIT :limit OFFSET :offset")
+        params = {'query': ' '.join(f'"{term}"*' for term in terms)}
+    return db.session.execute(statement, {**params, 'limit': limit, 'offset': offset}).scalars().all()
+
+
+def search(kind, query, page=1, per_page=None):
+    """Rows of `kind` matching every word of `query` as a prefix, best match first.
+
+    Returns (rows, has_more). Only one page of ids comes from the index
+    (one extra to tell whether another page follows, so there is no
+    COUNT over the matches); the rows are then loaded by primary key.
+    """
+    if kind not in SEARCH_INDEXES:
+        raise SearchError(f"Unknown search scope {kind!r}")
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+    per_page = per_page or current_app.config['SEARCH_PAGE_SIZE']
+    ids = _ranked_ids(kind, terms, per_page + 1, (max(page, 1) - 1) * per_page)
+    has_more = len(ids) > per_page
+    ids = ids[:per_page]
+    if not ids:
+        return [], False
+
+    model = SEARCH_INDEXES[kind][0]
+    rows = model.query.filter(model.id.in_(ids))
+    if model is Order:
+        rows = rows.options(joinedload(Order.delivery_person))  # to_dict() reads the rider's name
+    by_id = {row.id: row for row in rows}
+    return [by_id[i] for i in ids if i in by_id], has_more
+
+
+@search_cli.command('install')
+def install_command():
+    """Create (or repair) the search indexes and triggers and index existing rows."""
+    with db.engine.begin() as connection:
+        install_search(connection)
+    click.echo(f"Search indexes installed for {', '.join(SEARCH_INDEXES)}")
+
+
+@search_cli.command('rebuild')
+@click.option('--kind', type=click.Choice(list(SEARCH_INDEXES)), help='Only this index.')
+def rebuild_command(kind):
+    """Drop and rebuild the search indexes from the base tables."""
+    kinds = [kind] if kind else list(SEARCH_INDEXES)
+    with db.engine.begin() as connection:
+        uninstall_search(connection, kinds)
+        install_search(connection, kinds)
+    click.echo(f"Rebuilt search indexes for {', '.join(kinds)}")
+
+
+@search_cli.command('query')
+@click.argument('kind', type=click.Choice(list(SEARCH_INDEXES)))
+@click.argument('query')
+@click.option('--page', type=int, default=1)
+def query_command(kind, query, page):
+    """Print the ids of KIND rows matching QUERY."""
+    rows, has_more = search(kind, query, page)
+    label = {'orders': 'order_id', 'users': 'username', 'tickets': 'ticket_id'}[kind]
+    for row in rows:
+        click.echo(getattr(row, label))
+    if has_more:
+        click.echo(f"(more on page {page + 1})")
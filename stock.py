@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select
+
+from extensions import db
+from models import ItemStock, MenuItem
+
+# Cancelling before the kitchen starts cooking puts the portions back
+RESTOCK_STATUSES = ('pending', 'confirmed')
+
+stock_cli = AppGroup('stock', help='Per-item stock counters.')
+
+
+class OutOfStock(ValueError):
+    """Raised when an order asks for more portions than are left"""
+
+    def __init__(self, item_name):
+        super().__init__(f"{item_name} is sold out")
+        self.item_name = item_name
+
+
+def order_quantities(items):
+    """Portions per item name for a list of order lines"""
+    quantities = Counter()
+    for item in items:
+        quantities[item['name']] += int(item.get('quantity', 1))
+    return quantities
+
+
+def reserve_stock(items, now=None):
+    """Take the portions for an order's lines from the stock counters.
+
+    Each tracked item is decremented with one conditional UPDATE that only
+    matches while enough portions are left, so concurrent orders can never
+    drive a counter below zero. Items are locked in name order to avoid
+    deadlocks. Raises OutOfStock on the first line that can't be served;
+    the caller rolls back, which undoes the lines already taken, so an
+    order gets all of its portions or none.
+    """
+    quantities = order_quantities(items)
+    if not quantities:
+        return
+    now = now or datetime.utcnow()
+    table = ItemStock.__table__
+    tracked = db.session.execute(
+        select(table.c.item_name).where(table.c.item_name.in_(quantities), table.c.quantity.isnot(None))
+    ).scalars().all()
+    for name in sorted(tracked):
+        result = db.session.execute(
+            table.update()
+            .where(table.c.item_name == name, table.c.quantity >= quantities[name])
+            .values(quantity=table.c.quantity - quantities[name], updated_at=now)
+        )
+        if result.rowcount != 1:
+            raise OutOfStock(name)
+    if tracked:
+        stock_cache.invalidate()
+
+
+def release_stock(items, now=None):
+    """Return an order's portions to the counters (caller commits)"""
+    quantities = order_quantities(items)
+    now = now or datetime.utcnow()
+    table = ItemStock.__table__
+    for name in sorted(quantities):
+        db.session.execute(
+            table.update()
+            .where(table.c.item_name == name, table.c.quantity.isnot(None))
+            .values(quantity=table.c.quantity + quantities[name], updated_at=now)
+        )
+    stock_cache.invalidate()
+
+
+def set_stock(item_name, quantity):
+    """Set the portions left for an item; None stops tracking it. Commits."""
+    if not db.session.query(MenuItem.id).filter_by(name=item_name).first():
+        raise ValueError(f"Unknown menu item: {item_name}")
+    if quantity is not None and quantity < 0:
+        raise ValueError('Stock must not be negative')
+    try:
+        stock = db.session.get(ItemStock, item_name)
+        if stock is None:
+            stock = ItemStock(item_name=item_name)
+            db.session.add(stock)
+        stock.quantity = quantity
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    stock_cache.invalidate()
+    return stock
+
+
+class StockCache:
+    """Tracked stock levels held in memory for the menu page.
+
+    Badges can lag the database by up to STOCK_CACHE_SECONDS; that is only
+    cosmetic, since reserve_stock checks the real counter at order time.
+    """
+
+    def __init__(self):
+        self.levels = {}
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def get_levels(self):
+        now = time.monotonic()
+        ttl = current_app.config['STOCK_CACHE_SECONDS']
+        if self.loaded_at is not None and now - self.loaded_at < ttl:
+            return self.levels
+        with self.lock:
+            if self.loaded_at is None or now - self.loaded_at >= ttl:
+                self.levels = dict(db.session.query(ItemStock.item_name, ItemStock.quantity)
+                                   .filter(ItemStock.quantity.isnot(None)).all())
+                self.loaded_at = now
+        return self.levels
+
+    def sold_out(self):
+        return {name for name, quantity in self.get_levels().items() if quantity <= 0}
+
+
+stock_cache = StockCache()
+
+
+def get_sold_out():
+    """Names of tracked items with no portions left"""
+    return stock_cache.sold_out()
+
+
+@stock_cli.command('set')
+@click.argument('item_name')
+@click.argument('quantity', required=False, type=int)
+def set_command(item_name, quantity):
+    """Set portions left for ITEM_NAME (omit QUANTITY to stop tracking)."""
+    try:
+        set_stock(item_name, quantity)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{item_name}: {'untracked' if quantity is None else quantity}")
+
+
+@stock_cli.command('list')
+def list_command():
+    """Show tracked items and their remaining portions."""
+    for stock in ItemStock.query.filter(ItemStock.quantity.isnot(None)).order_by(ItemStock.item_name):
+        click.echo(f"{stock.quantity:>6}  {stock.item_name}")
+
@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from jinja2 import nodes, FileSystemBytecodeCache
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+templates_cli = AppGroup('templates', help='Template bytecode and fragment caches.')
+
+
+class FragmentCache:
+    """Rendered template fragments held in memory per worker, with a TTL"""
+
+    def __init__(self):
+        self.entries = {}  # key -> (expires_at, html)
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, key, html, ttl, max_entries):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.entries) >= max_entries:
+                self.entries = {k: e for k, e in self.entries.items() if e[0] > now}
+                if len(self.entries) >= max_entries:
+                    self.entries.clear()
+            self.entries[key] = (now + ttl, html)
+
+
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache 'name', ttl, vary... %}...{% endcache %}
+
+    Renders the body once and reuses the HTML for `ttl` seconds
+    (FRAGMENT_CACHE_SECONDS if omitted or none). Every extra argument is
+    part of the key, so pass whatever the fragment depends on; only cache
+    sections that are the same for every visitor.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        config = current_app.config
+        if not config['FRAGMENT_CACHE_ENABLED']:
+            return caller()
+        name, ttl, vary = args[0], args[1] if len(args) > 1 else None, args[2:]
+        key = (name, *(repr(value) for value in vary))
+        html = fragment_cache.get(key)
+        instrumentation.registry.record_cache('fragment', name, html is not None)
+        if html is None:
+            html = Markup(caller())
+            fragment_cache.set(key, html, ttl or config['FRAGMENT_CACHE_SECONDS'], config['FRAGMENT_CACHE_MAX_ENTRIES'])
+        return html
+
+
+def init_app(app):
+    """Install the bytecode cache and {% cache %} tag; must run before the first render"""
+    options = dict(app.jinja_options)
+    options['extensions'] = [*options.get('extensions', ()), FragmentCacheExtension]
+    # Compiled templates are written here and reused by every worker (and across restarts)
+    options['bytecode_cache'] = FileSystemBytecodeCache(app.config['TEMPLATE_BYTECODE_DIR'])
+    app.jinja_options = options
+
+
+def precompile_templates(app):
+    """Compile every template into the environment (and bytecode cache); returns the count.
+
+    Run in a gunicorn --preload master, the compiled templates are shared
+    by every forked worker instead of being compiled lazily in each one.
+    """
+    started = time.perf_counter()
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    logger.info(f"Precompiled {len(names)} templates in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return len(names)
+
+
+@templates_cli.command('compile')
+def compile_command():
+    """Compile all templates into the bytecode cache."""
+    count = precompile_templates(current_app)
+    click.echo(f"Compiled {count} templates into {current_app.config['TEMPLATE_BYTECODE_DIR'] or 'the default cache dir'}")
+
@@ -0,0 +1,41 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Config reads the environment when it is first imported, so point it at a
+# throwaway database before any test module pulls it in
+_db_dir = tempfile.mkdtemp(prefix='biryani-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ['RATELIMIT_ENABLED'] = '0'
+os.environ['METRICS_ENABLED'] = '0'
+os.environ['PAGE_CACHE_ENABLED'] = '0'
+os.environ['FORECAST_REFRESH_SECONDS'] = '0'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    from catalog import import_catalog, parse_catalog
+    from config import MENU_CONFIG
+    from schema import create_schema, seed_default_users
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        seed_default_users()
+        import_catalog(parse_catalog(json.dumps(MENU_CONFIG), 'json'), note='Test catalog')
+    yield app
+    shutil.rmtree(_db_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
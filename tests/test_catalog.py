@@ -0,0 +1,25 @@
+import pytest
+
+from catalog import validate_items, CatalogError
+
+
+def _row_errors(rows):
+    with pytest.raises(CatalogError) as excinfo:
+        validate_items(rows)
+    return {error['row']: error['errors'] for error in excinfo.value.errors}
+
+
+def test_rejects_prices_that_are_not_finite():
+    errors = _row_errors([{'name': name, 'section': 'Biryani', 'price': price}
+                          for name, price in (('A', 'nan'), ('B', 'inf'), ('C', float('-inf')))])
+    assert errors == {row: ['price must be a finite number'] for row in (1, 2, 3)}
+
+
+def test_non_object_rows_are_row_errors():
+    errors = _row_errors([{'name': 'A', 'section': 'Biryani', 'price': 100}, 7, 'Veg Roll'])
+    assert set(errors) == {2, 3}
+
+
+def test_optional_text_fields_are_coerced():
+    [item] = validate_items([{'name': 'A', 'section': 'Biryani', 'price': 100, 'emoji': 5, 'category': 1}])
+    assert (item['emoji'], item['category'], item['description']) == ('5', '1', None)
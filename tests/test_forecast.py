@@ -0,0 +1,46 @@
+import json
+from datetime import datetime, timedelta
+
+from extensions import db
+from forecast import DemandForecaster
+from models import Order
+
+ITEM = 'Chicken Fry Biryani'
+
+
+def _order(order_id, created_at, quantity):
+    return Order(order_id=order_id, customer_name='Forecast', customer_phone='9000000001',
+                 customer_address='Test street', items=json.dumps([{'name': ITEM, 'quantity': quantity}]),
+                 subtotal=100, total=100, created_at=created_at)
+
+
+def _quantity(forecaster):
+    profiles = forecaster.profiles
+    return profiles.grid[profiles.items[ITEM]].sum() if ITEM in profiles.items else 0
+
+
+def test_refresh_counts_late_commits_once(app_context):
+    now = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    forecaster = DemandForecaster()
+    orders = [_order('FCTEST1', now - timedelta(minutes=30), 2)]
+    try:
+        db.session.add_all(orders)
+        db.session.commit()
+        forecaster.refresh(now)
+        baseline = _quantity(forecaster)
+
+        # Placed before the first refresh but committed after it
+        orders.append(_order('FCTEST2', now - timedelta(minutes=1), 3))
+        orders.append(_order('FCTEST3', now + timedelta(minutes=2), 5))
+        db.session.add_all(orders[1:])
+        db.session.commit()
+        forecaster.refresh(now + timedelta(minutes=5))
+        assert _quantity(forecaster) == baseline + 8
+
+        # Overlapping re-reads don't count anything twice
+        forecaster.refresh(now + timedelta(minutes=6))
+        assert _quantity(forecaster) == baseline + 8
+        assert forecaster.forecast(hours=3, now=now)['refreshed_at'] == (now + timedelta(minutes=6)).isoformat()
+    finally:
+        Order.query.filter(Order.order_id.in_([o.order_id for o in orders])).delete(synchronize_session=False)
+        db.session.commit()
@@ -0,0 +1,56 @@
+import json
+import threading
+
+import pytest
+
+from extensions import db
+from models import Order, OrderStatusEvent
+from order_status import change_status, InvalidTransition
+
+
+def test_concurrent_transitions_apply_once(app, app_context):
+    order = Order(order_id='OSTEST1', customer_name='Race', customer_phone='9000000002',
+                  customer_address='Test street', items=json.dumps([{'name': 'Chicken Fry Biryani', 'quantity': 1}]),
+                  subtotal=100, total=100, status='out_for_delivery')
+    db.session.add(order)
+    db.session.commit()
+    order_pk = order.id
+    loaded, delivered = threading.Event(), threading.Event()
+    outcome = {}
+
+    def admin_cancels():
+        # Reads the order before the rider's delivery commits, then acts on that stale copy
+        with app.app_context():
+            stale = Order.query.filter_by(order_id='OSTEST1').one()
+            loaded.set()
+            delivered.wait(5)
+            try:
+                change_status(stale, 'cancelled')
+                db.session.commit()
+                outcome['cancel'] = 'applied'
+            except InvalidTransition:
+                db.session.rollback()
+                outcome['cancel'] = 'rejected'
+            finally:
+                db.session.remove()
+
+    admin = threading.Thread(target=admin_cancels)
+    try:
+        admin.start()
+        loaded.wait(5)
+        change_status(order, 'delivered')
+        db.session.commit()
+        delivered.set()
+        admin.join()
+
+        assert outcome['cancel'] == 'rejected'
+        assert db.session.get(Order, order_pk, populate_existing=True).status == 'delivered'
+        assert [e.to_status for e in OrderStatusEvent.query.filter_by(order_id=order_pk)] == ['delivered']
+        with pytest.raises(InvalidTransition):
+            change_status(order, 'cancelled')
+    finally:
+        delivered.set()
+        db.session.rollback()
+        db.session.execute(OrderStatusEvent.__table__.delete().where(OrderStatusEvent.order_id == order_pk))
+        db.session.execute(Order.__table__.delete().where(Order.id == order_pk))
+        db.session.commit()
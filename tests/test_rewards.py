@@ -0,0 +1,66 @@
+import math
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import rewards
+from extensions import db
+from models import SpinPrizeCount
+from rewards import RewardEngine, NO_REWARD
+
+
+def chi_square_p_value(statistic, dof):
+    """Upper-tail p-value via the Wilson-Hilferty normal approximation"""
+    k = 2.0 / (9 * dof)
+    z = ((statistic / dof) ** (1 / 3) - (1 - k)) / math.sqrt(k)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def chi_square(counts, weights, draws):
+    total = sum(weights)
+    return sum((counts[i] - draws * w / total) ** 2 / (draws * w / total) for i, w in enumerate(weights) if w > 0)
+
+
+def test_draws_match_configured_weights():
+    engine = RewardEngine(rng=random.Random(20240501))
+    spin_rewards, table = engine.table(None)
+    draws = 2000000
+    counts = Counter(table.draw(engine.rng) for _ in range(draws))
+    weights = [r['weight'] for r in spin_rewards]
+    dof = sum(1 for w in weights if w > 0) - 1
+
+    assert chi_square_p_value(chi_square(counts, weights, draws), dof) > 0.001
+    # The same counts are clearly rejected against odds only 5% off on one reward
+    skewed = [w * (1.05 if i == 0 else 1) for i, w in enumerate(weights)]
+    assert chi_square_p_value(chi_square(counts, skewed, draws), dof) < 0.001
+
+
+def test_capped_prize_stops_at_daily_cap(app_context, monkeypatch):
+    monkeypatch.setitem(rewards.SPIN_CAMPAIGNS, 'test-cap', [
+        {'name': 'Jackpot', 'emoji': '', 'effect': {'discount': 50}, 'weight': 50, 'daily_cap': 3},
+        {'name': 'Nothing', 'emoji': '', 'effect': None, 'weight': 50},
+    ])
+    engine = RewardEngine(rng=random.Random(7))
+    today = datetime(2026, 1, 1, 12)
+    try:
+        won = [engine.spin('test-cap', now=today)['name'] for _ in range(100)]
+        assert won.count('Jackpot') == 3
+        assert db.session.get(SpinPrizeCount, (today.date(), 'test-cap', 'Jackpot')).awarded == 3
+
+        tomorrow = [engine.spin('test-cap', now=today + timedelta(days=1))['name'] for _ in range(100)]
+        assert tomorrow.count('Jackpot') == 3
+    finally:
+        db.session.rollback()
+
+
+def test_wheel_with_every_prize_capped_out(app_context, monkeypatch):
+    monkeypatch.setitem(rewards.SPIN_CAMPAIGNS, 'test-sold-out', [
+        {'name': 'Jackpot', 'emoji': '', 'effect': {'discount': 50}, 'weight': 1, 'daily_cap': 1},
+    ])
+    engine = RewardEngine(rng=random.Random(7))
+    today = datetime(2026, 1, 2, 12)
+    try:
+        assert engine.spin('test-sold-out', now=today)['name'] == 'Jackpot'
+        assert engine.spin('test-sold-out', now=today) == NO_REWARD
+    finally:
+        db.session.rollback()
@@ -0,0 +1,53 @@
+import threading
+from collections import Counter
+
+from extensions import db
+from models import ItemStock, Order
+from ordering import place_order
+from stock import set_stock, OutOfStock
+
+ITEM = 'Chicken Fry Biryani'
+
+
+def test_concurrent_orders_never_oversell(app, app_context):
+    portions, customers = 3, 20
+    set_stock(ITEM, portions)
+    barrier = threading.Barrier(customers)
+    outcomes = Counter()
+    placed = []
+    lock = threading.Lock()
+
+    def customer(number):
+        with app.app_context():
+            barrier.wait()
+            try:
+                order = place_order([{'name': ITEM, 'quantity': 1}], customer_name=f"Rush {number}",
+                                    customer_phone='9000000000', customer_address='Test street')
+                outcome = 'placed'
+                with lock:
+                    placed.append(order.order_id)
+            except OutOfStock:
+                outcome = 'sold_out'
+            except Exception:
+                outcome = 'error'  # e.g. SQLite's "database is locked" under write contention
+            finally:
+                db.session.remove()
+            with lock:
+                outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=customer, args=(n,)) for n in range(customers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        remaining = db.session.get(ItemStock, ITEM, populate_existing=True).quantity
+        assert remaining >= 0
+        assert outcomes['placed'] + remaining == portions
+        assert outcomes['placed'] == len(placed) > 0
+        assert outcomes['sold_out'] > 0
+    finally:
+        Order.query.filter(Order.order_id.in_(placed)).delete(synchronize_session=False)
+        db.session.commit()
+        set_stock(ITEM, None)
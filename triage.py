@@ -0,0 +1,262 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from extensions import db, lazy_import
+from models import Order, SupportTicket
+
+np = lazy_import('numpy')  # only needed for response-time percentiles
+
+TICKET_STATUSES = ('open', 'in_progress', 'resolved', 'closed')
+# Tickets still waiting on the support team
+TRIAGE_STATUSES = ('open', 'in_progress')
+RESOLVED_STATUSES = ('resolved', 'closed')
+
+# Ages are measured in hours from here so queue keys stay small floats
+_EPOCH = datetime(2020, 1, 1)
+
+
+class TicketError(ValueError):
+    """Raised for a status a ticket can't be given"""
+
+
+def _hours(moment):
+    return (moment - _EPOCH).total_seconds() / 3600
+
+
+def score_parts(ticket, order_total, delivered_orders, other_tickets, config):
+    """The age-independent part of a ticket's triage score, by component"""
+    return {
+        'category': config['TRIAGE_CATEGORY_POINTS'].get(ticket.category, 0),
+        'priority': config['TRIAGE_PRIORITY_POINTS'].get(ticket.priority, 0),
+        'order_value': min((order_total or 0) * config['TRIAGE_ORDER_VALUE_POINTS'], config['TRIAGE_ORDER_VALUE_MAX']),
+        'loyalty': min(delivered_orders * config['TRIAGE_LOYAL_ORDER_POINTS'], config['TRIAGE_LOYAL_MAX']),
+        'repeat_contact': min(other_tickets * config['TRIAGE_REPEAT_CONTACT_POINTS'], config['TRIAGE_REPEAT_CONTACT_MAX']),
+    }
+
+
+class TriageQueue:
+    """Open support tickets ordered by triage score, highest first.
+
+    A ticket's score is a fixed base (category, priority, linked order
+    value, how many orders the customer has had delivered and how often
+    they contacted support recently) plus TRIAGE_POINTS_PER_HOUR for every
+    hour it has waited. Age raises every ticket at the same rate, so the
+    order never changes as time passes and each ticket needs a single heap
+    key (points per hour x created hour - base), computed once. Like the
+    kitchen queue, it lives in memory and each sync loads only tickets
+    changed since the previous one; the whole queue is rescored every
+    TRIAGE_RESCORE_SECONDS to pick up changes in customer history.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.tickets = {}
+        self.synced_at = None
+        self.rescored_at = None
+        self.lock = threading.Lock()
+
+    def _history(self, tickets, config, now):
+        """Linked order totals, delivered orders per phone and recent other tickets per phone"""
+        order_ids = {t.order_id for t in tickets if t.order_id}
+        phones = {t.customer_phone for t in tickets}
+        totals = dict(db.session.query(Order.order_id, Order.total).filter(Order.order_id.in_(order_ids))) \
+            if order_ids else {}
+        delivered = dict(db.session.query(Order.customer_phone, func.count(Order.id)).filter(
+            Order.customer_phone.in_(phones), Order.status == 'delivered'
+        ).group_by(Order.customer_phone))
+        contacts = dict(db.session.query(SupportTicket.customer_phone, func.count(SupportTicket.id)).filter(
+            SupportTicket.customer_phone.in_(phones), SupportTicket.created_at >= self._contact_since(config, now)
+        ).group_by(SupportTicket.customer_phone))
+        return totals, delivered, contacts
+
+    @staticmethod
+    def _contact_since(config, now):
+        return now - timedelta(days=config['TRIAGE_REPEAT_CONTACT_DAYS'])
+
+    def _entry(self, ticket, history, config, now):
+        totals, delivered, contacts = history
+        created = ticket.created_at or now
+        # The ticket itself is among the recent contacts unless it is older than the window
+        other_tickets = contacts.get(ticket.customer_phone, 0) - (created >= self._contact_since(config, now))
+        other_tickets = max(other_tickets, 0)
+        parts = score_parts(ticket, totals.get(ticket.order_id), delivered.get(ticket.customer_phone, 0),
+                            other_tickets, config)
+        base = sum(parts.values())
+        return {
+            'id': ticket.id,
+            'ticket_id': ticket.ticket_id,
+            'subject': ticket.subject,
+            'category': ticket.category,
+            'priority': ticket.priority,
+            'status': ticket.status,
+            'customer_name': ticket.customer_name,
+            'customer_phone': ticket.customer_phone,
+            'order_id': ticket.order_id,
+            'created_at': created,
+            'score_parts': {name: round(points, 1) for name, points in parts.items()},
+            'base': base,
+            'key': config['TRIAGE_POINTS_PER_HOUR'] * _hours(created) - base,
+        }
+
+    def _add(self, entry):
+        self.tickets[entry['id']] = entry
+        heapq.heappush(self.heap, (entry['key'], entry['id']))
+
+    def sync(self):
+        """Pull tickets created or changed since the last sync into the queue"""
+        config = current_app.config
+        with self.lock:
+            now = datetime.utcnow()
+            if self.rescored_at is None or now - self.rescored_at > timedelta(seconds=config['TRIAGE_RESCORE_SECONDS']):
+                self.heap, self.tickets, self.synced_at, self.rescored_at = [], {}, None, now
+
+            query = SupportTicket.query
+            if self.synced_at is None:
+                query = query.filter(SupportTicket.status.in_(TRIAGE_STATUSES))
+            else:
+                # Overlap by a second so writes committed during the last sync aren't missed
+                query = query.filter(SupportTicket.updated_at >= self.synced_at - timedelta(seconds=1))
+            changed = query.all()
+            queued = [ticket for ticket in changed if ticket.status in TRIAGE_STATUSES]
+            history = self._history(queued, config, now) if queued else ({}, {}, {})
+            for ticket in changed:
+                self.tickets.pop(ticket.id, None)
+            for ticket in queued:
+                self._add(self._entry(ticket, history, config, now))
+            self.synced_at = now
+
+            # Drop heap entries whose ticket left the queue or was re-pushed
+            while self.heap and (
+                self.heap[0][1] not in self.tickets
+                or self.tickets[self.heap[0][1]]['key'] != self.heap[0][0]
+            ):
+                heapq.heappop(self.heap)
+            if len(self.heap) > 2 * len(self.tickets) + 64:
+                self.heap = [(t['key'], t['id']) for t in self.tickets.values()]
+                heapq.heapify(self.heap)
+
+    def snapshot(self, limit=50, category=None):
+        """The `limit` highest-scoring tickets with their current scores"""
+        with self.lock:
+            # Every ticket has one live heap entry, so the rest are stale ones to skip
+            stale = len(self.heap) - len(self.tickets)
+            candidates = sorted(self.heap) if category else heapq.nsmallest(limit + stale, self.heap)
+            tickets, seen = [], set()
+            for key, pk in candidates:
+                ticket = self.tickets.get(pk)
+                if ticket is None or pk in seen or ticket['key'] != key:
+                    continue
+                if category and ticket['category'] != category:
+                    continue
+                seen.add(pk)
+                tickets.append(dict(ticket))
+                if len(tickets) >= limit:
+                    break
+            # Tickets the filter matches, not just the ones returned
+            total = sum(t['category'] == category for t in self.tickets.values()) if category else len(self.tickets)
+
+        now = datetime.utcnow()
+        per_hour = current_app.config['TRIAGE_POINTS_PER_HOUR']
+        for ticket in tickets:
+            ticket['score'] = round(per_hour * _hours(now) - ticket.pop('key'), 1)
+            ticket['base'] = round(ticket['base'], 1)
+            ticket['age_minutes'] = int((now - ticket['created_at']).total_seconds() // 60)
+            ticket['created_at'] = ticket['created_at'].isoformat()
+        return {'total': total, 'tickets': tickets}
+
+
+triage_queue = TriageQueue()
+
+
+def update_ticket(ticket, status, admin_notes=None, now=None):
+    """Move a ticket to `status`, stamping its first response and resolution (caller commits).
+
+    Leaving 'open' for the first time counts as the first response;
+    reaching resolved or closed sets resolved_at and reopening clears it.
+    """
+    now = now or datetime.utcnow()
+    if status not in TICKET_STATUSES:
+        raise TicketError(f"Unknown ticket status {status!r}")
+    if status != 'open' and ticket.first_response_at is None:
+        ticket.first_response_at = now
+    if status in RESOLVED_STATUSES:
+        ticket.resolved_at = ticket.resolved_at or now
+    else:
+        ticket.resolved_at = None
+    ticket.status = status
+    if admin_notes:
+        ticket.admin_notes = admin_notes
+    ticket.updated_at = now
+
+
+def bulk_update_tickets(ticket_ids, status, admin_notes=None, now=None):
+    """Apply one status to many tickets (by public ticket_id) in a single transaction.
+
+    Returns the ticket_ids that were updated and a dict of skipped
+    ticket_id -> reason.
+    """
+    if status not in TICKET_STATUSES:
+        raise TicketError(f"Unknown ticket status {status!r}")
+    now = now or datetime.utcnow()
+    ticket_ids = list(dict.fromkeys(ticket_ids))  # each ticket once, in the order given
+    found = {t.ticket_id: t for t in SupportTicket.query.filter(SupportTicket.ticket_id.in_(ticket_ids))}
+
+    updated, skipped = [], {}
+    for ticket_id in ticket_ids:
+        ticket = found.get(ticket_id)
+        if not ticket:
+            skipped[ticket_id] = 'Ticket not found'
+            continue
+        if ticket.status == status:
+            skipped[ticket_id] = f"Already {status}"
+            continue
+        update_ticket(ticket, status, admin_notes, now)
+        updated.append(ticket_id)
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return updated, skipped
+
+
+def _percentiles(minutes, quantiles=(50, 90, 99)):
+    if not minutes.size:
+        return {'count': 0, **{f"p{q}_minutes": None for q in quantiles}}
+    values = np.percentile(minutes, quantiles)
+    return {'count': int(minutes.size), **{f"p{q}_minutes": round(float(v), 1) for q, v in zip(quantiles, values)}}
+
+
+def response_times(days=None, now=None):
+    """Time-to-first-response and time-to-resolve percentiles for tickets created in the last `days`.
+
+    Tickets resolved before first_response_at was recorded count their
+    resolution as the first response. Broken down by category as well.
+    """
+    days = days or current_app.config['TRIAGE_METRICS_DAYS']
+    now = now or datetime.utcnow()
+    rows = db.session.query(
+        SupportTicket.category, SupportTicket.created_at,
+        func.coalesce(SupportTicket.first_response_at, SupportTicket.resolved_at), SupportTicket.resolved_at
+    ).filter(SupportTicket.created_at >= now - timedelta(days=days)).all()
+
+    def summarize(selected):
+        responded = np.array([(r[2] - r[1]).total_seconds() / 60 for r in selected if r[2] and r[1]])
+        resolved = np.array([(r[3] - r[1]).total_seconds() / 60 for r in selected if r[3] and r[1]])
+        return {
+            'tickets': len(selected),
+            'first_response': _percentiles(responded),
+            'resolve': _percentiles(resolved),
+        }
+
+    categories = sorted({row[0] for row in rows})
+    return {
+        'days': days,
+        **summarize(rows),
+        'by_category': {category: summarize([r for r in rows if r[0] == category]) for category in categories},
+    }